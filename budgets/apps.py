@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class BudgetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'budgets'
+
+    def ready(self):
+        """Initialize app signals."""
+        import budgets.signals
@@ -0,0 +1,90 @@
+"""
+Django management command to rebuild the daily spend table from expenses.
+
+Recomputes every user's per-category daily totals and running sums from the
+raw expense table. Migration budgets 0004 runs it once to backfill
+existing history; run it again whenever the table needs to be verified
+or repaired.
+
+Usage:
+    python manage.py rebuild_daily_spend
+    python manage.py rebuild_daily_spend --user_id=1
+    python manage.py rebuild_daily_spend --chunk-size=200
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
+from budgets.models import DailySpend
+from reports.cache import bump_versions_on_commit
+from transactions.models import Expense, UserBalance
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-category daily spend totals from expense history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_id',
+            type=int,
+            help='Rebuild only a specific user (by ID)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of users rebuilt per transaction'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options.get('user_id'):
+            users = users.filter(id=options['user_id'])
+        user_ids = list(users.values_list('id', flat=True))
+        chunk_size = options['chunk_size']
+
+        rows = 0
+        for start in range(0, len(user_ids), chunk_size):
+            rows += self.rebuild_chunk(user_ids[start:start + chunk_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Rebuilt {rows} daily spend rows for {len(user_ids)} users.'
+        ))
+
+    @staticmethod
+    def rebuild_chunk(user_ids):
+        """Replace the daily spend rows of a batch of users in one transaction."""
+        with transaction.atomic():
+            # Hold the users' ledger locks so expense writes wait for the rebuild.
+            UserBalance.lock(user_ids)
+            DailySpend.objects.filter(user_id__in=user_ids).delete()
+
+            totals = Expense.objects.filter(
+                user_id__in=user_ids, category__isnull=False
+            ).values('user_id', 'category_id', 'date').annotate(
+                total=Sum('amount')
+            ).order_by('user_id', 'category_id', 'date')
+
+            running = defaultdict(Decimal)
+            batch = []
+            created = 0
+            for row in totals.iterator(chunk_size=5000):
+                key = (row['user_id'], row['category_id'])
+                running[key] += row['total']
+                batch.append(DailySpend(
+                    user_id=row['user_id'],
+                    category_id=row['category_id'],
+                    day=row['date'],
+                    amount=row['total'],
+                    cumulative=running[key]
+                ))
+                if len(batch) >= 5000:
+                    DailySpend.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            DailySpend.objects.bulk_create(batch)
+            bump_versions_on_commit(user_ids)
+            return created + len(batch)
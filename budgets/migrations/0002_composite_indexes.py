@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-16 20:34
+
+from django.db import migrations, models
+from sentinel_tracker.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built with CREATE INDEX CONCURRENTLY on PostgreSQL, which
+    # cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('budgets', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='budget',
+            index=models.Index(fields=['user', 'start_date', 'end_date'], name='budget_user_period_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-16 20:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('budgets', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cumulative', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_spend', to='budgets.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_spend', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Spend',
+                'verbose_name_plural': 'Daily Spend',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyspend',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'day'), name='unique_daily_spend'),
+        ),
+    ]
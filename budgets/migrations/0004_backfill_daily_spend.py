@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-16 23:20
+
+import io
+from django.core.management import call_command
+from django.db import migrations
+
+
+def backfill_daily_spend(apps, schema_editor):
+    # Same chunked rebuild as the command, with the current models; every
+    # chunk of users commits on its own.
+    call_command('rebuild_daily_spend', stdout=io.StringIO())
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('budgets', '0003_daily_spend'),
+        ('transactions', '0005_expense_rate_source'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_spend, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 """Budgets app models."""
+from decimal import Decimal
 from django.db import models
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 
@@ -37,6 +40,43 @@ class Category(models.Model):
         return f"{self.name} ({self.get_type_display()})"
 
 
+class BudgetQuerySet(models.QuerySet):
+    """Budget queries with spending calculated in SQL."""
+
+    def active_on(self, day):
+        """Budgets whose period contains day."""
+        return self.filter(start_date__lte=day, end_date__gte=day)
+
+    def with_spent(self):
+        """
+        Annotate spent, remaining and spent_percentage on each budget.
+
+        Spent is the difference of two cumulative DailySpend values (through
+        end_date minus before start_date), each an index lookup, so listing
+        or filtering any number of budgets is a single SQL statement whose
+        cost does not depend on the length of the budget period.
+        """
+        money = DecimalField(max_digits=14, decimal_places=2)
+        through = DailySpend.cumulative_through(OuterRef('user'), OuterRef('category'), OuterRef('end_date'))
+        before = DailySpend.cumulative_before(OuterRef('user'), OuterRef('category'), OuterRef('start_date'))
+        zero = Value(Decimal('0'))
+
+        return self.annotate(
+            spent=ExpressionWrapper(
+                Coalesce(Subquery(through, output_field=money), zero, output_field=money)
+                - Coalesce(Subquery(before, output_field=money), zero, output_field=money),
+                output_field=money
+            )
+        ).annotate(
+            remaining=ExpressionWrapper(F('limit_amount') - F('spent'), output_field=money),
+            spent_percentage=Case(
+                When(limit_amount__gt=0, then=F('spent') * 100 / F('limit_amount')),
+                default=Value(Decimal('0')),
+                output_field=DecimalField(max_digits=20, decimal_places=4)
+            )
+        )
+
+
 class Budget(models.Model):
     """Budget limit for a category over a specific period."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
@@ -51,10 +91,15 @@ class Budget(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BudgetQuerySet.as_manager()
+
     class Meta:
         ordering = ['-start_date']
         verbose_name = 'Budget'
         verbose_name_plural = 'Budgets'
+        indexes = [
+            models.Index(fields=['user', 'start_date', 'end_date'], name='budget_user_period_idx'),
+        ]
 
     def __str__(self):
         return f"Budget: {self.category.name} (${self.limit_amount}) - {self.start_date} to {self.end_date}"
@@ -107,3 +152,85 @@ class Goal(models.Model):
     def remaining_amount(self):
         """Calculate the remaining amount needed."""
         return max(0, self.target_amount - self.current_amount)
+
+
+class DailySpend(models.Model):
+    """
+    Per-user, per-category expense totals by day with a running sum.
+
+    cumulative holds the category's total spending from the first expense
+    up to and including day, so the spending of any date range is the
+    difference of two cumulative values. Rows are kept in sync with every
+    expense write by the handlers in budgets.signals and can be rebuilt
+    with the rebuild_daily_spend command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_spend')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_spend')
+    day = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cumulative = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Daily Spend'
+        verbose_name_plural = 'Daily Spend'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category', 'day'], name='unique_daily_spend'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: ${self.amount} (cumulative ${self.cumulative})"
+
+    @classmethod
+    def cumulative_through(cls, user, category, day):
+        """Subquery for the cumulative spend of a category up to and including day."""
+        return cls.objects.filter(
+            user=user, category=category, day__lte=day
+        ).order_by('-day').values('cumulative')[:1]
+
+    @classmethod
+    def cumulative_before(cls, user, category, day):
+        """Subquery for the cumulative spend of a category before day."""
+        return cls.objects.filter(
+            user=user, category=category, day__lt=day
+        ).order_by('-day').values('cumulative')[:1]
+
+    @classmethod
+    def spent_between(cls, user_id, category_id, start, end):
+        """Total spending of a category from start to end (inclusive)."""
+        through = cls.cumulative_through(user_id, category_id, end).first()
+        before = cls.cumulative_before(user_id, category_id, start).first()
+        return (through['cumulative'] if through else Decimal('0')) - (
+            before['cumulative'] if before else Decimal('0')
+        )
+
+    @classmethod
+    def apply_deltas(cls, user_id, category_id, deltas):
+        """
+        Add per-day amounts ({day: amount}) to a category's daily totals.
+
+        Every row from the earliest changed day onwards gets its cumulative
+        value recomputed, so backdated changes shift all later days. The
+        caller must hold the user's ledger lock inside transaction.atomic().
+        """
+        deltas = {day: amount for day, amount in deltas.items() if amount}
+        if not deltas:
+            return
+        first_day = min(deltas)
+        rows = list(cls.objects.select_for_update().filter(
+            user_id=user_id, category_id=category_id, day__gte=first_day
+        ).order_by('day'))
+        previous = cls.cumulative_before(user_id, category_id, first_day).first()
+        running = previous['cumulative'] if previous else Decimal('0')
+
+        existing = {row.day for row in rows}
+        new_rows = [
+            cls(user_id=user_id, category_id=category_id, day=day)
+            for day in deltas if day not in existing
+        ]
+        for row in sorted(rows + new_rows, key=lambda row: row.day):
+            row.amount += deltas.get(row.day, 0)
+            running += row.amount
+            row.cumulative = running
+
+        cls.objects.bulk_create(new_rows)
+        cls.objects.bulk_update(rows, ['amount', 'cumulative'], batch_size=1000)
@@ -1,11 +1,11 @@
 """Budgets app serializers."""
 from rest_framework import serializers
-from budgets.models import Category, Budget, Goal
-from django.db.models import Sum
+from budgets.models import Category, Budget, DailySpend, Goal
 from datetime import datetime
+from sentinel_tracker.middleware import SerializationTimingMixin
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for Category."""
     name = serializers.CharField(
         max_length=100,
@@ -35,7 +35,7 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class BudgetSerializer(serializers.ModelSerializer):
+class BudgetSerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for Budget."""
     category_name = serializers.CharField(source='category.name', read_only=True)
     spent_amount = serializers.SerializerMethodField()
@@ -64,30 +64,28 @@ class BudgetSerializer(serializers.ModelSerializer):
             'category': {'help_text': 'Category ID to set budget for'}
         }
 
+    def update(self, instance, validated_data):
+        """Update the budget and drop spending annotated before the change."""
+        instance = super().update(instance, validated_data)
+        for name in ('spent', 'remaining', 'spent_percentage'):
+            instance.__dict__.pop(name, None)
+        return instance
+
     def get_spent_amount(self, obj):
         """Calculate total spent in this budget period."""
-        from transactions.models import Expense
-        spent = Expense.objects.filter(
-            user=obj.user,
-            category=obj.category,
-            date__gte=obj.start_date,
-            date__lte=obj.end_date
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        if hasattr(obj, 'spent'):
+            # Annotated by Budget.objects.with_spent()
+            return obj.spent
+        spent = DailySpend.spent_between(obj.user_id, obj.category_id, obj.start_date, obj.end_date)
+        obj.spent = spent
         return spent
 
     def get_remaining_amount(self, obj):
         """Calculate remaining budget."""
-        from transactions.models import Expense
-        spent = Expense.objects.filter(
-            user=obj.user,
-            category=obj.category,
-            date__gte=obj.start_date,
-            date__lte=obj.end_date
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        return float(obj.limit_amount) - float(spent)
+        return float(obj.limit_amount) - float(self.get_spent_amount(obj))
 
 
-class GoalSerializer(serializers.ModelSerializer):
+class GoalSerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for Goal."""
     category_name = serializers.CharField(source='category.name', read_only=True)
     progress_percentage = serializers.SerializerMethodField()
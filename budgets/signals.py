@@ -0,0 +1,26 @@
+"""Budgets app signals for keeping daily spend totals in sync with expenses."""
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.dispatch import receiver
+from budgets.models import DailySpend
+from transactions.models import Expense, UserBalance
+from transactions.signals import ledger_changed
+
+
+@receiver(ledger_changed, sender=Expense)
+def update_daily_spend(sender, changes, **kwargs):
+    """Apply expense changes to the per-day category totals."""
+    deltas = defaultdict(lambda: defaultdict(Decimal))
+    for change in changes:
+        if change.category_id is not None:
+            deltas[(change.user_id, change.category_id)][change.date] += change.amount
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        # Writers of the same user queue on the UserBalance row, so a new
+        # day row cannot be inserted behind a concurrent cumulative update.
+        UserBalance.lock(user_id for user_id, _ in deltas)
+        for (user_id, category_id), days in sorted(deltas.items()):
+            DailySpend.apply_deltas(user_id, category_id, days)
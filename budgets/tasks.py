@@ -0,0 +1,12 @@
+"""Celery tasks for budget rollups."""
+import io
+from celery import shared_task
+from django.core.management import call_command
+
+
+@shared_task
+def rebuild_daily_spend(user_id=None):
+    """Recompute the daily spend table (see the rebuild_daily_spend command)."""
+    out = io.StringIO()
+    call_command('rebuild_daily_spend', user_id=user_id, stdout=out)
+    return out.getvalue().strip()
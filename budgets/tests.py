@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from budgets.models import Budget, Category
+from sentinel_tracker.periods import Period
+from sentinel_tracker.testing import QueryPlanTestCase
+from transactions.models import Expense
+
+
+class BudgetIndexTests(QueryPlanTestCase):
+    """Active-budget lookups use the (user, start_date, end_date) index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='planner')
+        categories = [
+            Category.objects.create(user=cls.user, name=f'Category {index}', type='expense')
+            for index in range(10)
+        ]
+        budgets = []
+        for year in range(2015, 2025):
+            for month in range(1, 13):
+                period = Period.month(year, month)
+                budgets.extend(
+                    Budget(
+                        user=cls.user, category=category, limit_amount=Decimal('100.00'),
+                        start_date=period.start, end_date=period.last_day
+                    )
+                    for category in categories
+                )
+        Budget.objects.bulk_create(budgets)
+        cls.analyze(Budget)
+
+    def test_active_budgets_use_user_period_index(self):
+        queryset = Budget.objects.filter(user=self.user).active_on(date(2020, 6, 15))
+        self.assertUsesIndex(queryset, 'budget_user_period_idx')
+
+
+class BudgetQueryCountTests(TestCase):
+    """Budget endpoints annotate spending instead of querying per budget."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='budgeter')
+        month = Period.current_month()
+        for index in range(5):
+            category = Category.objects.create(user=cls.user, name=f'Category {index}', type='expense')
+            Budget.objects.create(
+                user=cls.user, category=category, limit_amount=Decimal('100.00'),
+                start_date=month.start, end_date=month.last_day
+            )
+            for day in range(3):
+                Expense.objects.create(
+                    user=cls.user, category=category, amount=Decimal(20 * index),
+                    date=month.start + timedelta(days=day)
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_one_statement(self):
+        # COUNT(*) for the page plus the annotated SELECT.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/budgets/budgets/')
+        self.assertEqual(len(response.data['results']), 5)
+        spent = sorted(Decimal(budget['spent_amount']) for budget in response.data['results'])
+        self.assertEqual(spent, [Decimal(60 * index) for index in range(5)])
+
+    def test_exceeded_is_one_statement(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/budgets/budgets/exceeded/')
+        self.assertEqual(sorted(budget['category_name'] for budget in response.data), ['Category 2', 'Category 3', 'Category 4'])
+
+    def test_current_month_is_one_statement(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/budgets/budgets/current_month/')
+        self.assertEqual(len(response.data), 5)
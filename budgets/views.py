@@ -8,6 +8,9 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db import models
 from budgets.models import Category, Budget, Goal
 from budgets.serializers import CategorySerializer, BudgetSerializer, GoalSerializer
+from reports.cache import conditional_on
+from sentinel_tracker.pagination import KeysetPagination
+from sentinel_tracker.periods import Period
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +30,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     
     Filters: type (income/expense), is_default
     Search: name
+    Conditional GET: the list supports ETag / Last-Modified
     """
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
@@ -52,6 +56,11 @@ class CategoryViewSet(viewsets.ModelViewSet):
         logger.info(f"   Found {queryset.count()} categories")
         return queryset
 
+    @conditional_on('categories')
+    def list(self, request, *args, **kwargs):
+        """List categories, answering 304 when none changed since the client's copy."""
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Set the user when creating a category."""
         serializer.save(user=self.request.user)
@@ -85,8 +94,8 @@ class BudgetViewSet(viewsets.ModelViewSet):
     ordering = ['-start_date']
 
     def get_queryset(self):
-        """Return only the current user's budgets."""
-        return Budget.objects.filter(user=self.request.user)
+        """Return the current user's budgets with their spent amounts."""
+        return Budget.objects.filter(user=self.request.user).select_related('category').with_spent()
 
     def perform_create(self, serializer):
         """Set the user when creating a budget."""
@@ -103,23 +112,21 @@ class BudgetViewSet(viewsets.ModelViewSet):
         
         Returns: List of budgets active in the specified period
         """
-        from datetime import datetime, date
+        from datetime import date
         today = date.today()
         year = request.query_params.get('year', today.year)
         month = request.query_params.get('month', today.month)
 
-        from datetime import date as date_cls
-        first_day = date_cls(int(year), int(month), 1)
-        if int(month) == 12:
-            last_day = date_cls(int(year) + 1, 1, 1)
-        else:
-            last_day = date_cls(int(year), int(month) + 1, 1)
+        try:
+            period = Period.month(year, month)
+        except ValueError:
+            return Response({'error': 'Invalid year or month'}, status=status.HTTP_400_BAD_REQUEST)
 
         budgets = self.get_queryset().filter(
-            start_date__lte=first_day,
-            end_date__gte=first_day
+            start_date__lte=period.start,
+            end_date__gte=period.start
         )
-        return Response(BudgetSerializer(budgets, many=True).data)
+        return Response(self.get_serializer(budgets, many=True).data)
 
     @action(detail=False, methods=['get'])
     def exceeded(self, request):
@@ -128,22 +135,8 @@ class BudgetViewSet(viewsets.ModelViewSet):
         
         Returns: List of budgets where spent amount exceeds the limit
         """
-        from django.db.models import Sum
-        from transactions.models import Expense
-
-        exceeded_budgets = []
-        for budget in self.get_queryset():
-            spent = Expense.objects.filter(
-                user=request.user,
-                category=budget.category,
-                date__gte=budget.start_date,
-                date__lte=budget.end_date
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            if spent > budget.limit_amount:
-                exceeded_budgets.append(budget)
-
-        return Response(BudgetSerializer(exceeded_budgets, many=True).data)
+        exceeded_budgets = self.get_queryset().filter(spent__gt=models.F('limit_amount'))
+        return Response(self.get_serializer(exceeded_budgets, many=True).data)
 
 
 class GoalViewSet(viewsets.ModelViewSet):
@@ -164,9 +157,12 @@ class GoalViewSet(viewsets.ModelViewSet):
     
     Filters: category, is_completed
     Ordering: target_date, target_amount
+    Pagination: ?page=N, or ?cursor= for constant-cost keyset pages
     """
     serializer_class = GoalSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['target_date', 'id']
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['category', 'is_completed']
     ordering_fields = ['target_date', 'target_amount']
@@ -174,7 +170,7 @@ class GoalViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return only the current user's goals."""
-        return Goal.objects.filter(user=self.request.user)
+        return Goal.objects.filter(user=self.request.user).select_related('category')
 
     def perform_create(self, serializer):
         """Set the user when creating a goal."""
@@ -190,7 +186,7 @@ class GoalViewSet(viewsets.ModelViewSet):
         goal = self.get_object()
         goal.is_completed = True
         goal.save()
-        return Response(GoalSerializer(goal).data)
+        return Response(self.get_serializer(goal).data)
 
     @action(detail=True, methods=['post'])
     def update_progress(self, request, pk=None):
@@ -207,10 +203,10 @@ class GoalViewSet(viewsets.ModelViewSet):
             if goal.current_amount >= goal.target_amount:
                 goal.is_completed = True
             goal.save()
-        return Response(GoalSerializer(goal).data)
+        return Response(self.get_serializer(goal).data)
 
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get all active (not completed) goals."""
         active_goals = self.get_queryset().filter(is_completed=False)
-        return Response(GoalSerializer(active_goals, many=True).data)
+        return Response(self.get_serializer(active_goals, many=True).data)
@@ -0,0 +1,323 @@
+"""
+Set-oriented evaluation of budget and goal alerts.
+
+Users are processed in chunks. Each chunk costs a fixed number of queries
+no matter how many users, budgets or goals it holds:
+
+    load budgets (spent annotated) -> load open goals
+    -> evaluate rules in memory -> bulk write alerts and goals
+
+Alerts are de-duplicated by the unique_daily_alert constraint
+(user, related_category, rule, evaluated_on) and inserted with
+ON CONFLICT DO NOTHING, so concurrent runs and worker processes can never
+create the same alert twice. With workers > 1 users are sharded by
+id % workers and each shard is checked in its own process; the Celery
+task reports.tasks.check_budgets fans the same shards out to workers.
+
+Incremental runs only check users returned by incremental_users(): those
+whose data changed since the last successful run, plus users whose
+date-based rules can fire without new data.
+"""
+import multiprocessing
+import time
+from datetime import date, timedelta
+from collections import defaultdict
+import django
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from budgets.models import Budget, Goal
+from reports.cache import bump_versions_on_commit
+from reports.events import publish_on_commit
+from reports.models import Alert, AlertCounter, UserWatermark
+from reports.rules import BUDGET_ENDING_DAYS, GOAL_REMINDER_DAYS, evaluate_budget, evaluate_goal
+
+DEFAULT_CHUNK_SIZE = 500
+PHASES = ('load budgets', 'load goals', 'evaluate', 'write')
+
+# Rules evaluated on expense writes (budget exceeded or at risk); the
+# other rules stay with the scheduled run.
+REALTIME_RULES = ('budget_exceeded', 'budget_at_risk')
+
+
+class CheckStats:
+    """Counters and per-phase wall time of a check run."""
+
+    def __init__(self):
+        self.users = 0
+        self.budgets = 0
+        self.goals = 0
+        self.alerts = 0
+        self.goals_completed = 0
+        self.timings = defaultdict(float)
+
+    def merge(self, other):
+        """Add the counters of another run (e.g. a worker shard) to this one."""
+        for name in ('users', 'budgets', 'goals', 'alerts', 'goals_completed'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for phase, seconds in other.timings.items():
+            self.timings[phase] += seconds
+        return self
+
+    def as_dict(self):
+        """JSON-serializable form, e.g. for a Celery task result."""
+        return {
+            'users': self.users,
+            'budgets': self.budgets,
+            'goals': self.goals,
+            'alerts': self.alerts,
+            'goals_completed': self.goals_completed,
+            'timings': dict(self.timings),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name in ('users', 'budgets', 'goals', 'alerts', 'goals_completed'):
+            setattr(stats, name, data[name])
+        stats.timings.update(data['timings'])
+        return stats
+
+
+class _Phase:
+    """Context manager adding the elapsed time to stats.timings[name]."""
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.stats.timings[self.name] += time.perf_counter() - self.started
+
+
+def iter_user_chunks(users, chunk_size):
+    """Yield lists of user ids from a User queryset in primary-key order."""
+    last_id = 0
+    while True:
+        chunk = list(users.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1]
+        yield chunk
+
+
+def shard_users(users, shard, shards):
+    """Restrict a User queryset to the users with id % shards == shard."""
+    return users.annotate(shard=F('id') % shards).filter(shard=shard)
+
+
+def incremental_users(since, today, users=None):
+    """
+    Users that need checking after a successful run started at since.
+
+    Besides users whose watermark moved, this includes users with budgets
+    that started since then, budgets ending within BUDGET_ENDING_DAYS and
+    open goals due within GOAL_REMINDER_DAYS, whose alerts depend on the
+    date rather than on new data.
+    """
+    users = User.objects.all() if users is None else users
+    since_day = timezone.localtime(since).date()
+    return users.filter(
+        Q(id__in=UserWatermark.objects.filter(changed_at__gte=since).values('user_id'))
+        | Q(id__in=Budget.objects.filter(start_date__gte=since_day, start_date__lte=today).values('user_id'))
+        | Q(id__in=Budget.objects.filter(
+            end_date__gte=today, end_date__lte=today + timedelta(days=BUDGET_ENDING_DAYS)
+        ).values('user_id'))
+        | Q(id__in=Goal.objects.filter(
+            is_completed=False,
+            target_date__gt=today,
+            target_date__lte=today + timedelta(days=GOAL_REMINDER_DAYS)
+        ).values('user_id'))
+    )
+
+
+def _alerts_per_user(user_ids, today):
+    rows = Alert.objects.filter(user_id__in=user_ids, evaluated_on=today).order_by().values(
+        'user_id'
+    ).annotate(alerts=Count('id'))
+    return {row['user_id']: row['alerts'] for row in rows}
+
+
+def insert_alerts(alerts, today):
+    """
+    Insert the alerts of a check, skipping keys that already exist.
+
+    Counts the users' alerts of the day before and after the insert, under
+    the users' counter locks, to keep the unread counters exact and notify
+    only the users who actually got new alerts.
+
+    Returns:
+        Dict of user_id -> number of alerts created
+    """
+    if not alerts:
+        return {}
+    user_ids = sorted({alert.user_id for alert in alerts})
+    with transaction.atomic():
+        counters = AlertCounter.lock(user_ids)
+        before = _alerts_per_user(user_ids, today)
+        Alert.objects.bulk_create(alerts, batch_size=1000, ignore_conflicts=True)
+        created = {
+            user_id: count - before.get(user_id, 0)
+            for user_id, count in _alerts_per_user(user_ids, today).items()
+            if count > before.get(user_id, 0)
+        }
+        if created:
+            AlertCounter.apply_locked_deltas(counters, created)
+            bump_versions_on_commit(created, 'alerts')
+            publish_on_commit(created)
+    return created
+
+
+def check_users(user_ids, today, stats):
+    """Evaluate every rule for a chunk of users and write the results."""
+    stats.users += len(user_ids)
+
+    with _Phase(stats, 'load budgets'):
+        budgets = list(
+            Budget.objects.filter(user_id__in=user_ids).active_on(today).select_related(
+                'category'
+            ).with_spent().order_by('user_id', '-start_date', 'id')
+        )
+    with _Phase(stats, 'load goals'):
+        goals = list(Goal.objects.filter(user_id__in=user_ids, is_completed=False).order_by(
+            'user_id', '-target_date', 'id'
+        ))
+    with _Phase(stats, 'evaluate'):
+        candidates = []
+        for budget in budgets:
+            candidates.append(evaluate_budget(budget, budget.spent, today))
+        completed = []
+        for goal in goals:
+            candidate, is_completed = evaluate_goal(goal, today)
+            candidates.append(candidate)
+            if is_completed:
+                goal.is_completed = True
+                goal.updated_at = timezone.now()
+                completed.append(goal)
+
+        # Keep the first of several candidates with the same key (e.g. two
+        # budgets on categories with the same name); the database rejects
+        # keys that already exist.
+        seen = set()
+        new_alerts = []
+        for candidate in candidates:
+            if candidate is None:
+                continue
+            key = (candidate.user_id, candidate.related_category, candidate.rule)
+            if key in seen:
+                continue
+            seen.add(key)
+            new_alerts.append(Alert(
+                user_id=candidate.user_id,
+                title=candidate.title,
+                message=candidate.message,
+                alert_type=candidate.alert_type,
+                related_category=candidate.related_category,
+                rule=candidate.rule,
+                evaluated_on=today
+            ))
+
+    with _Phase(stats, 'write'):
+        with transaction.atomic():
+            created = sum(insert_alerts(new_alerts, today).values())
+            Goal.objects.bulk_update(completed, ['is_completed', 'updated_at'], batch_size=1000)
+
+    stats.budgets += len(budgets)
+    stats.goals += len(goals)
+    stats.alerts += created
+    stats.goals_completed += len(completed)
+    return stats
+
+
+def check_covering_budgets(user_id, keys, today=None):
+    """
+    Evaluate a user's budgets covering the given (category_id, day) pairs.
+
+    Only REALTIME_RULES are evaluated; this is the on-write check
+    queued by reports.realtime.
+
+    Returns:
+        List of Alert objects passed to bulk_create; alerts that already
+        exist for today are skipped by the unique_daily_alert constraint.
+    """
+    today = today or date.today()
+    covering = Q()
+    for category_id, day in keys:
+        covering |= Q(category_id=category_id, start_date__lte=day, end_date__gte=day)
+    budgets = Budget.objects.filter(covering, user_id=user_id).select_related('category').with_spent()
+
+    seen = set()
+    alerts = []
+    for budget in budgets.order_by('-start_date', 'id'):
+        candidate = evaluate_budget(budget, budget.spent, today)
+        if candidate is None or candidate.rule not in REALTIME_RULES:
+            continue
+        key = (candidate.related_category, candidate.rule)
+        if key in seen:
+            continue
+        seen.add(key)
+        alerts.append(Alert(
+            user_id=user_id,
+            title=candidate.title,
+            message=candidate.message,
+            alert_type=candidate.alert_type,
+            related_category=candidate.related_category,
+            rule=candidate.rule,
+            evaluated_on=today
+        ))
+    insert_alerts(alerts, today)
+    return alerts
+
+
+def run_checks(users=None, today=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Check budgets and goals of the given users (default: all users).
+
+    Returns:
+        CheckStats with counters and per-phase timings
+    """
+    users = User.objects.all() if users is None else users
+    today = today or date.today()
+    stats = CheckStats()
+    for user_ids in iter_user_chunks(users, chunk_size):
+        check_users(user_ids, today, stats)
+    return stats
+
+
+def _check_shard(args):
+    """Worker entry point: check the users with id % workers == shard."""
+    query, shard, workers, today, chunk_size = args
+    users = User.objects.all()
+    users.query = query
+    try:
+        return run_checks(shard_users(users, shard, workers), today, chunk_size)
+    finally:
+        connections.close_all()
+
+
+def _init_worker():
+    # Needed with the spawn start method; a no-op for forked workers.
+    django.setup()
+
+
+def run_parallel(users=None, today=None, chunk_size=DEFAULT_CHUNK_SIZE, workers=2):
+    """
+    Check users in a pool of worker processes, one shard per worker.
+
+    Every worker opens its own database connection. Phase timings in the
+    returned CheckStats are summed over all workers.
+    """
+    users = User.objects.all() if users is None else users
+    today = today or date.today()
+    # Forked workers must not share the parent's open connections.
+    connections.close_all()
+    shards = [(users.query, shard, workers, today, chunk_size) for shard in range(workers)]
+    stats = CheckStats()
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        for shard_stats in pool.imap_unordered(_check_shard, shards):
+            stats.merge(shard_stats)
+    return stats
@@ -0,0 +1,168 @@
+"""
+Versioned per-user cache for report endpoints and conditional GETs.
+
+Entries are keyed by (user, data version, endpoint, parameters, day). Every
+write to a user's transactions, budgets, goals or categories replaces the
+user's data version (see reports.signals), which orphans all of the user's
+entries at once instead of deleting them one by one; orphans simply expire.
+Writes to shared default categories replace a global version that is part
+of every key.
+
+Versions are replaced when the write commits, so a report computed from
+data that is not committed yet can never be stored under the new version.
+The same version stamps, kept per data scope, drive the ETag and
+Last-Modified validators of polled read endpoints (conditional_on).
+
+Computation is single-flight: on a miss, the request that takes a per-key
+lock in the shared cache (with a REPORT_CACHE_LOCK_LEASE second lease)
+computes the report, while concurrent requests for the same key wait up to
+REPORT_CACHE_LOCK_WAIT seconds and reuse its result. With
+REPORT_CACHE_STALE_WHILE_REVALIDATE they return the previous version of the
+report right away instead of waiting.
+"""
+import hashlib
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from sentinel_tracker import metrics
+
+GLOBAL_VERSION = 'all'
+
+
+def _version_key(owner, scope):
+    # Scopes: 'reports' (cached reports and the dashboard), 'categories'
+    # (the category list) and 'alerts'.
+    return f'version:{scope}:{owner}'
+
+
+def _new_version():
+    """A version is a random token and the time it was created."""
+    return (uuid.uuid4().hex, time.time())
+
+
+def _versions(user_id, scope):
+    keys = [_version_key(user_id, scope), _version_key(GLOBAL_VERSION, scope)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # First use or evicted: start a fresh version. add() keeps the
+            # value of a concurrent reader that got there first.
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key) or _new_version()
+    return [versions[key] for key in keys]
+
+
+def data_version(user_id, scope='reports'):
+    """Current version stamp of a user's data in a scope."""
+    return ':'.join(token for token, _ in _versions(user_id, scope))
+
+
+def last_modified(user_id, scope='reports'):
+    """Time (UNIX timestamp) of the last write to a user's data in a scope."""
+    return max(modified for _, modified in _versions(user_id, scope))
+
+
+def bump_versions(user_ids, scope='reports'):
+    """Invalidate a scope for the given users (None: all users)."""
+    owners = {GLOBAL_VERSION if user_id is None else user_id for user_id in user_ids}
+    if owners:
+        cache.set_many({_version_key(owner, scope): _new_version() for owner in owners}, None)
+
+
+def bump_versions_on_commit(user_ids, scope='reports'):
+    """Invalidate a scope for the users once the current transaction commits."""
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: bump_versions(user_ids, scope))
+
+
+def conditional_on(scope, daily=False):
+    """
+    Add ETag and Last-Modified to a read-only view method from a data scope.
+
+    The validators come from the user's version stamp alone, so a matching
+    If-None-Match or If-Modified-Since is answered with 304 Not Modified
+    before the view runs. Use daily=True for views whose result also
+    depends on today's date.
+    """
+    def etag(request, *args, **kwargs):
+        tag = f'{scope}-{data_version(request.user.id, scope)}'
+        return f'{tag}-{date.today():%Y%m%d}' if daily else tag
+
+    def modified(request, *args, **kwargs):
+        timestamp = last_modified(request.user.id, scope)
+        if daily:
+            midnight = timezone.make_aware(datetime.combine(date.today(), datetime.min.time()))
+            timestamp = max(timestamp, midnight.timestamp())
+        return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=modified))
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cached_report(user, endpoint, params, compute):
+    """
+    Return the cached result of compute() for a user's report.
+
+    Args:
+        user: Django User object
+        endpoint: Report name, used in the key and the cache metrics
+        params: Dict of the request parameters the result depends on
+        compute: Callable producing the (picklable) report
+    """
+    fingerprint = hashlib.sha1(
+        json.dumps({'params': params, 'day': date.today()}, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    version = data_version(user.id)
+    key = f'reports:{user.id}:{version}:{endpoint}:{fingerprint}'
+    # Last computed version of this report, for stale-while-revalidate.
+    latest_key = f'reports:{user.id}:latest:{endpoint}:{fingerprint}'
+    stale_ok = _setting('REPORT_CACHE_STALE_WHILE_REVALIDATE', False)
+
+    result = cache.get(key)
+    if result is not None:
+        metrics.report_cache_requests.inc((endpoint, 'hit'))
+        return result
+
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, _setting('REPORT_CACHE_LOCK_LEASE', 10)):
+        # Another request is computing this report.
+        if stale_ok:
+            latest = cache.get(latest_key)
+            if latest is not None:
+                metrics.report_cache_requests.inc((endpoint, 'stale'))
+                return latest['result']
+
+        deadline = time.monotonic() + _setting('REPORT_CACHE_LOCK_WAIT', 2)
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            result = cache.get(key)
+            if result is not None:
+                metrics.report_cache_requests.inc((endpoint, 'coalesced'))
+                return result
+        # The lock holder is slow or gone; compute without the lock.
+        token = None
+
+    metrics.report_cache_requests.inc((endpoint, 'miss'))
+    try:
+        result = compute()
+        timeout = _setting('REPORT_CACHE_TIMEOUT', 300)
+        cache.set(key, result, timeout)
+        if stale_ok:
+            cache.set(latest_key, {'version': version, 'result': result}, timeout)
+    finally:
+        # Not atomic, but the lease bounds the damage of deleting a lock
+        # that expired and was taken over in between.
+        if token is not None and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    return result
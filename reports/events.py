@@ -0,0 +1,118 @@
+"""
+Push notifications for new alerts.
+
+Whenever alerts are created, the ids of their users are published once the
+transaction commits. Open alert streams (reports.streams) subscribe to the
+in-process broker and, when woken up, read the user's alerts newer than the
+last one they sent, so a notification carries no payload and a missed or
+duplicated one is harmless.
+
+With REDIS_URL set, notifications go through a Redis pub/sub channel, and
+a listener thread in every web process hands them to its local broker, so
+alerts created by Celery workers, management commands or other web
+processes reach every connected client. Without Redis only notifications
+raised in the same process are delivered.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+import redis
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'sentinel_tracker:alerts'
+
+
+class Broker:
+    """In-process fan-out of user ids to asyncio queues of open streams."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """Return a queue receiving a None for each notification of the user."""
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        _start_listener()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({item for item in subscribers if item[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def deliver(self, user_ids):
+        """Wake up the streams of the given users; safe to call from any thread."""
+        with self._lock:
+            targets = [item for user_id in set(user_ids) for item in self._subscribers.get(user_id, ())]
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(_wake, queue)
+
+
+def _wake(queue):
+    # One pending wake-up is enough: the stream reads everything new.
+    if queue.empty():
+        queue.put_nowait(None)
+
+
+broker = Broker()
+
+_listener_lock = threading.Lock()
+_listener = None
+
+
+@lru_cache(maxsize=None)
+def _redis(url):
+    return redis.Redis.from_url(url)
+
+
+def _listen():
+    """Forward Redis notifications to the local broker, reconnecting on errors."""
+    while True:
+        try:
+            pubsub = _redis(settings.REDIS_URL).pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            for message in pubsub.listen():
+                broker.deliver(int(user_id) for user_id in message['data'].split(b','))
+        except Exception:
+            logger.exception('Alert notification listener failed, reconnecting')
+            time.sleep(1)
+
+
+def _start_listener():
+    global _listener
+    if not getattr(settings, 'REDIS_URL', None) or _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, name='alert-listener', daemon=True)
+            _listener.start()
+
+
+def publish(user_ids):
+    """Notify the streams of users who got new alerts."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    if getattr(settings, 'REDIS_URL', None):
+        try:
+            _redis(settings.REDIS_URL).publish(CHANNEL, ','.join(map(str, user_ids)))
+            return
+        except Exception:
+            logger.exception('Could not publish alert notifications, delivering locally')
+    broker.deliver(user_ids)
+
+
+def publish_on_commit(user_ids):
+    """Notify the users' streams once the current transaction commits."""
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: publish(user_ids))
@@ -1,8 +1,13 @@
-"""Reports app business logic for summary and breakdown calculations."""
+"""
+Reports app business logic for summary and breakdown calculations.
+
+Monthly figures are read from MonthlyRollup, so their cost depends on the
+number of categories rather than on the number of transactions.
+"""
 from django.db.models import Sum
 from datetime import datetime, date, timedelta
-from transactions.models import Income, Expense
 from budgets.models import Budget
+from reports.models import MonthlyRollup
 
 
 def get_monthly_summary(user, year=None, month=None):
@@ -22,19 +27,17 @@ def get_monthly_summary(user, year=None, month=None):
     if month is None:
         month = datetime.now().month
 
-    incomes = Income.objects.filter(
-        user=user,
-        date__year=year,
-        date__month=month
-    )
-    expenses = Expense.objects.filter(
-        user=user,
-        date__year=year,
-        date__month=month
-    )
+    totals = {
+        row['kind']: row
+        for row in MonthlyRollup.objects.filter(
+            user=user, month=date(int(year), int(month), 1)
+        ).values('kind').annotate(total=Sum('total'), count=Sum('count')).order_by()
+    }
+    incomes = totals.get('income', {})
+    expenses = totals.get('expense', {})
 
-    total_income = incomes.aggregate(total=Sum('amount'))['total'] or 0
-    total_expense = expenses.aggregate(total=Sum('amount'))['total'] or 0
+    total_income = incomes.get('total') or 0
+    total_expense = expenses.get('total') or 0
     net_balance = total_income - total_expense
 
     return {
@@ -43,8 +46,8 @@ def get_monthly_summary(user, year=None, month=None):
         'total_income': float(total_income),
         'total_expense': float(total_expense),
         'net_balance': float(net_balance),
-        'income_count': incomes.count(),
-        'expense_count': expenses.count(),
+        'income_count': incomes.get('count') or 0,
+        'expense_count': expenses.get('count') or 0,
     }
 
 
@@ -65,22 +68,21 @@ def get_category_breakdown(user, year=None, month=None):
     if month is None:
         month = datetime.now().month
 
-    expenses = Expense.objects.filter(
+    breakdown = list(MonthlyRollup.objects.filter(
         user=user,
-        date__year=year,
-        date__month=month
-    )
-
-    breakdown = expenses.values('category__name', 'category__id').annotate(
-        total=Sum('amount'),
-        count=Sum('id')
-    ).order_by('-total')
+        kind='expense',
+        month=date(int(year), int(month), 1),
+        count__gt=0
+    ).values('category__name', 'category__id').annotate(
+        total=Sum('total'),
+        count=Sum('count')
+    ).order_by('-total'))
 
     return {
         'year': year,
         'month': month,
-        'breakdown': list(breakdown),
-        'total_expenses': float(expenses.aggregate(total=Sum('amount'))['total'] or 0),
+        'breakdown': breakdown,
+        'total_expenses': float(sum(row['total'] for row in breakdown)),
     }
 
 
@@ -95,32 +97,18 @@ def get_budget_status(user):
         Dictionary with budget status data
     """
     today = date.today()
-    budgets = Budget.objects.filter(
-        user=user,
-        start_date__lte=today,
-        end_date__gte=today
-    )
+    budgets = Budget.objects.filter(user=user).active_on(today).select_related('category').with_spent()
 
     budget_status = []
     for budget in budgets:
-        expenses = Expense.objects.filter(
-            user=user,
-            category=budget.category,
-            date__gte=budget.start_date,
-            date__lte=budget.end_date
-        )
-        spent = expenses.aggregate(total=Sum('amount'))['total'] or 0
-        remaining = budget.limit_amount - spent
-        percentage = (spent / budget.limit_amount * 100) if budget.limit_amount > 0 else 0
-
         budget_status.append({
             'id': budget.id,
             'category': budget.category.name,
             'limit_amount': float(budget.limit_amount),
-            'spent': float(spent),
-            'remaining': float(remaining),
-            'percentage': round(percentage, 2),
-            'exceeded': spent > budget.limit_amount,
+            'spent': float(budget.spent),
+            'remaining': float(budget.remaining),
+            'percentage': round(float(budget.spent_percentage), 2),
+            'exceeded': budget.spent > budget.limit_amount,
         })
 
     return {
@@ -147,16 +135,15 @@ def get_spending_projection(user, category=None):
     days_passed = today.day
     days_remaining = days_in_month.day - today.day
 
-    expense_filter = {
+    rollup_filter = {
         'user': user,
-        'date__year': today.year,
-        'date__month': today.month,
+        'kind': 'expense',
+        'month': today.replace(day=1),
     }
     if category:
-        expense_filter['category'] = category
+        rollup_filter['category'] = category
 
-    current_expenses = Expense.objects.filter(**expense_filter)
-    current_spent = current_expenses.aggregate(total=Sum('amount'))['total'] or 0
+    current_spent = MonthlyRollup.objects.filter(**rollup_filter).aggregate(total=Sum('total'))['total'] or 0
 
     # Calculate daily average
     daily_average = current_spent / days_passed if days_passed > 0 else 0
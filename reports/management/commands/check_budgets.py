@@ -1,22 +1,35 @@
 """
 Django management command to check budgets and generate alerts.
 
-This command should be run daily via a Cron job or scheduler.
-It checks all active budgets and generates alerts based on spending patterns.
+The Celery beat schedule runs the same check daily as the
+reports.tasks.check_budgets task; this command runs it by hand. It checks all active budgets and generates alerts based on spending patterns.
+
+Users are evaluated in chunks with a fixed number of queries per chunk
+(see reports.budget_checks); the time spent in each phase is reported at
+the end of the run. With --workers N the users are split into N shards
+that are checked in parallel processes.
+
+With --incremental only users whose transactions, budgets or goals changed
+since the last successful run are checked, plus users with date-based
+alerts due (budgets starting or ending soon, goals due within 30 days).
+Without a previous successful run the whole user base is checked.
 
 Usage:
     python manage.py check_budgets
     python manage.py check_budgets --user_id=1
+    python manage.py check_budgets --chunk-size=1000
+    python manage.py check_budgets --workers=8
+    python manage.py check_budgets --incremental
     python manage.py check_budgets --send-email
 """
 
+import time
+from datetime import date
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from django.db.models import Sum
-from datetime import date, timedelta
-from budgets.models import Budget, Goal
-from transactions.models import Expense
-from reports.models import Alert
+from django.utils import timezone
+from reports.budget_checks import DEFAULT_CHUNK_SIZE, PHASES, incremental_users, run_checks, run_parallel
+from reports.models import BudgetCheckRun
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,6 +44,23 @@ class Command(BaseCommand):
             type=int,
             help='Process only a specific user (by ID)'
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of users evaluated per batch'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (users are sharded by id)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only check users whose data changed since the last successful run'
+        )
         parser.add_argument(
             '--send-email',
             action='store_true',
@@ -47,172 +77,53 @@ class Command(BaseCommand):
         else:
             users = User.objects.all()
 
-        alert_count = 0
-        today = date.today()
-
-        for user in users:
-            self.stdout.write(f'Processing user: {user.username}')
-
-            # Check budgets
-            budgets = Budget.objects.filter(
-                user=user,
-                start_date__lte=today,
-                end_date__gte=today
-            )
+        mode = 'full'
+        if options['incremental']:
+            last_run = BudgetCheckRun.last_successful()
+            if last_run:
+                mode = 'incremental'
+                users = incremental_users(last_run.started_at, date.today(), users)
+                self.stdout.write(f'Checking users changed since {last_run.started_at:%Y-%m-%d %H:%M:%S}')
+            else:
+                self.stdout.write('No previous successful run, checking all users')
+
+        # Only runs over the whole user base move the incremental cutoff.
+        run = None if user_id else BudgetCheckRun.objects.create(mode=mode)
+
+        workers = options['workers']
+        started = time.perf_counter()
+        try:
+            if workers > 1 and not user_id:
+                stats = run_parallel(users, chunk_size=options['chunk_size'], workers=workers)
+            else:
+                workers = 1
+                stats = run_checks(users, chunk_size=options['chunk_size'])
+        finally:
+            if run is not None:
+                run.finished_at = timezone.now()
+                run.save(update_fields=['finished_at'])
+        elapsed = time.perf_counter() - started
+
+        if run is not None:
+            run.succeeded = True
+            run.users = stats.users
+            run.alerts = stats.alerts
+            run.save(update_fields=['succeeded', 'users', 'alerts'])
 
-            for budget in budgets:
-                # Calculate current spending
-                current_spending = Expense.objects.filter(
-                    user=user,
-                    category=budget.category,
-                    date__gte=budget.start_date,
-                    date__lte=budget.end_date
-                ).aggregate(total=Sum('amount'))['total'] or 0
-
-                remaining_budget = budget.limit_amount - current_spending
-                spending_percentage = (current_spending / budget.limit_amount * 100) if budget.limit_amount > 0 else 0
-
-                # Calculate days remaining
-                days_remaining = (budget.end_date - today).days
-                days_elapsed = (today - budget.start_date).days + 1
-                total_days = (budget.end_date - budget.start_date).days + 1
-
-                # Calculate daily pace
-                daily_limit = budget.limit_amount / total_days if total_days > 0 else 0
-                daily_spent = current_spending / days_elapsed if days_elapsed > 0 else 0
-
-                # Generate alerts based on spending patterns
-                alert_generated = False
-
-                # DANGER ALERT: Exceeding budget
-                if current_spending > budget.limit_amount:
-                    title = f'⚠️ Budget Exceeded: {budget.category.name}'
-                    message = (
-                        f'You have exceeded your budget for {budget.category.name}!\n'
-                        f'Limit: ${budget.limit_amount:.2f}\n'
-                        f'Current Spending: ${current_spending:.2f}\n'
-                        f'Overspent by: ${current_spending - budget.limit_amount:.2f}'
-                    )
-                    self._create_alert(user, title, message, 'danger', budget.category.name)
-                    alert_count += 1
-                    alert_generated = True
-                    self.stdout.write(
-                        self.style.WARNING(f'  - DANGER: {budget.category.name} budget exceeded')
-                    )
-
-                # WARNING ALERT: On pace to exceed budget
-                elif spending_percentage >= 75 and not alert_generated:
-                    remaining_days = days_remaining
-                    projected_daily_spend = daily_spent
-                    projected_end_spending = current_spending + (projected_daily_spend * remaining_days)
-
-                    if projected_end_spending > budget.limit_amount:
-                        title = f'⚠️ Budget At Risk: {budget.category.name}'
-                        message = (
-                            f'At your current spending pace, you will exceed your '
-                            f'{budget.category.name} budget by the end of the month.\n'
-                            f'Limit: ${budget.limit_amount:.2f}\n'
-                            f'Current Spending: ${current_spending:.2f} ({spending_percentage:.1f}%)\n'
-                            f'Projected End: ${projected_end_spending:.2f}\n'
-                            f'Days Remaining: {remaining_days}'
-                        )
-                        self._create_alert(user, title, message, 'danger', budget.category.name)
-                        alert_count += 1
-                        alert_generated = True
-                        self.stdout.write(
-                            self.style.WARNING(f'  - WARNING: {budget.category.name} on pace to exceed')
-                        )
-
-                # SUCCESS ALERT: On track and under control
-                elif spending_percentage <= 50 and not alert_generated:
-                    title = f'✅ Budget On Track: {budget.category.name}'
-                    message = (
-                        f'Great job! You\'re managing your {budget.category.name} budget well.\n'
-                        f'Limit: ${budget.limit_amount:.2f}\n'
-                        f'Current Spending: ${current_spending:.2f} ({spending_percentage:.1f}%)\n'
-                        f'Remaining: ${remaining_budget:.2f}'
-                    )
-                    self._create_alert(user, title, message, 'success', budget.category.name)
-                    alert_count += 1
-                    alert_generated = True
-                    self.stdout.write(
-                        self.style.SUCCESS(f'  - SUCCESS: {budget.category.name} on track')
-                    )
-
-                # TIP ALERT: Generic tip based on spending
-                elif not alert_generated and days_remaining <= 3 and remaining_budget > 0:
-                    title = f'💡 Tip: {budget.category.name} Budget Ending Soon'
-                    message = (
-                        f'Your {budget.category.name} budget period ends in {days_remaining} day(s).\n'
-                        f'You have ${remaining_budget:.2f} remaining.\n'
-                        f'Make sure to review your spending for this period.'
-                    )
-                    self._create_alert(user, title, message, 'tip', budget.category.name)
-                    alert_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f'  - TIP: {budget.category.name} budget ending soon')
-                    )
-
-            # Check financial goals
-            goals = Goal.objects.filter(user=user, is_completed=False)
-            for goal in goals:
-                days_until_target = (goal.target_date - today).days
-                remaining_needed = goal.target_amount - goal.current_amount
-
-                if remaining_needed <= 0:
-                    goal.is_completed = True
-                    goal.save()
-                    title = f'🎉 Goal Completed: {goal.name}'
-                    message = f'Congratulations! You\'ve reached your goal: {goal.name}'
-                    self._create_alert(user, title, message, 'success', goal.name)
-                    alert_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f'  - GOAL COMPLETED: {goal.name}')
-                    )
-
-                elif days_until_target <= 30 and days_until_target > 0:
-                    daily_needed = remaining_needed / days_until_target if days_until_target > 0 else 0
-                    title = f'🎯 Goal Deadline Approaching: {goal.name}'
-                    message = (
-                        f'Your goal "{goal.name}" is due in {days_until_target} day(s).\n'
-                        f'Target: ${goal.target_amount:.2f}\n'
-                        f'Current: ${goal.current_amount:.2f}\n'
-                        f'Remaining: ${remaining_needed:.2f}\n'
-                        f'Daily Needed: ${daily_needed:.2f}'
-                    )
-                    self._create_alert(user, title, message, 'info', goal.name)
-                    alert_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f'  - GOAL REMINDER: {goal.name}')
-                    )
+        self.stdout.write(
+            f'Processed {stats.users} users, {stats.budgets} active budgets and '
+            f'{stats.goals} open goals ({stats.goals_completed} completed).'
+        )
+        self.stdout.write('Timings:' if workers == 1 else f'Timings (summed over {workers} workers):')
+        for phase in PHASES:
+            self.stdout.write(f'  - {phase}: {stats.timings[phase] * 1000:.1f} ms')
+        self.stdout.write(f'  - total (wall): {elapsed * 1000:.1f} ms')
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'\n✅ Alert check completed! Generated {alert_count} alerts.'
+                f'\n✅ Alert check completed! Generated {stats.alerts} alerts.'
             )
         )
 
         if send_email:
             self.stdout.write('📧 Email sending not yet implemented')
-
-    def _create_alert(self, user, title, message, alert_type, related_category=None):
-        """
-        Create an alert if it doesn't already exist today for this category.
-        Prevents duplicate alerts for the same category on the same day.
-        """
-        today = date.today()
-        existing_alert = Alert.objects.filter(
-            user=user,
-            related_category=related_category,
-            created_at__date=today,
-            alert_type=alert_type
-        ).exists()
-
-        if not existing_alert:
-            Alert.objects.create(
-                user=user,
-                title=title,
-                message=message,
-                alert_type=alert_type,
-                related_category=related_category
-            )
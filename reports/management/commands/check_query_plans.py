@@ -0,0 +1,188 @@
+"""
+Django management command to guard the query plans of hot queries.
+
+Runs EXPLAIN on each per-user query used by reports, budgets and alerts
+and fails if any of them plans a sequential scan. On PostgreSQL sequential
+scans are disabled for the check (SET LOCAL enable_seqscan = off), so a
+Seq Scan in the plan means no usable index exists, regardless of how small
+the tables are. Which index serves each query depends on the data; the
+tests of the transactions, budgets and reports apps pin the composite
+indexes on a seeded dataset.
+
+With --seed N a throwaway user with N transactions spread over several
+years is created first, the report functions are timed against it, and
+everything is rolled back at the end.
+
+Usage:
+    python manage.py check_query_plans
+    python manage.py check_query_plans --user_id=1 --verbose-plans
+    python manage.py check_query_plans --seed=200000
+"""
+
+import random
+import re
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from budgets.models import Budget, Category, DailySpend
+from transactions.models import Income, Expense
+from transactions.signals import ledger_changed, changes_for_created
+from reports.models import Alert, MonthlyRollup
+from reports.logic import (
+    get_monthly_summary,
+    get_category_breakdown,
+    get_budget_status,
+    get_spending_projection,
+)
+from sentinel_tracker.periods import Period
+
+SEQUENTIAL_SCAN_PATTERNS = {
+    # PostgreSQL: "Seq Scan on transactions_expense"
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # SQLite: "SCAN transactions_expense" (an index scan reads "SEARCH ... USING INDEX")
+    'sqlite': re.compile(r'\bSCAN (\w+)(?!.*\bINDEX\b)'),
+}
+
+
+def hot_queries(user_id, category_id, today):
+    """Return (name, queryset) pairs for the per-user hot paths."""
+    month = Period.current_month(today)
+    return [
+        ('monthly income', Income.objects.filter(user_id=user_id, **month.filter())),
+        ('monthly expenses', Expense.objects.filter(user_id=user_id, **month.filter())),
+        ('monthly rollups', MonthlyRollup.objects.filter(user_id=user_id, month=month.start)),
+        ('budget spent', DailySpend.objects.filter(
+            user_id=user_id, category_id=category_id, day__lte=today
+        ).order_by('-day')),
+        ('active budgets', Budget.objects.filter(
+            user_id=user_id, start_date__lte=today, end_date__gte=today
+        )),
+        ('unread alerts', Alert.objects.filter(user_id=user_id, is_read=False)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN hot queries and fail if any of them uses a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_id',
+            type=int,
+            help='User whose ids are used as query parameters (default: first user)'
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan of every query'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed a temporary user with this many transactions and time the reports'
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQUENTIAL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}')
+
+        failures = []
+        with transaction.atomic():
+            if options['seed']:
+                user_id = self.seed(options['seed'])
+            else:
+                user_id = options.get('user_id') or User.objects.order_by('id').values_list(
+                    'id', flat=True
+                ).first() or 0
+            category_id = Expense.objects.filter(user_id=user_id).exclude(
+                category__isnull=True
+            ).values_list('category_id', flat=True).first() or 0
+            if options['seed']:
+                self.time_reports(User.objects.get(id=user_id))
+
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in hot_queries(user_id, category_id, date.today()):
+                plan = queryset.order_by().explain()
+                scanned = pattern.findall(plan)
+                if scanned:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(
+                        f'  - {name}: sequential scan on {", ".join(sorted(set(scanned)))}'
+                    ))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'  - {name}: index scan'))
+                if options.get('verbose_plans') or scanned:
+                    self.stdout.write(f'{plan}\n')
+
+            if options['seed']:
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries failed the check: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('\n✅ All hot queries use an index.'))
+
+    def seed(self, count):
+        """Create a throwaway user with count transactions over five years."""
+        user = User.objects.create(username=f'query-plan-seed-{int(time.time())}')
+        categories = list(Category.objects.filter(user=user, type='expense').values_list('id', flat=True))
+        first_day = date.today() - timedelta(days=5 * 365)
+        randomizer = random.Random(count)
+
+        batch = []
+        for index in range(count):
+            day = first_day + timedelta(days=randomizer.randrange(5 * 365 + 1))
+            amount = Decimal(randomizer.randrange(100, 50000)) / 100
+            if index % 10 == 0:
+                batch.append(Income(user=user, amount=amount * 10, date=day))
+            else:
+                batch.append(Expense(
+                    user=user, amount=amount, date=day,
+                    category_id=randomizer.choice(categories) if categories else None
+                ))
+            if len(batch) >= 5000:
+                self._flush(batch)
+        self._flush(batch)
+
+        Budget.objects.bulk_create([
+            Budget(
+                user=user, category_id=category_id, limit_amount=500,
+                start_date=Period.current_month().start, end_date=Period.current_month().last_day
+            )
+            for category_id in categories[:5]
+        ])
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'ANALYZE transactions_income, transactions_expense, budgets_budget, reports_monthlyrollup'
+                )
+        self.stdout.write(f'Seeded {count} transactions for user {user.id}')
+        return user.id
+
+    @staticmethod
+    def _flush(batch):
+        for model in (Income, Expense):
+            instances = model.objects.bulk_create([obj for obj in batch if isinstance(obj, model)])
+            ledger_changed.send(sender=model, changes=changes_for_created(instances))
+        batch.clear()
+
+    def time_reports(self, user):
+        """Print the wall time of each report function for the seeded user."""
+        reports = [
+            ('get_monthly_summary', lambda: get_monthly_summary(user)),
+            ('get_category_breakdown', lambda: get_category_breakdown(user)),
+            ('get_budget_status', lambda: get_budget_status(user)),
+            ('get_spending_projection', lambda: get_spending_projection(user)),
+        ]
+        self.stdout.write('Report timings:')
+        for name, report in reports:
+            started = time.perf_counter()
+            report()
+            self.stdout.write(f'  - {name}: {(time.perf_counter() - started) * 1000:.1f} ms')
+        self.stdout.write('')
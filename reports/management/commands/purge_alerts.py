@@ -0,0 +1,161 @@
+"""
+Django management command to apply the alert retention policy.
+
+- Read alerts older than ALERT_RETENTION_READ_DAYS days are deleted.
+- Only the newest ALERT_RETENTION_MAX_PER_USER alerts of each user are
+  kept, read or not.
+- With ALERT_COMPACTION (or --compact), repeated budget check alerts of a
+  user with the same category and rule are folded into the newest one,
+  whose occurrences field counts them.
+
+A setting of None disables the rule. The alert table is walked in primary
+key ranges of --batch-size ids and each range is purged in its own short
+transaction, so the job never locks more than one batch of rows. Unread
+counters and the alerts cache versions are adjusted per batch.
+
+Usage:
+    python manage.py purge_alerts
+    python manage.py purge_alerts --dry-run
+    python manage.py purge_alerts --read-days=30 --max-per-user=200 --compact
+    python manage.py purge_alerts --batch-size=5000
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from reports.cache import bump_versions_on_commit
+from reports.models import Alert, AlertCounter
+from reports.signals import purging_alerts
+
+REASONS = ('expired', 'capped', 'compacted')
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and surplus alerts and compact repeated ones, in primary-key batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--read-days',
+            type=int,
+            help='Delete read alerts older than this many days (default: ALERT_RETENTION_READ_DAYS)'
+        )
+        parser.add_argument(
+            '--max-per-user',
+            type=int,
+            help='Keep at most this many alerts per user (default: ALERT_RETENTION_MAX_PER_USER)'
+        )
+        parser.add_argument(
+            '--compact',
+            action='store_true',
+            help='Fold repeated daily alerts into the newest one (default: ALERT_COMPACTION)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of alert ids purged per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be deleted without writing'
+        )
+
+    def handle(self, *args, **options):
+        read_days = options.get('read_days')
+        if read_days is None:
+            read_days = getattr(settings, 'ALERT_RETENTION_READ_DAYS', None)
+        max_per_user = options.get('max_per_user')
+        if max_per_user is None:
+            max_per_user = getattr(settings, 'ALERT_RETENTION_MAX_PER_USER', None)
+        compact = options['compact'] or getattr(settings, 'ALERT_COMPACTION', False)
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        dry_run = options['dry_run']
+
+        bounds = Alert.objects.aggregate(first=Min('id'), last=Max('id'))
+        totals = Counter()
+        if bounds['first'] is not None:
+            read_before = timezone.now() - timedelta(days=read_days) if read_days is not None else None
+            cap_cutoffs = self.cap_cutoffs(max_per_user) if max_per_user is not None else {}
+            keepers = self.compaction_keepers() if compact else {}
+            for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+                totals += self.purge_range(
+                    start, start + batch_size, read_before, cap_cutoffs, keepers, dry_run
+                )
+
+        summary = 'Deleted ' + ', '.join(f'{totals[reason]} {reason}' for reason in REASONS) + ' alerts'
+        if dry_run:
+            summary += ' (dry run, nothing written)'
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {summary}.'))
+
+    @staticmethod
+    def cap_cutoffs(max_per_user):
+        """Map users over the cap to the id of their newest alert past it."""
+        ranked = Alert.objects.annotate(
+            rank=Window(RowNumber(), partition_by=[F('user_id')], order_by=F('id').desc())
+        ).filter(rank=max_per_user + 1).order_by().values_list('user_id', 'id')
+        return dict(ranked)
+
+    @staticmethod
+    def compaction_keepers():
+        """Map each repeated (user, category, rule) of budget checks to its newest alert id."""
+        rows = Alert.objects.filter(evaluated_on__isnull=False).order_by().values(
+            'user_id', 'related_category', 'rule'
+        ).annotate(newest=Max('id'), alerts=Count('id')).filter(alerts__gt=1)
+        return {
+            (row['user_id'], row['related_category'], row['rule']): row['newest']
+            for row in rows
+        }
+
+    def purge_range(self, start, end, read_before, cap_cutoffs, keepers, dry_run):
+        """Purge the alerts with start <= id < end in one transaction."""
+        deleted = Counter()
+        with transaction.atomic():
+            # Lock the rows so their read state cannot change before the
+            # unread counters are adjusted.
+            rows = Alert.objects.select_for_update().filter(
+                id__gte=start, id__lt=end
+            ).order_by('id').values_list(
+                'id', 'user_id', 'is_read', 'created_at', 'related_category', 'rule',
+                'evaluated_on', 'occurrences'
+            )
+            doomed = []
+            users = set()
+            unread = defaultdict(int)
+            folded = defaultdict(int)
+            for (alert_id, user_id, is_read, created_at, related_category, rule,
+                 evaluated_on, occurrences) in rows:
+                keeper = keepers.get((user_id, related_category, rule)) if evaluated_on else None
+                if read_before is not None and is_read and created_at < read_before:
+                    reason = 'expired'
+                elif alert_id <= cap_cutoffs.get(user_id, 0):
+                    reason = 'capped'
+                elif keeper is not None and keeper > alert_id:
+                    reason = 'compacted'
+                    folded[keeper] += occurrences
+                else:
+                    continue
+                deleted[reason] += 1
+                doomed.append(alert_id)
+                users.add(user_id)
+                if not is_read:
+                    unread[user_id] -= 1
+
+            if dry_run or not doomed:
+                return deleted
+
+            counters = AlertCounter.lock(unread)
+            with purging_alerts():
+                Alert.objects.filter(id__in=doomed).delete()
+            for keeper, occurrences in sorted(folded.items()):
+                Alert.objects.filter(id=keeper).update(occurrences=F('occurrences') + occurrences)
+            AlertCounter.apply_locked_deltas(counters, unread)
+            bump_versions_on_commit(users, 'alerts')
+        return deleted
@@ -0,0 +1,95 @@
+"""
+Django management command to rebuild or verify the unread alert counters.
+
+Recounts every user's unread alerts from the alert table and compares the
+result with the stored AlertCounter rows. With --verify it only reports
+drift and writes nothing.
+
+Usage:
+    python manage.py rebuild_alert_counters
+    python manage.py rebuild_alert_counters --user_id=1
+    python manage.py rebuild_alert_counters --verify
+    python manage.py rebuild_alert_counters --chunk-size=500
+"""
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from reports.cache import bump_versions_on_commit
+from reports.models import AlertCounter
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user unread alert counters and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_id',
+            type=int,
+            help='Rebuild only a specific user (by ID)'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report drift without writing corrections'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of users rebuilt per transaction'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options.get('user_id'):
+            users = users.filter(id=options['user_id'])
+        user_ids = list(users.values_list('id', flat=True))
+        chunk_size = options['chunk_size']
+        verify = options['verify']
+
+        drifted = 0
+        for start in range(0, len(user_ids), chunk_size):
+            drifted += self.rebuild_chunk(user_ids[start:start + chunk_size], verify)
+
+        summary = f'Checked {len(user_ids)} alert counters, {drifted} drifted'
+        if drifted and verify:
+            summary += ' (verify only, nothing written)'
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {summary}.'))
+
+    def rebuild_chunk(self, user_ids, verify):
+        """Compare and fix the counters of a batch of users in one transaction."""
+        with transaction.atomic():
+            # Lock the stored rows before counting so alert writes that land
+            # mid-run are not reported as drift.
+            stored = {
+                counter.user_id: counter
+                for counter in AlertCounter.objects.select_for_update().filter(
+                    user_id__in=user_ids
+                ).order_by('user_id')
+            }
+            unread = AlertCounter.count_unread(user_ids)
+            to_create = []
+            to_update = []
+
+            for user_id in user_ids:
+                actual = unread.get(user_id, 0)
+                counter = stored.get(user_id)
+                if counter is None:
+                    to_create.append(AlertCounter(user_id=user_id, unread=actual))
+                    continue
+                if counter.unread == actual:
+                    continue
+                self.stdout.write(self.style.WARNING(
+                    f'  - User {user_id}: stored {counter.unread} unread alerts, actual {actual}'
+                ))
+                counter.unread = actual
+                to_update.append(counter)
+
+            if not verify:
+                AlertCounter.objects.bulk_create(to_create, ignore_conflicts=True)
+                AlertCounter.objects.bulk_update(to_update, ['unread'])
+                if to_update:
+                    bump_versions_on_commit([counter.user_id for counter in to_update], 'alerts')
+
+        return len(to_update)
@@ -0,0 +1,115 @@
+"""
+Django management command to rebuild or verify the monthly rollup table.
+
+Recomputes every user's per-category monthly income and expense totals
+from the raw transaction tables and compares them with the stored
+MonthlyRollup rows. Migration reports 0010 runs it once to backfill
+existing history; with --verify it only reports drift and writes nothing.
+
+Usage:
+    python manage.py rebuild_monthly_rollups
+    python manage.py rebuild_monthly_rollups --user_id=1
+    python manage.py rebuild_monthly_rollups --verify
+    python manage.py rebuild_monthly_rollups --chunk-size=200
+"""
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from reports.cache import bump_versions_on_commit
+from reports.models import MonthlyRollup
+from transactions.models import Income, Expense, UserBalance
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-category monthly totals from transaction history and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_id',
+            type=int,
+            help='Rebuild only a specific user (by ID)'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report drift without writing corrections'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of users rebuilt per transaction'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options.get('user_id'):
+            users = users.filter(id=options['user_id'])
+        user_ids = list(users.values_list('id', flat=True))
+        chunk_size = options['chunk_size']
+        verify = options['verify']
+
+        rows = 0
+        drifted = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk_rows, chunk_drifted = self.rebuild_chunk(user_ids[start:start + chunk_size], verify)
+            rows += chunk_rows
+            drifted += chunk_drifted
+
+        summary = f'Checked {rows} monthly rollups for {len(user_ids)} users, {drifted} drifted'
+        if drifted and verify:
+            summary += ' (verify only, nothing written)'
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {summary}.'))
+
+    def rebuild_chunk(self, user_ids, verify):
+        """Compare and replace the rollups of a batch of users in one transaction."""
+        with transaction.atomic():
+            # Hold the users' ledger locks so transaction writes wait for the rebuild.
+            UserBalance.lock(user_ids)
+
+            expected = {}
+            for kind, model in (('income', Income), ('expense', Expense)):
+                totals = model.objects.filter(user_id__in=user_ids).annotate(
+                    month=TruncMonth('date')
+                ).values('user_id', 'category_id', 'month').annotate(
+                    total=Sum('amount'), count=Count('id')
+                ).order_by()
+                for row in totals:
+                    key = (row['user_id'], row['category_id'], kind, row['month'])
+                    expected[key] = (row['total'], row['count'])
+
+            stored = {
+                (rollup.user_id, rollup.category_id, rollup.kind, rollup.month): (rollup.total, rollup.count)
+                for rollup in MonthlyRollup.objects.filter(user_id__in=user_ids)
+                # Buckets emptied by deletes are equivalent to missing ones.
+                if rollup.total or rollup.count
+            }
+
+            drifted = 0
+            for key in sorted(set(expected) | set(stored), key=lambda key: (key[0], key[3], key[2], key[1] or 0)):
+                actual = stored.get(key, (0, 0))
+                wanted = expected.get(key, (0, 0))
+                if actual == wanted:
+                    continue
+                drifted += 1
+                user_id, category_id, kind, month = key
+                self.stdout.write(self.style.WARNING(
+                    f'  - User {user_id}, {kind} {month:%Y-%m}, category {category_id}: '
+                    f'stored ${actual[0]:.2f} ({actual[1]}), actual ${wanted[0]:.2f} ({wanted[1]})'
+                ))
+
+            if not verify:
+                MonthlyRollup.objects.filter(user_id__in=user_ids).delete()
+                MonthlyRollup.objects.bulk_create([
+                    MonthlyRollup(
+                        user_id=user_id, category_id=category_id, kind=kind, month=month,
+                        total=total, count=count
+                    )
+                    for (user_id, category_id, kind, month), (total, count) in expected.items()
+                ], batch_size=1000)
+                bump_versions_on_commit(user_ids)
+
+        return len(expected), drifted
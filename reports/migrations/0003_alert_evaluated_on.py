@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-16 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='evaluated_on',
+            field=models.DateField(blank=True, help_text='Day of the budget check that generated this alert', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(fields=('user', 'related_category', 'alert_type', 'evaluated_on'), name='unique_daily_alert'),
+        ),
+    ]
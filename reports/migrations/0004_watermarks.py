@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-16 20:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('reports', '0003_alert_evaluated_on'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetCheckRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('full', 'Full'), ('incremental', 'Incremental')], default='full', max_length=20)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('succeeded', models.BooleanField(default=False)),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('alerts', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Budget Check Run',
+                'verbose_name_plural': 'Budget Check Runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserWatermark',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='watermark', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('changed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'User Watermark',
+                'verbose_name_plural': 'User Watermarks',
+            },
+        ),
+    ]
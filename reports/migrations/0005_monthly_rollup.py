@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-16 21:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('budgets', '0003_daily_spend'),
+        ('reports', '0004_watermarks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='budgets.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Monthly Rollup',
+                'verbose_name_plural': 'Monthly Rollups',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='monthlyrollup',
+            index=models.Index(fields=['user', 'month'], name='rollup_user_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'month', 'kind', 'category'), name='unique_monthly_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'month', 'kind'), name='unique_monthly_rollup_uncategorized'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-16 21:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('reports', '0005_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='alert_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Alert Counter',
+                'verbose_name_plural': 'Alert Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-16 21:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_alert_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1, help_text='Number of daily alerts compacted into this one'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+# Title prefix of each rule's alerts, as produced by reports.rules.
+RULE_TITLES = {
+    'budget_exceeded': 'Budget Exceeded:',
+    'budget_at_risk': 'Budget At Risk:',
+    'budget_on_track': 'Budget On Track:',
+    'budget_ending': 'Budget Ending Soon',
+    'goal_completed': 'Goal Completed:',
+    'goal_deadline': 'Goal Deadline Approaching:',
+}
+
+
+def fill_rules(apps, schema_editor):
+    Alert = apps.get_model('reports', 'Alert')
+    for rule, title in RULE_TITLES.items():
+        Alert.objects.filter(evaluated_on__isnull=False, rule='', title__contains=title).update(rule=rule)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_alert_occurrences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='rule',
+            field=models.CharField(blank=True, choices=[('budget_exceeded', 'Budget exceeded'), ('budget_at_risk', 'Budget at risk'), ('budget_on_track', 'Budget on track'), ('budget_ending', 'Budget ending soon'), ('goal_completed', 'Goal completed'), ('goal_deadline', 'Goal deadline approaching')], default='', help_text='Rule that generated this alert (empty for manual alerts)', max_length=20),
+        ),
+        migrations.RunPython(fill_rules, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='alert',
+            name='unique_daily_alert',
+        ),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(fields=('user', 'related_category', 'rule', 'evaluated_on'), name='unique_daily_alert'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_alert_rule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetcheckrun',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
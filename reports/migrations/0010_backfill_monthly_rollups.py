@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-16 23:25
+
+import io
+from django.core.management import call_command
+from django.db import migrations
+
+
+def backfill_monthly_rollups(apps, schema_editor):
+    # Same chunked rebuild as the command, with the current models; every
+    # chunk of users commits on its own.
+    call_command('rebuild_monthly_rollups', stdout=io.StringIO())
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('reports', '0009_budgetcheckrun_error'),
+        ('transactions', '0005_expense_rate_source'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_monthly_rollups, migrations.RunPython.noop),
+    ]
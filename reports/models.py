@@ -1,6 +1,11 @@
 """Reports app models."""
+from collections import defaultdict
+from decimal import Decimal
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
+from budgets.models import Category
 
 
 class Alert(models.Model):
@@ -11,6 +16,14 @@ class Alert(models.Model):
         ('tip', 'Tip'),
         ('info', 'Info'),
     ]
+    RULES = [
+        ('budget_exceeded', 'Budget exceeded'),
+        ('budget_at_risk', 'Budget at risk'),
+        ('budget_on_track', 'Budget on track'),
+        ('budget_ending', 'Budget ending soon'),
+        ('goal_completed', 'Goal completed'),
+        ('goal_deadline', 'Goal deadline approaching'),
+    ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='alerts')
     title = models.CharField(max_length=200)
@@ -23,6 +36,22 @@ class Alert(models.Model):
         null=True,
         help_text='Category that triggered this alert'
     )
+    rule = models.CharField(
+        max_length=20,
+        choices=RULES,
+        blank=True,
+        default='',
+        help_text='Rule that generated this alert (empty for manual alerts)'
+    )
+    evaluated_on = models.DateField(
+        null=True,
+        blank=True,
+        help_text='Day of the budget check that generated this alert'
+    )
+    occurrences = models.PositiveIntegerField(
+        default=1,
+        help_text='Number of daily alerts compacted into this one'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -30,6 +59,259 @@ class Alert(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Alert'
         verbose_name_plural = 'Alerts'
+        constraints = [
+            # Budget checks create at most one alert per user, category and
+            # rule per day, even when several workers run concurrently.
+            models.UniqueConstraint(
+                fields=['user', 'related_category', 'rule', 'evaluated_on'],
+                name='unique_daily_alert'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user'],
+                condition=models.Q(is_read=False),
+                name='alert_user_unread_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Alert ({self.get_alert_type_display()}): {self.title}"
+
+
+class AlertCounter(models.Model):
+    """
+    Number of a user's unread alerts.
+
+    Kept in sync with every alert write by the handlers in reports.signals
+    and the bulk writers in reports.budget_checks, so the unread badge is a
+    single primary-key read. Rebuild it with the rebuild_alert_counters
+    command.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='alert_counter')
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Alert Counter'
+        verbose_name_plural = 'Alert Counters'
+
+    def __str__(self):
+        return f"User {self.user_id}: {self.unread} unread alerts"
+
+    @staticmethod
+    def count_unread(user_ids):
+        """Count unread alerts per user from scratch, in one grouped query."""
+        rows = Alert.objects.filter(user_id__in=user_ids, is_read=False).order_by().values(
+            'user_id'
+        ).annotate(unread=models.Count('id'))
+        return {row['user_id']: row['unread'] for row in rows}
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Return the counter of a user, counting the alerts on first use."""
+        counter, _ = cls.objects.get_or_create(
+            user_id=user_id,
+            # Callable, so the count only runs when the row is created.
+            defaults={'unread': lambda: cls.count_unread([user_id]).get(user_id, 0)}
+        )
+        return counter
+
+    @classmethod
+    def lock(cls, user_ids):
+        """
+        Lock the users' counters until the end of the transaction.
+
+        Writers that count alerts before and after a bulk insert take this
+        lock first, so concurrent writers for the same users queue behind
+        each other. The caller must be inside transaction.atomic().
+
+        Returns:
+            Dict of user_id -> AlertCounter for the users that have one
+        """
+        return {
+            counter.user_id: counter
+            for counter in cls.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')
+        }
+
+    @classmethod
+    def apply_locked_deltas(cls, counters, deltas):
+        """
+        Shift counters returned by lock() in a fixed number of queries.
+
+        Args:
+            counters: The result of lock() in the current transaction
+            deltas: Dict of user_id -> change in unread alerts
+        """
+        now = timezone.now()
+        to_update = []
+        for user_id, delta in deltas.items():
+            counter = counters.get(user_id)
+            if counter is not None and delta:
+                counter.unread += delta
+                counter.updated_at = now
+                to_update.append(counter)
+        cls.objects.bulk_update(to_update, ['unread', 'updated_at'], batch_size=1000)
+
+        missing = sorted(set(deltas) - set(counters))
+        if missing:
+            # First write for these users: the counts already include the
+            # changes that triggered this call.
+            unread = cls.count_unread(missing)
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, unread=unread.get(user_id, 0)) for user_id in missing],
+                ignore_conflicts=True
+            )
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Shift the counters by a {user_id: change in unread alerts} mapping."""
+        for user_id, delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            updated = cls.objects.filter(user_id=user_id).update(
+                unread=F('unread') + delta,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                # First write for this user: the count already includes
+                # the change that triggered this call.
+                cls.for_user(user_id)
+
+
+class UserWatermark(models.Model):
+    """
+    Last time any of a user's transactions, budgets or goals changed.
+
+    Bumped by the handlers in reports.signals; incremental budget checks
+    only evaluate users whose watermark moved since the last successful run.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='watermark')
+    changed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'User Watermark'
+        verbose_name_plural = 'User Watermarks'
+
+    def __str__(self):
+        return f"User {self.user_id} changed at {self.changed_at}"
+
+    @classmethod
+    def bump(cls, user_ids):
+        """Mark users as changed now, in one upsert."""
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, changed_at=now) for user_id in sorted(set(user_ids))],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['changed_at'],
+        )
+
+
+class BudgetCheckRun(models.Model):
+    """One run of the check_budgets command."""
+    MODES = [
+        ('full', 'Full'),
+        ('incremental', 'Incremental'),
+    ]
+
+    mode = models.CharField(max_length=20, choices=MODES, default='full')
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    succeeded = models.BooleanField(default=False)
+    users = models.PositiveIntegerField(default=0)
+    alerts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = 'Budget Check Run'
+        verbose_name_plural = 'Budget Check Runs'
+
+    def __str__(self):
+        return f"{self.get_mode_display()} budget check at {self.started_at}"
+
+    @classmethod
+    def last_successful(cls):
+        """The most recent run that finished without errors, or None."""
+        return cls.objects.filter(succeeded=True).order_by('-started_at').first()
+
+
+class MonthlyRollup(models.Model):
+    """
+    Per-user income or expense totals by category and calendar month.
+
+    Kept in sync with every transaction write by the handlers in
+    reports.signals, so monthly reports read a handful of rows instead of
+    aggregating the raw transactions. Rebuild or verify the table with the
+    rebuild_monthly_rollups command.
+    """
+    KINDS = [
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='monthly_rollups'
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    month = models.DateField(help_text='First day of the month')
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Monthly Rollup'
+        verbose_name_plural = 'Monthly Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'kind', 'category'],
+                condition=models.Q(category__isnull=False),
+                name='unique_monthly_rollup'
+            ),
+            # NULLs never conflict in a unique index, so uncategorized
+            # transactions need their own constraint.
+            models.UniqueConstraint(
+                fields=['user', 'month', 'kind'],
+                condition=models.Q(category__isnull=True),
+                name='unique_monthly_rollup_uncategorized'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'month'], name='rollup_user_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.kind}: ${self.total} ({self.count})"
+
+    @classmethod
+    def apply_changes(cls, kind, changes):
+        """
+        Add ledger changes to the monthly buckets they fall into.
+
+        The caller must hold the users' ledger locks inside
+        transaction.atomic(), so a missing bucket cannot be created twice.
+        """
+        buckets = defaultdict(lambda: [Decimal('0'), 0])
+        for change in changes:
+            bucket = buckets[(change.user_id, change.category_id, change.date.replace(day=1))]
+            bucket[0] += change.amount
+            bucket[1] += change.count
+
+        for (user_id, category_id, month), (amount, count) in sorted(
+            buckets.items(), key=lambda item: (item[0][0], item[0][1] or 0, item[0][2])
+        ):
+            if not amount and not count:
+                continue
+            updated = cls.objects.filter(
+                user_id=user_id, category_id=category_id, kind=kind, month=month
+            ).update(total=F('total') + amount, count=F('count') + count)
+            if not updated:
+                cls.objects.create(
+                    user_id=user_id, category_id=category_id, kind=kind, month=month,
+                    total=amount, count=count
+                )
@@ -0,0 +1,36 @@
+"""
+Real-time budget evaluation after expense writes.
+
+When an expense is written through the API, the budgets covering its
+category and date are re-evaluated with the same rules as check_budgets,
+and any danger alert (budget exceeded or at risk) is created right away.
+The evaluation is queued as a Celery task after the transaction commits,
+so it adds nothing to the request's latency.
+"""
+import logging
+from collections import defaultdict
+from django.db import transaction
+from reports.tasks import evaluate_expense_budgets
+
+logger = logging.getLogger(__name__)
+
+
+def _enqueue(user_id, keys):
+    # Best effort and without publish retries, so an unreachable broker
+    # cannot stall the request; the scheduled check_budgets run still
+    # covers the user.
+    try:
+        evaluate_expense_budgets.apply_async((user_id, keys), retry=False)
+    except Exception:
+        logger.exception('Could not queue budget evaluation for user %s', user_id)
+
+
+def schedule_budget_evaluation(expenses):
+    """Evaluate the budgets affected by expenses once the current transaction commits."""
+    keys_by_user = defaultdict(set)
+    for expense in expenses:
+        if expense.category_id is not None:
+            keys_by_user[expense.user_id].add((expense.category_id, expense.date.isoformat()))
+
+    for user_id, keys in keys_by_user.items():
+        transaction.on_commit(lambda user_id=user_id, keys=sorted(keys): _enqueue(user_id, keys))
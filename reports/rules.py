@@ -0,0 +1,138 @@
+"""
+Alert rules for budgets and goals.
+
+The rules are plain functions over already-loaded objects and never touch
+the database, so they can be evaluated for any number of users in memory
+by reports.budget_checks.
+"""
+from collections import namedtuple
+
+# An alert that should exist for a user today; (user_id, related_category,
+# rule) identifies it for de-duplication. Exceeded and at-risk alerts share
+# the 'danger' type, so the type alone cannot tell them apart.
+AlertCandidate = namedtuple(
+    'AlertCandidate', ['user_id', 'title', 'message', 'alert_type', 'related_category', 'rule']
+)
+
+# Date-based rules: tips for budgets ending within BUDGET_ENDING_DAYS and
+# reminders for goals due within GOAL_REMINDER_DAYS.
+BUDGET_ENDING_DAYS = 3
+GOAL_REMINDER_DAYS = 30
+
+
+def evaluate_budget(budget, spent, today):
+    """
+    Return the AlertCandidate for an active budget, or None.
+
+    Args:
+        budget: Budget with category loaded
+        spent: Amount spent in the budget period
+        today: Date of the check
+    """
+    name = budget.category.name
+    limit = budget.limit_amount
+    remaining_budget = limit - spent
+    spending_percentage = (spent / limit * 100) if limit > 0 else 0
+
+    days_remaining = (budget.end_date - today).days
+    days_elapsed = (today - budget.start_date).days + 1
+    daily_spent = spent / days_elapsed if days_elapsed > 0 else 0
+
+    # DANGER ALERT: Exceeding budget
+    if spent > limit:
+        return AlertCandidate(
+            budget.user_id,
+            f'⚠️ Budget Exceeded: {name}',
+            f'You have exceeded your budget for {name}!\n'
+            f'Limit: ${limit:.2f}\n'
+            f'Current Spending: ${spent:.2f}\n'
+            f'Overspent by: ${spent - limit:.2f}',
+            'danger',
+            name,
+            'budget_exceeded'
+        )
+
+    # WARNING ALERT: On pace to exceed budget
+    if spending_percentage >= 75:
+        projected_end_spending = spent + (daily_spent * days_remaining)
+        if projected_end_spending > limit:
+            return AlertCandidate(
+                budget.user_id,
+                f'⚠️ Budget At Risk: {name}',
+                f'At your current spending pace, you will exceed your '
+                f'{name} budget by the end of the month.\n'
+                f'Limit: ${limit:.2f}\n'
+                f'Current Spending: ${spent:.2f} ({spending_percentage:.1f}%)\n'
+                f'Projected End: ${projected_end_spending:.2f}\n'
+                f'Days Remaining: {days_remaining}',
+                'danger',
+                name,
+                'budget_at_risk'
+            )
+        return None
+
+    # SUCCESS ALERT: On track and under control
+    if spending_percentage <= 50:
+        return AlertCandidate(
+            budget.user_id,
+            f'✅ Budget On Track: {name}',
+            f'Great job! You\'re managing your {name} budget well.\n'
+            f'Limit: ${limit:.2f}\n'
+            f'Current Spending: ${spent:.2f} ({spending_percentage:.1f}%)\n'
+            f'Remaining: ${remaining_budget:.2f}',
+            'success',
+            name,
+            'budget_on_track'
+        )
+
+    # TIP: Budget period ending soon
+    if days_remaining <= BUDGET_ENDING_DAYS and remaining_budget > 0:
+        return AlertCandidate(
+            budget.user_id,
+            f'💡 Tip: {name} Budget Ending Soon',
+            f'Your {name} budget period ends in {days_remaining} day(s).\n'
+            f'You have ${remaining_budget:.2f} remaining.\n'
+            f'Make sure to review your spending for this period.',
+            'tip',
+            name,
+            'budget_ending'
+        )
+    return None
+
+
+def evaluate_goal(goal, today):
+    """
+    Return (AlertCandidate or None, completed) for an open goal.
+
+    completed is True when the goal has reached its target and should be
+    marked as completed.
+    """
+    days_until_target = (goal.target_date - today).days
+    remaining_needed = goal.target_amount - goal.current_amount
+
+    if remaining_needed <= 0:
+        return AlertCandidate(
+            goal.user_id,
+            f'🎉 Goal Completed: {goal.name}',
+            f'Congratulations! You\'ve reached your goal: {goal.name}',
+            'success',
+            goal.name,
+            'goal_completed'
+        ), True
+
+    if 0 < days_until_target <= GOAL_REMINDER_DAYS:
+        daily_needed = remaining_needed / days_until_target
+        return AlertCandidate(
+            goal.user_id,
+            f'🎯 Goal Deadline Approaching: {goal.name}',
+            f'Your goal "{goal.name}" is due in {days_until_target} day(s).\n'
+            f'Target: ${goal.target_amount:.2f}\n'
+            f'Current: ${goal.current_amount:.2f}\n'
+            f'Remaining: ${remaining_needed:.2f}\n'
+            f'Daily Needed: ${daily_needed:.2f}',
+            'info',
+            goal.name,
+            'goal_deadline'
+        ), False
+
+    return None, False
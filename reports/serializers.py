@@ -1,9 +1,10 @@
 """Reports app serializers."""
 from rest_framework import serializers
 from reports.models import Alert
+from sentinel_tracker.middleware import SerializationTimingMixin
 
 
-class AlertSerializer(serializers.ModelSerializer):
+class AlertSerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for Alert."""
     title = serializers.CharField(
         max_length=200,
@@ -24,10 +25,10 @@ class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
         fields = [
-            'id', 'user', 'title', 'message', 'alert_type',
-            'is_read', 'related_category', 'created_at', 'updated_at'
+            'id', 'user', 'title', 'message', 'alert_type', 'rule',
+            'is_read', 'related_category', 'occurrences', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'rule', 'occurrences', 'created_at', 'updated_at']
         extra_kwargs = {
             'related_category': {'help_text': 'Category ID this alert is related to (optional)'}
         }
@@ -0,0 +1,154 @@
+"""
+Reports app signals.
+
+Tracks which users need their budgets re-checked, keeps the monthly
+rollups in sync with the ledger and invalidates cached reports.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from budgets.models import Budget, Category, Goal
+from reports.cache import bump_versions_on_commit
+from reports.events import publish_on_commit
+from reports.models import Alert, AlertCounter, MonthlyRollup, UserWatermark
+from transactions.models import Income, UserBalance
+from transactions.signals import LedgerChange, ledger_changed
+
+_purging_alerts = ContextVar('purging_alerts', default=False)
+
+
+def _deleted_with_user(origin):
+    """Whether a delete cascades from a User; their per-user rows go with them."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is User
+
+
+@contextmanager
+def purging_alerts():
+    """
+    Skip the per-alert cache and counter handlers for deletes in the block.
+
+    purge_alerts deletes alerts in batches and adjusts the unread counters
+    and alerts cache versions once per batch itself.
+    """
+    token = _purging_alerts.set(True)
+    try:
+        yield
+    finally:
+        _purging_alerts.reset(token)
+
+
+@receiver(ledger_changed)
+def ledger_watermark(sender, changes, **kwargs):
+    """Mark users whose incomes or expenses changed."""
+    UserWatermark.bump(change.user_id for change in changes)
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=Goal)
+@receiver(post_delete, sender=Goal)
+def plan_watermark(sender, instance, origin=None, **kwargs):
+    """Mark users whose budgets or goals changed."""
+    if _deleted_with_user(origin):
+        # The user is being deleted along with their watermark.
+        return
+    UserWatermark.bump([instance.user_id])
+
+
+@receiver(ledger_changed)
+def update_monthly_rollups(sender, changes, **kwargs):
+    """Apply ledger changes to the monthly per-category totals."""
+    if not changes:
+        return
+    with transaction.atomic():
+        UserBalance.lock(change.user_id for change in changes)
+        MonthlyRollup.apply_changes('income' if sender is Income else 'expense', changes)
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollups(sender, instance, origin=None, **kwargs):
+    """
+    Move a deleted category's totals to the uncategorized buckets.
+
+    Its transactions keep existing with category set to NULL (SET_NULL
+    sends no save signals), while its rollup rows are deleted with it.
+    """
+    if _deleted_with_user(origin):
+        return
+    rollups = list(MonthlyRollup.objects.filter(category=instance))
+    if not rollups:
+        return
+    with transaction.atomic():
+        UserBalance.lock(rollup.user_id for rollup in rollups)
+        for kind in ('income', 'expense'):
+            MonthlyRollup.apply_changes(kind, [
+                LedgerChange(rollup.user_id, None, rollup.month, rollup.total, rollup.count)
+                for rollup in rollups if rollup.kind == kind
+            ])
+
+
+@receiver(ledger_changed)
+def ledger_report_cache(sender, changes, **kwargs):
+    """Invalidate the cached reports of users whose incomes or expenses changed."""
+    bump_versions_on_commit(change.user_id for change in changes)
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=Goal)
+@receiver(post_delete, sender=Goal)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def plan_report_cache(sender, instance, origin=None, **kwargs):
+    """Invalidate cached reports after budget, goal or category writes."""
+    if _deleted_with_user(origin):
+        return
+    # Default categories (user None) are shared by everyone.
+    bump_versions_on_commit([instance.user_id])
+    if sender is Category:
+        bump_versions_on_commit([instance.user_id], 'categories')
+
+
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+def alert_cache(sender, instance, origin=None, **kwargs):
+    """Invalidate conditional GETs of a user's alerts and push new ones."""
+    if _deleted_with_user(origin) or _purging_alerts.get():
+        return
+    bump_versions_on_commit([instance.user_id], 'alerts')
+    if kwargs.get('created'):
+        publish_on_commit([instance.user_id])
+
+
+@receiver(pre_save, sender=Alert)
+def remember_read_state(sender, instance, **kwargs):
+    """Snapshot the stored read flag so post_save can count the change."""
+    instance._was_read = None
+    if instance.pk:
+        instance._was_read = sender.objects.filter(pk=instance.pk).values_list('is_read', flat=True).first()
+
+
+@receiver(post_save, sender=Alert)
+def alert_saved_counter(sender, instance, created, **kwargs):
+    """Count a new unread alert, or one marked read or unread."""
+    was_unread = getattr(instance, '_was_read', None) is False
+    delta = (not instance.is_read) - was_unread
+    if delta:
+        AlertCounter.apply_deltas({instance.user_id: delta})
+
+
+@receiver(post_delete, sender=Alert)
+def alert_deleted_counter(sender, instance, origin=None, **kwargs):
+    """Uncount a deleted unread alert."""
+    if _deleted_with_user(origin):
+        # The counter is deleted along with the user.
+        return
+    if _purging_alerts.get():
+        return
+    if not instance.is_read:
+        AlertCounter.apply_deltas({instance.user_id: -1})
@@ -0,0 +1,126 @@
+"""
+Server-sent event stream of new alerts.
+
+GET /api/reports/alerts/stream/ keeps the connection open and sends every
+alert created for the user as an 'alert' event, so clients no longer poll
+/alerts/unread/. It authenticates with the same JWT access token as the
+REST API, either in the Authorization header or, for browser EventSource
+clients that cannot set headers, in the ?token= query parameter.
+
+Each event carries the alert id; a reconnecting client sends it back as
+Last-Event-ID (or ?last_event_id=) and receives the alerts it missed. The
+view is async and holds no thread or database connection while idle, so
+it must be served by an ASGI server (daphne, see the Procfile); under WSGI
+the endless response would pin a worker thread, so it answers 501 instead.
+"""
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from reports.events import broker
+from reports.models import Alert
+from reports.serializers import AlertSerializer
+
+
+def _authenticate(request):
+    """Return the user of the request's JWT access token."""
+    auth = get_authorization_header(request).split()
+    if len(auth) == 2 and auth[0].lower() == b'bearer':
+        raw_token = auth[1].decode()
+    elif request.GET.get('token'):
+        raw_token = request.GET['token']
+    else:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except TokenError as error:
+        raise InvalidToken(str(error))
+
+
+def _last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _latest_alert_id(user_id):
+    return Alert.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _alerts_after(user_id, last_id):
+    alerts = Alert.objects.filter(user_id=user_id, id__gt=last_id).order_by('id')
+    return AlertSerializer(alerts, many=True).data
+
+
+def _event(alert):
+    return f'id: {alert["id"]}\nevent: alert\ndata: {json.dumps(alert, default=str)}\n\n'
+
+
+async def _events(user_id, queue, last_id):
+    keepalive = getattr(settings, 'ALERT_STREAM_KEEPALIVE', 20)
+    try:
+        # Tell the client how long to wait before reconnecting.
+        yield 'retry: 3000\n\n'
+        if last_id is None:
+            last_id = await sync_to_async(_latest_alert_id)(user_id)
+        else:
+            # Reconnection: first send what was missed.
+            queue.put_nowait(None)
+        while True:
+            try:
+                await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection.
+                yield ': keepalive\n\n'
+                continue
+            for alert in await sync_to_async(_alerts_after)(user_id, last_id):
+                last_id = alert['id']
+                yield _event(alert)
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+async def alert_stream(request):
+    """
+    Stream the user's new alerts as server-sent events.
+
+    GET /api/reports/alerts/stream/
+
+    Events:
+        event: alert, id: alert id, data: the alert as returned by /alerts/
+
+    Query Parameters:
+        token: JWT access token (when the Authorization header can't be set)
+        last_event_id: Resume after this alert id (same as Last-Event-ID)
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The alert stream needs an ASGI server.'}, status=501)
+    # require_GET does not support async views before Django 5.0.
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except AuthenticationFailed as error:
+        detail = error.detail if isinstance(error.detail, dict) else {'detail': error.detail}
+        return JsonResponse(detail, status=401)
+
+    # Subscribe before reading the last alert id, so no alert created in
+    # between is missed.
+    queue = broker.subscribe(user.id)
+    response = StreamingHttpResponse(
+        _events(user.id, queue, _last_event_id(request)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Disable response buffering in nginx.
+    response['X-Accel-Buffering'] = 'no'
+    return response
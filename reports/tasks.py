@@ -0,0 +1,126 @@
+"""
+Celery tasks for budget checks and alert generation.
+
+check_budgets replaces the cron'd management command: it fans the check
+out to one check_budget_shard task per user shard and records the run in
+BudgetCheckRun once every shard has finished, or as failed when one of
+them raises. evaluate_expense_budgets is
+the on-write evaluation queued by reports.realtime, and
+rebuild_monthly_rollups and rebuild_alert_counters recompute the report
+rollups and the unread alert counters, and purge_alerts applies the alert
+retention policy.
+"""
+import io
+from datetime import date, datetime
+from celery import chord, shared_task
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from reports.budget_checks import (
+    DEFAULT_CHUNK_SIZE,
+    CheckStats,
+    check_covering_budgets,
+    incremental_users,
+    run_checks,
+    shard_users,
+)
+from reports.models import BudgetCheckRun
+
+
+@shared_task
+def check_budgets(incremental=False, shards=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Check every user's budgets and goals, one task per user shard.
+
+    With incremental=True only users changed since the last successful run
+    are checked (all users if there is none).
+
+    Returns:
+        ID of the BudgetCheckRun recording the run
+    """
+    shards = shards or settings.BUDGET_CHECK_SHARDS
+    since = None
+    if incremental:
+        last_run = BudgetCheckRun.last_successful()
+        if last_run:
+            since = last_run.started_at.isoformat()
+
+    run = BudgetCheckRun.objects.create(mode='incremental' if since else 'full')
+    today = date.today().isoformat()
+    callback = finish_budget_check.s(run.id).on_error(fail_budget_check.s(run.id))
+    chord([
+        check_budget_shard.s(shard, shards, today, since, chunk_size) for shard in range(shards)
+    ])(callback)
+    return run.id
+
+
+@shared_task
+def check_budget_shard(shard, shards, today, since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Check the users with id % shards == shard; returns CheckStats.as_dict()."""
+    today = date.fromisoformat(today)
+    users = User.objects.all()
+    if since:
+        users = incremental_users(datetime.fromisoformat(since), today, users)
+    return run_checks(shard_users(users, shard, shards), today, chunk_size).as_dict()
+
+
+@shared_task
+def finish_budget_check(results, run_id):
+    """Chord callback: mark the run as succeeded with the merged shard counters."""
+    stats = CheckStats()
+    for result in results:
+        stats.merge(CheckStats.from_dict(result))
+    BudgetCheckRun.objects.filter(id=run_id).update(
+        finished_at=timezone.now(),
+        succeeded=True,
+        users=stats.users,
+        alerts=stats.alerts
+    )
+    return stats.as_dict()
+
+
+@shared_task
+def fail_budget_check(request, exc, traceback, run_id):
+    """Chord errback: close the run as failed when a shard (or the callback) raises."""
+    BudgetCheckRun.objects.filter(id=run_id, finished_at__isnull=True).update(
+        finished_at=timezone.now(),
+        succeeded=False,
+        error=f'{type(exc).__name__}: {exc}'
+    )
+
+
+@shared_task(ignore_result=True)
+def evaluate_expense_budgets(user_id, keys):
+    """
+    Evaluate a user's budgets covering (category_id, ISO date) pairs.
+
+    Returns:
+        Number of alerts emitted
+    """
+    keys = [(category_id, date.fromisoformat(day)) for category_id, day in keys]
+    return len(check_covering_budgets(user_id, keys))
+
+
+@shared_task
+def rebuild_monthly_rollups(user_id=None):
+    """Recompute the monthly rollup table (see the rebuild_monthly_rollups command)."""
+    out = io.StringIO()
+    call_command('rebuild_monthly_rollups', user_id=user_id, stdout=out)
+    return out.getvalue().strip()
+
+
+@shared_task
+def rebuild_alert_counters(user_id=None):
+    """Recount the unread alert counters (see the rebuild_alert_counters command)."""
+    out = io.StringIO()
+    call_command('rebuild_alert_counters', user_id=user_id, stdout=out)
+    return out.getvalue().strip()
+
+
+@shared_task
+def purge_alerts():
+    """Delete expired and surplus alerts (see the purge_alerts command)."""
+    out = io.StringIO()
+    call_command('purge_alerts', stdout=out)
+    return out.getvalue().strip()
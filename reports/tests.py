@@ -0,0 +1,442 @@
+import io
+import json
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from budgets.models import Budget, Category
+from reports.budget_checks import check_covering_budgets, run_checks
+from reports.cache import bump_versions, cached_report
+from reports.events import broker
+from reports.logic import (
+    get_budget_status,
+    get_category_breakdown,
+    get_monthly_summary,
+    get_spending_projection,
+)
+from reports.models import Alert, AlertCounter, BudgetCheckRun
+from reports.streams import _events, alert_stream
+from reports.tasks import check_budgets
+from sentinel_tracker.concurrency import run_concurrently
+from sentinel_tracker.periods import Period
+from sentinel_tracker.testing import QueryPlanTestCase
+from transactions.models import Expense, Income
+
+
+class AlertIndexTests(QueryPlanTestCase):
+    """Unread-alert lookups use the partial (user) WHERE NOT is_read index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='planner')
+        first_day = date(2020, 1, 1)
+        Alert.objects.bulk_create([
+            Alert(
+                user=cls.user, title='Alert', message='Message', alert_type='info',
+                related_category='Food', evaluated_on=first_day + timedelta(days=index),
+                is_read=index % 100 != 0
+            )
+            for index in range(5000)
+        ])
+        cls.analyze(Alert)
+
+    def test_unread_alerts_use_partial_index(self):
+        self.assertUsesIndex(Alert.objects.filter(user=self.user, is_read=False), 'alert_user_unread_idx')
+
+
+class BudgetStatusQueryCountTests(TestCase):
+    """get_budget_status reads every active budget and its spending in one statement."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='budgeter')
+        month = Period.current_month()
+        for index in range(5):
+            category = Category.objects.create(user=cls.user, name=f'Category {index}', type='expense')
+            Budget.objects.create(
+                user=cls.user, category=category, limit_amount=Decimal('100.00'),
+                start_date=month.start, end_date=month.last_day
+            )
+            for day in range(3):
+                Expense.objects.create(
+                    user=cls.user, category=category, amount=Decimal(20 * index),
+                    date=month.start + timedelta(days=day)
+                )
+
+    def test_budget_status_is_one_statement(self):
+        with self.assertNumQueries(1):
+            status = get_budget_status(self.user)
+        self.assertEqual(status['total_active_budgets'], 5)
+        self.assertEqual(status['exceeded_count'], 3)
+        self.assertEqual(sorted(budget['spent'] for budget in status['budgets']), [0, 60, 120, 180, 240])
+
+
+class DailyAlertRuleTests(TestCase):
+    """Alerts are de-duplicated per rule, not per alert type."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='spender')
+        cls.today = date(2024, 6, 20)
+        cls.category = Category.objects.create(user=cls.user, name='Food', type='expense')
+        Budget.objects.create(
+            user=cls.user, category=cls.category, limit_amount=Decimal('100.00'),
+            start_date=date(2024, 6, 1), end_date=date(2024, 6, 30)
+        )
+        cls.expense = Expense.objects.create(
+            user=cls.user, category=cls.category, amount=Decimal('80.00'), date=date(2024, 6, 10)
+        )
+
+    def test_overspend_after_at_risk_alert_creates_exceeded_alert(self):
+        run_checks(User.objects.filter(id=self.user.id), self.today)
+        self.assertEqual(list(Alert.objects.values_list('rule', flat=True)), ['budget_at_risk'])
+
+        Expense.objects.create(user=self.user, category=self.category, amount=Decimal('30.00'), date=self.today)
+        check_covering_budgets(self.user.id, [(self.category.id, self.today)], self.today)
+
+        self.assertEqual(
+            sorted(Alert.objects.values_list('rule', 'alert_type')),
+            [('budget_at_risk', 'danger'), ('budget_exceeded', 'danger')]
+        )
+
+    def test_repeated_checks_do_not_duplicate_alerts(self):
+        run_checks(User.objects.filter(id=self.user.id), self.today)
+        run_checks(User.objects.filter(id=self.user.id), self.today)
+        check_covering_budgets(self.user.id, [(self.category.id, self.today)], self.today)
+        self.assertEqual(Alert.objects.count(), 1)
+
+
+class BudgetCheckRunFailureTests(TestCase):
+    """A failing shard closes the run as failed instead of leaving it open."""
+
+    @mock.patch('reports.tasks.chord')
+    def test_shard_failure_marks_run_failed(self, chord):
+        run_id = check_budgets.run(shards=2)
+        callback = chord.return_value.call_args.args[0]
+        callback.freeze()
+
+        # What the result backend does when a chord header task fails.
+        try:
+            raise ValueError('shard 1 failed')
+        except ValueError as exc:
+            check_budgets.app.backend.chord_error_from_stack(callback, exc)
+
+        run = BudgetCheckRun.objects.get(id=run_id)
+        self.assertIsNotNone(run.finished_at)
+        self.assertFalse(run.succeeded)
+        self.assertEqual(run.error, 'ValueError: shard 1 failed')
+        self.assertIsNone(BudgetCheckRun.last_successful())
+
+
+class PurgeAlertsTests(TestCase):
+    """purge_alerts compacts per rule and keeps the unread counters exact."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='reader')
+
+    def alert(self, rule, day, is_read=False):
+        return Alert.objects.create(
+            user=self.user, title=rule, message=rule, alert_type='danger', is_read=is_read,
+            related_category='Food', rule=rule, evaluated_on=day
+        )
+
+    def unread(self):
+        return AlertCounter.for_user(self.user.id).unread
+
+    def test_compaction_keeps_one_alert_per_rule(self):
+        for day in (1, 2, 3):
+            self.alert('budget_at_risk', date(2024, 6, day))
+        for day in (4, 5):
+            self.alert('budget_exceeded', date(2024, 6, day))
+        self.assertEqual(self.unread(), 5)
+
+        call_command('purge_alerts', compact=True, batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(Alert.objects.values_list('rule', 'occurrences')),
+            [('budget_at_risk', 3), ('budget_exceeded', 2)]
+        )
+        self.assertEqual(self.unread(), 2)
+
+    def test_queryset_delete_outside_purge_updates_counter(self):
+        self.alert('budget_at_risk', date(2024, 6, 1))
+        self.alert('budget_exceeded', date(2024, 6, 1))
+        self.assertEqual(self.unread(), 2)
+
+        Alert.objects.filter(rule='budget_at_risk').delete()
+
+        self.assertEqual(self.unread(), 1)
+
+    def test_batch_size_must_be_positive(self):
+        with self.assertRaises(CommandError):
+            call_command('purge_alerts', batch_size=0, stdout=io.StringIO())
+
+
+class ReportCacheTests(APITestCase):
+    """Cached reports are reused until a write commits, then recomputed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='cached')
+        Income.objects.create(user=cls.user, amount=Decimal('500.00'), date=date(2024, 6, 1))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def summary(self):
+        response = self.client.get('/api/reports/summary/', {'year': 2024, 'month': 6})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    @mock.patch('reports.views.get_monthly_summary', wraps=get_monthly_summary)
+    def test_write_invalidates_cached_report(self, compute):
+        self.assertEqual(self.summary()['total_expense'], 0)
+        self.assertEqual(self.summary()['total_expense'], 0)
+        self.assertEqual(compute.call_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/transactions/expenses/', {'amount': '40.00', 'date': '2024-06-02'}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.summary()['total_expense'], 40.0)
+        self.assertEqual(compute.call_count, 2)
+
+
+class AlertConditionalGetTests(APITestCase):
+    """Alerts created outside a request change the alerts ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='polling')
+        cls.today = date(2024, 6, 20)
+        cls.category = Category.objects.create(user=cls.user, name='Food', type='expense')
+        Budget.objects.create(
+            user=cls.user, category=cls.category, limit_amount=Decimal('100.00'),
+            start_date=date(2024, 6, 1), end_date=date(2024, 6, 30)
+        )
+        Expense.objects.create(user=cls.user, category=cls.category, amount=Decimal('80.00'), date=date(2024, 6, 10))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def assertChangedSince(self, url, etag, count):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], count)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        return response['ETag']
+
+    def test_checks_outside_the_request_invalidate_etags(self):
+        urls = ['/api/reports/alerts/unread/', '/api/reports/alerts/unread_count/']
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        for url in urls:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            run_checks(User.objects.filter(id=self.user.id), self.today)
+        etags = {url: self.assertChangedSince(url, etags[url], 1) for url in urls}
+
+        Expense.objects.create(user=self.user, category=self.category, amount=Decimal('30.00'), date=self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            check_covering_budgets(self.user.id, [(self.category.id, self.today)], self.today)
+        for url in urls:
+            self.assertChangedSince(url, etags[url], 2)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Concurrent misses of one report share a single computation."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(id=1)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def slow(self, result):
+        def compute():
+            self.started.set()
+            self.release.wait(5)
+            return result
+        return compute
+
+    def in_thread(self, compute):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(cached_report(self.user, 'summary', {}, compute)))
+        thread.start()
+        self.started.wait(5)
+        return thread, results
+
+    def test_concurrent_miss_reuses_the_lock_holders_result(self):
+        holder, held = self.in_thread(self.slow('first'))
+        sleep = time.sleep
+        compute = mock.Mock()
+        # Let the lock holder finish once this request is waiting for it.
+        with mock.patch('reports.cache.time.sleep', side_effect=lambda s: self.release.set() or sleep(s)):
+            self.assertEqual(cached_report(self.user, 'summary', {}, compute), 'first')
+        holder.join()
+
+        self.assertEqual(held, ['first'])
+        compute.assert_not_called()
+
+    @override_settings(REPORT_CACHE_LOCK_WAIT=0.1)
+    def test_waiter_computes_when_the_lock_holder_is_slow(self):
+        holder, held = self.in_thread(self.slow('first'))
+        self.assertEqual(cached_report(self.user, 'summary', {}, lambda: 'second'), 'second')
+        self.release.set()
+        holder.join()
+        self.assertEqual(held, ['first'])
+
+    @override_settings(REPORT_CACHE_STALE_WHILE_REVALIDATE=True)
+    def test_stale_while_revalidate_returns_the_previous_version(self):
+        cached_report(self.user, 'summary', {}, lambda: 'old')
+        bump_versions([self.user.id])
+
+        holder, held = self.in_thread(self.slow('new'))
+        self.assertEqual(cached_report(self.user, 'summary', {}, mock.Mock()), 'old')
+        self.release.set()
+        holder.join()
+        self.assertEqual(held, ['new'])
+        self.assertEqual(cached_report(self.user, 'summary', {}, mock.Mock()), 'new')
+
+
+class DashboardTests(APITransactionTestCase):
+    """Dashboard sections computed on the thread pool match sequential ones."""
+
+    def setUp(self):
+        cache.clear()
+        today = date.today()
+        self.user = User.objects.create(username='dashboard')
+        food = Category.objects.create(user=self.user, name='Food', type='expense')
+        rent = Category.objects.create(user=self.user, name='Rent', type='expense')
+        Budget.objects.create(
+            user=self.user, category=food, limit_amount=Decimal('100.00'),
+            start_date=today.replace(day=1), end_date=today + timedelta(days=30)
+        )
+        Income.objects.create(user=self.user, amount=Decimal('900.00'), date=today)
+        Expense.objects.create(user=self.user, category=food, amount=Decimal('45.50'), date=today)
+        Expense.objects.create(user=self.user, category=rent, amount=Decimal('400.00'), date=today)
+        self.client.force_authenticate(self.user)
+
+    def test_sections_match_sequential_results(self):
+        response = self.client.get('/api/reports/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'summary': get_monthly_summary(self.user, None, None),
+            'breakdown': get_category_breakdown(self.user, None, None),
+            'budget_status': get_budget_status(self.user),
+            'spending_projection': get_spending_projection(self.user),
+        })
+        self.assertEqual(response.data['budget_status']['budgets'][0]['spent'], Decimal('45.50'))
+
+    def test_failure_is_raised_after_every_section_finished(self):
+        finished = []
+
+        def fail():
+            raise ValueError('section failed')
+
+        def slow():
+            time.sleep(0.05)
+            finished.append('slow')
+
+        with self.assertRaisesMessage(ValueError, 'section failed'):
+            run_concurrently({'fail': fail, 'slow': slow})
+        self.assertEqual(finished, ['slow'])
+
+
+class AlertStreamTests(TestCase):
+    """The alert stream is served under ASGI as framed server-sent events."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='streaming')
+        cls.alerts = [
+            Alert.objects.create(user=cls.user, title=title, message=title, alert_type='warning')
+            for title in ('First', 'Second')
+        ]
+
+    def assertAlertEvent(self, chunk, alert):
+        self.assertTrue(chunk.endswith('\n\n'), chunk)
+        alert_id, event, data = chunk[:-2].split('\n')
+        self.assertEqual((alert_id, event), (f'id: {alert.id}', 'event: alert'))
+        self.assertTrue(data.startswith('data: '), data)
+        data = json.loads(data[len('data: '):])
+        self.assertEqual((data['id'], data['title']), (alert.id, alert.title))
+
+    def test_wsgi_request_is_not_implemented(self):
+        response = self.client.get('/api/reports/alerts/stream/')
+        self.assertEqual(response.status_code, 501)
+
+    async def test_reconnect_replays_missed_alerts(self):
+        request = AsyncRequestFactory().get(
+            '/api/reports/alerts/stream/', {'last_event_id': self.alerts[0].id - 1},
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        )
+        response = await alert_stream(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        content = response.streaming_content
+        chunks = [(await anext(content)).decode() for _ in range(3)]
+        await content.aclose()
+
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        for chunk, alert in zip(chunks[1:], self.alerts):
+            self.assertAlertEvent(chunk, alert)
+
+    @override_settings(ALERT_STREAM_KEEPALIVE=0.01)
+    async def test_stream_sends_keepalives_and_new_alerts(self):
+        queue = broker.subscribe(self.user.id)
+        events = _events(self.user.id, queue, None)
+        self.assertEqual(await anext(events), 'retry: 3000\n\n')
+        self.assertEqual(await anext(events), ': keepalive\n\n')
+
+        alert = await sync_to_async(Alert.objects.create)(
+            user=self.user, title='Third', message='Third', alert_type='danger'
+        )
+        broker.deliver([self.user.id])
+        self.assertAlertEvent(await anext(events), alert)
+
+        await events.aclose()
+        self.assertNotIn(self.user.id, broker._subscribers)
+
+
+class MarkAsReadTests(APITestCase):
+    """Marking an alert as read moves the unread counter exactly once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='marking')
+        cls.alert = Alert.objects.create(user=cls.user, title='Over', message='Over', alert_type='danger')
+        Alert.objects.create(user=cls.user, title='Other', message='Other', alert_type='info')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_mark_as_read_counts_once(self):
+        url = f'/api/reports/alerts/{self.alert.id}/mark_as_read/'
+        etag = self.client.get('/api/reports/alerts/unread_count/')['ETag']
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['is_read'])
+
+        self.assertEqual(AlertCounter.for_user(self.user.id).unread, 1)
+        response = self.client.get('/api/reports/alerts/unread_count/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.data), (200, {'count': 1}))
@@ -2,11 +2,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from reports import views
+from reports.streams import alert_stream
 
 router = DefaultRouter()
 router.register(r'alerts', views.AlertViewSet, basename='alert')
 router.register(r'', views.ReportViewSet, basename='report')
 
 urlpatterns = [
+    path('alerts/stream/', alert_stream, name='alert-stream'),
     path('', include(router.urls)),
 ]
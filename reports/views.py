@@ -1,10 +1,17 @@
 """Reports app views."""
+from datetime import date
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from reports.models import Alert
+from reports.cache import bump_versions_on_commit, cached_report, conditional_on
+from reports.models import Alert, AlertCounter
+from sentinel_tracker.concurrency import run_concurrently
+from sentinel_tracker.pagination import KeysetPagination
+from sentinel_tracker.periods import Period
 from reports.serializers import AlertSerializer
 from reports.logic import (
     get_monthly_summary,
@@ -14,6 +21,20 @@ from reports.logic import (
 )
 
 
+def requested_year_month(request):
+    """Validated ?year=&month= query parameters; missing ones stay None."""
+    year = request.query_params.get('year')
+    month = request.query_params.get('month')
+    today = date.today()
+    try:
+        year = int(year) if year else None
+        month = int(month) if month else None
+        Period.month(today.year if year is None else year, today.month if month is None else month)
+    except ValueError:
+        raise ValidationError({'error': 'Invalid year or month'})
+    return year, month
+
+
 class AlertViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing financial alerts.
@@ -31,12 +52,16 @@ class AlertViewSet(viewsets.ModelViewSet):
     - mark_as_read: POST /api/alerts/{id}/mark_as_read/ - Mark single alert as read
     - mark_all_as_read: POST /api/alerts/mark_all_as_read/ - Mark all alerts as read
     - unread: GET /api/alerts/unread/ - Get all unread alerts
+    - unread_count: GET /api/alerts/unread_count/ - Get the number of unread alerts
     
     Filters: alert_type, is_read
     Ordering: created_at
+    Pagination: ?page=N, or ?cursor= for constant-cost keyset pages
     """
     serializer_class = AlertSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-created_at', '-id']
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['alert_type', 'is_read']
     ordering_fields = ['created_at']
@@ -58,9 +83,15 @@ class AlertViewSet(viewsets.ModelViewSet):
         Returns: Updated alert object
         """
         alert = self.get_object()
-        alert.is_read = True
-        alert.save()
-        return Response(AlertSerializer(alert).data)
+        with transaction.atomic():
+            counters = AlertCounter.lock([request.user.id])
+            # Only the request that flips is_read moves the counter, so
+            # concurrent or repeated calls count the alert once.
+            if self.get_queryset().filter(pk=alert.pk, is_read=False).update(is_read=True):
+                AlertCounter.apply_locked_deltas(counters, {request.user.id: -1})
+                bump_versions_on_commit([request.user.id], 'alerts')
+        alert.refresh_from_db()
+        return Response(self.get_serializer(alert).data)
 
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
@@ -69,25 +100,44 @@ class AlertViewSet(viewsets.ModelViewSet):
         
         Returns: Count of alerts marked as read
         """
-        alerts = self.get_queryset().filter(is_read=False)
-        alerts.update(is_read=True)
+        with transaction.atomic():
+            counters = AlertCounter.lock([request.user.id])
+            marked = self.get_queryset().filter(is_read=False).update(is_read=True)
+            AlertCounter.apply_locked_deltas(counters, {request.user.id: -marked})
+            bump_versions_on_commit([request.user.id], 'alerts')
         return Response({
-            'message': f'{alerts.count()} alerts marked as read'
+            'message': f'{marked} alerts marked as read'
         })
 
     @action(detail=False, methods=['get'])
+    @conditional_on('alerts')
     def unread(self, request):
         """
         Get all unread alerts for the user.
         
+        Supports conditional GET (ETag / Last-Modified).
+
         Returns: Count and list of unread alerts
         """
         unread_alerts = self.get_queryset().filter(is_read=False)
         return Response({
             'count': unread_alerts.count(),
-            'alerts': AlertSerializer(unread_alerts, many=True).data
+            'alerts': self.get_serializer(unread_alerts, many=True).data
         })
 
+    @action(detail=False, methods=['get'])
+    @conditional_on('alerts')
+    def unread_count(self, request):
+        """
+        Get the number of unread alerts, for badges.
+
+        Reads the user's AlertCounter row instead of counting alerts.
+        Supports conditional GET (ETag / Last-Modified).
+
+        Returns: Count of unread alerts
+        """
+        return Response({'count': AlertCounter.for_user(request.user.id).unread})
+
 
 class ReportViewSet(viewsets.ViewSet):
     """
@@ -102,6 +152,9 @@ class ReportViewSet(viewsets.ViewSet):
     - budget_status: GET /api/reports/budget_status/ - Status of all active budgets
     - spending_projection: GET /api/reports/spending_projection/?category=ID - Projected spending
     - dashboard: GET /api/reports/dashboard/ - Complete dashboard overview
+
+    Results are cached per user and invalidated by any write to the user's
+    transactions, budgets, goals or categories (see reports.cache).
     """
     permission_classes = [IsAuthenticated]
 
@@ -116,15 +169,12 @@ class ReportViewSet(viewsets.ViewSet):
         
         Returns: Total income, total expenses, net, and month/year info
         """
-        year = request.query_params.get('year')
-        month = request.query_params.get('month')
+        year, month = requested_year_month(request)
 
-        if year:
-            year = int(year)
-        if month:
-            month = int(month)
-
-        summary = get_monthly_summary(request.user, year, month)
+        summary = cached_report(
+            request.user, 'summary', {'year': year, 'month': month},
+            lambda: get_monthly_summary(request.user, year, month)
+        )
         return Response(summary)
 
     @action(detail=False, methods=['get'])
@@ -138,15 +188,12 @@ class ReportViewSet(viewsets.ViewSet):
         
         Returns: Dictionary with each category showing total spent and percentage
         """
-        year = request.query_params.get('year')
-        month = request.query_params.get('month')
-
-        if year:
-            year = int(year)
-        if month:
-            month = int(month)
+        year, month = requested_year_month(request)
 
-        breakdown = get_category_breakdown(request.user, year, month)
+        breakdown = cached_report(
+            request.user, 'breakdown', {'year': year, 'month': month},
+            lambda: get_category_breakdown(request.user, year, month)
+        )
         return Response(breakdown)
 
     @action(detail=False, methods=['get'])
@@ -156,7 +203,10 @@ class ReportViewSet(viewsets.ViewSet):
         
         Returns: List of budgets with spent amount, remaining, and percentage
         """
-        status_data = get_budget_status(request.user)
+        status_data = cached_report(
+            request.user, 'budget_status', {},
+            lambda: get_budget_status(request.user)
+        )
         return Response(status_data)
 
     @action(detail=False, methods=['get'])
@@ -182,32 +232,33 @@ class ReportViewSet(viewsets.ViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-        projection = get_spending_projection(request.user, category)
+        projection = cached_report(
+            request.user, 'spending_projection', {'category': category.id if category else None},
+            lambda: get_spending_projection(request.user, category)
+        )
         return Response(projection)
 
     @action(detail=False, methods=['get'])
+    @conditional_on('reports', daily=True)
     def dashboard(self, request):
         """
         Get comprehensive dashboard data.
         
         Combines summary, breakdown, and budget status.
+        Supports conditional GET (ETag / Last-Modified).
         """
-        year = request.query_params.get('year')
-        month = request.query_params.get('month')
+        year, month = requested_year_month(request)
 
-        if year:
-            year = int(year)
-        if month:
-            month = int(month)
+        def build_dashboard():
+            # The sections are independent, so they run concurrently and the
+            # latency is close to that of the slowest one.
+            return run_concurrently({
+                'summary': lambda: get_monthly_summary(request.user, year, month),
+                'breakdown': lambda: get_category_breakdown(request.user, year, month),
+                'budget_status': lambda: get_budget_status(request.user),
+                'spending_projection': lambda: get_spending_projection(request.user),
+            }, execute_wrapper=getattr(request, 'timing', None))
 
-        summary = get_monthly_summary(request.user, year, month)
-        breakdown = get_category_breakdown(request.user, year, month)
-        budget_status = get_budget_status(request.user)
-        projection = get_spending_projection(request.user)
-
-        return Response({
-            'summary': summary,
-            'breakdown': breakdown,
-            'budget_status': budget_status,
-            'spending_projection': projection,
-        })
+        return Response(cached_report(
+            request.user, 'dashboard', {'year': year, 'month': month}, build_dashboard
+        ))
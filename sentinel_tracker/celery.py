@@ -0,0 +1,18 @@
+"""
+Celery application for background jobs.
+
+Tasks are defined in each app's tasks.py and discovered automatically.
+Configuration is read from the CELERY_* Django settings.
+
+Usage:
+    celery -A sentinel_tracker worker -l info
+    celery -A sentinel_tracker beat -l info
+"""
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sentinel_tracker.settings')
+
+app = Celery('sentinel_tracker')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,50 @@
+"""
+Concurrent execution of independent database-bound computations.
+
+Django's async ORM in this version runs every query through
+sync_to_async on one shared thread, so it cannot overlap queries, and DRF
+views are synchronous. Independent computations (such as the sections of
+the dashboard) are instead run on a bounded, process-wide thread pool.
+Each pool thread uses its own database connection, which is recycled the
+same way Django recycles request connections (CONN_MAX_AGE, broken
+connections).
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'CONCURRENT_QUERY_WORKERS', 8),
+    thread_name_prefix='concurrent-query'
+)
+
+
+def _call(func, execute_wrapper):
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            if execute_wrapper is not None:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(execute_wrapper))
+            return func()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(funcs, execute_wrapper=None):
+    """
+    Run callables concurrently and return their results.
+
+    Args:
+        funcs: Dict of name -> callable without arguments
+        execute_wrapper: Optional database execute_wrapper installed in the
+            worker threads, e.g. the request's RequestTiming
+
+    Returns:
+        Dict of name -> result, in the order of funcs. Once all of them
+        finished, the exception of the first failed callable is re-raised.
+    """
+    futures = {name: _executor.submit(_call, func, execute_wrapper) for name, func in funcs.items()}
+    wait(futures.values())
+    return {name: future.result() for name, future in futures.items()}
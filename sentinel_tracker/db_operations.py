@@ -0,0 +1,30 @@
+"""Custom migration operations."""
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    Create an index with CREATE INDEX CONCURRENTLY on PostgreSQL.
+
+    Unlike django.contrib.postgres.operations.AddIndexConcurrently this
+    falls back to a regular CREATE INDEX on other databases, so the same
+    migration runs on a local SQLite database. Migrations using it must set
+    atomic = False.
+    """
+    atomic = False
+
+    def describe(self):
+        return "Concurrently create index %s on %s" % (self.index.name, self.model_name)
+
+    def _concurrently(self, schema_editor):
+        return {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, **self._concurrently(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, **self._concurrently(schema_editor))
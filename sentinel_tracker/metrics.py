@@ -0,0 +1,145 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Metrics are kept per process and aggregated by Prometheus across workers
+(scrape each worker, or sum by instance). Recording a value takes a lock
+and a bisect over a handful of buckets, so it is cheap enough to leave on
+for every request.
+"""
+import bisect
+import threading
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+REGISTRY = []
+
+
+def _format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+
+
+class Histogram:
+    """Bucketed observations per label set, like prometheus_client.Histogram."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, labels, value):
+        # Index len(buckets) is the +Inf bucket.
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = {
+                labels: (list(series['counts']), series['sum'])
+                for labels, series in self._series.items()
+            }
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_value(float(bound))
+                yield (
+                    f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", le)])} '
+                    f'{cumulative}'
+                )
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}'
+
+
+def render():
+    """Return every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_LABELS = ('method', 'endpoint')
+
+requests_total = Counter(
+    'http_requests_total',
+    'HTTP requests by endpoint and status code.',
+    REQUEST_LABELS + ('status',)
+)
+request_duration = Histogram(
+    'http_request_duration_seconds',
+    'Total time spent handling the request.',
+    REQUEST_LABELS
+)
+request_db_duration = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent executing SQL during the request.',
+    REQUEST_LABELS
+)
+request_db_queries = Histogram(
+    'http_request_db_queries',
+    'Number of SQL queries executed during the request.',
+    REQUEST_LABELS,
+    buckets=QUERY_COUNT_BUCKETS
+)
+request_serialize_duration = Histogram(
+    'http_request_serialize_duration_seconds',
+    'Time spent in serializer to_representation, including the queries it runs.',
+    REQUEST_LABELS
+)
+request_render_duration = Histogram(
+    'http_request_render_duration_seconds',
+    'Time spent encoding the response body.',
+    REQUEST_LABELS
+)
+report_cache_requests = Counter(
+    'report_cache_requests_total',
+    'Report cache lookups by endpoint and result (hit, miss, coalesced or stale).',
+    ('endpoint', 'result')
+)
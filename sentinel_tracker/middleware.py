@@ -0,0 +1,151 @@
+"""
+Per-request instrumentation middleware.
+
+Records the number of SQL queries, the time spent in SQL, in serializers,
+in the view and in rendering the response for every request, and
+publishes them as:
+
+- a Server-Timing response header (visible in the browser dev tools),
+- one structured JSON log line on the 'sentinel_tracker.requests' logger,
+- per-endpoint histograms served by the /metrics endpoint.
+
+Queries are timed with a connection execute_wrapper, so the cost per query
+is two perf_counter() calls. Queries run on worker threads for the request
+(sentinel_tracker.concurrency) are included, so the SQL time can exceed the
+wall time.
+
+Serialization is timed by SerializationTimingMixin around the outermost
+to_representation call of each serializer, so lazy queries a serializer
+runs (N+1) count as serialization time as well as SQL time. View time is
+what remains after serialization and rendering.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import ListSerializer
+from sentinel_tracker import metrics
+
+logger = logging.getLogger('sentinel_tracker.requests')
+
+
+class RequestTiming:
+    """Timings collected for a single request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute_wrapper counting and timing each query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.db_time += elapsed
+                self.queries += 1
+
+    def serialized(self, seconds):
+        """Add time spent in a serializer's to_representation."""
+        with self._lock:
+            self.serialize_time += seconds
+
+    def rendered(self, response):
+        """Post-render callback; must return None to keep the response."""
+        self.render_time = time.perf_counter() - self.render_started
+
+
+class RequestMetricsMiddleware:
+    """
+    Instrument each request with query count, SQL, serialize, view and render time.
+
+    Should be the first entry in MIDDLEWARE so the timings cover the whole
+    middleware stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.log_requests = getattr(settings, 'REQUEST_METRICS_LOG', True)
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timing))
+            response = self.get_response(request)
+        total = time.perf_counter() - timing.started
+        view_time = total - timing.render_time - timing.serialize_time
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timing.db_time * 1000:.1f};desc="{timing.queries} queries"',
+            f'serialize;dur={timing.serialize_time * 1000:.1f}',
+            f'view;dur={view_time * 1000:.1f}',
+            f'render;dur={timing.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else 'unmatched'
+        labels = (request.method, endpoint)
+        metrics.requests_total.inc(labels + (str(response.status_code),))
+        metrics.request_duration.observe(labels, total)
+        metrics.request_db_duration.observe(labels, timing.db_time)
+        metrics.request_db_queries.observe(labels, timing.queries)
+        metrics.request_serialize_duration.observe(labels, timing.serialize_time)
+        metrics.request_render_duration.observe(labels, timing.render_time)
+
+        if self.log_requests:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 1),
+                'serialize_ms': round(timing.serialize_time * 1000, 1),
+                'view_ms': round(view_time * 1000, 1),
+                'render_ms': round(timing.render_time * 1000, 1),
+                'db_ms': round(timing.db_time * 1000, 1),
+                'db_queries': timing.queries,
+            }))
+        return response
+
+    def process_template_response(self, request, response):
+        # Called last of all middleware, right before the response is
+        # rendered; DRF encodes the response body during render().
+        timing = request.timing
+        timing.render_started = time.perf_counter()
+        response.add_post_render_callback(timing.rendered)
+        return response
+
+
+class SerializationTimingMixin:
+    """
+    Serializer mixin adding to_representation time to the request's timing.
+
+    Only the outermost serializer of a response is timed (a top-level
+    serializer, or the items of a top-level many=True list), so nested
+    serializers are not counted twice. Serializers without a request in
+    their context are not timed.
+    """
+
+    def to_representation(self, instance):
+        parent = self.parent
+        outermost = parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
+        timing = getattr(self.context.get('request'), 'timing', None) if outermost else None
+        if timing is None:
+            return super().to_representation(instance)
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timing.serialized(time.perf_counter() - started)
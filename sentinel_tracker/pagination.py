@@ -0,0 +1,149 @@
+"""Pagination classes shared by the API viewsets."""
+import base64
+import json
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Requests without a `cursor` query parameter are paginated exactly like
+    PageNumberPagination. Sending `?cursor=` (empty for the first page)
+    switches to keyset mode: rows are ordered by the view's
+    `keyset_ordering` (which must end in a unique field such as id) and
+    each page is fetched with a `WHERE (keys) < (last keys) LIMIT n`
+    range query. The cost of a page does not depend on how deep it is, and
+    no COUNT(*) runs unless `?count=true` is passed.
+
+    Keyset pages ignore the `ordering` query parameter.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_mode = (
+            self.cursor_query_param in request.query_params
+            and getattr(view, 'keyset_ordering', None) is not None
+        )
+        if not self.keyset_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = list(view.keyset_ordering)
+        page_size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request, queryset.model)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = queryset.count()
+
+        ordering = self._invert(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_values = self.previous_values = None
+        if rows:
+            first, last = self._keys(rows[0]), self._keys(rows[-1])
+            if reverse:
+                self.next_values = last
+                self.previous_values = first if has_more else None
+            else:
+                self.next_values = last if has_more else None
+                self.previous_values = first if values is not None else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+
+        payload = {
+            'next': self.encode_cursor(self.next_values, reverse=False),
+            'previous': self.encode_cursor(self.previous_values, reverse=True),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def decode_cursor(self, request, model):
+        """
+        Return (key values, reverse) for the requested cursor.
+
+        Values are converted with the ordering fields' to_python, so a
+        tampered cursor is rejected here instead of reaching the query.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            values, reverse = data['v'], bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, values, reverse):
+        if values is None:
+            return None
+        data = json.dumps({'v': values, 'r': 1} if reverse else {'v': values}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def _keys(self, obj):
+        """Cursor values of an object, in JSON-safe form."""
+        keys = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            keys.append(value)
+        return keys
+
+    @staticmethod
+    def _invert(ordering):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+    @staticmethod
+    def _after(ordering, values):
+        """
+        Build the row-value comparison `(k1, k2, ...) > (v1, v2, ...)` in
+        the direction of each key as an OR of equality prefixes.
+        """
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            prefix = {
+                ordering[i].lstrip('-'): values[i]
+                for i in range(index)
+            }
+            condition |= Q(**prefix, **{f'{name}__{lookup}': values[index]})
+        return condition
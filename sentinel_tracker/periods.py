@@ -0,0 +1,103 @@
+"""
+Calendar periods as half-open date ranges.
+
+Filtering with date__year / date__month compiles to EXTRACT() calls that
+cannot use an index on the date column. A Period turns a month, week,
+quarter, year or custom range into `date >= start AND date < end`, which
+the (user, date) indexes can serve with a range scan.
+"""
+from datetime import date, timedelta
+
+
+class Period:
+    """A half-open date range: start <= day < end."""
+
+    def __init__(self, start, end):
+        if end <= start:
+            raise ValueError('Period end must be after its start.')
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f'Period({self.start.isoformat()}, {self.end.isoformat()})'
+
+    def __eq__(self, other):
+        return isinstance(other, Period) and (self.start, self.end) == (other.start, other.end)
+
+    def __hash__(self):
+        return hash((self.start, self.end))
+
+    def __contains__(self, day):
+        return self.start <= day < self.end
+
+    @classmethod
+    def month(cls, year, month):
+        year, month = int(year), int(month)
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return cls(start, end)
+
+    @classmethod
+    def week(cls, year, week):
+        """ISO week (Monday to Sunday)."""
+        start = date.fromisocalendar(int(year), int(week), 1)
+        return cls(start, start + timedelta(days=7))
+
+    @classmethod
+    def quarter(cls, year, quarter):
+        quarter = int(quarter)
+        if not 1 <= quarter <= 4:
+            raise ValueError('Quarter must be between 1 and 4.')
+        start = date(int(year), 3 * quarter - 2, 1)
+        end = date(int(year) + 1, 1, 1) if quarter == 4 else date(int(year), 3 * quarter + 1, 1)
+        return cls(start, end)
+
+    @classmethod
+    def year(cls, year):
+        return cls(date(int(year), 1, 1), date(int(year) + 1, 1, 1))
+
+    @classmethod
+    def between(cls, first_day, last_day):
+        """Custom range including both first_day and last_day."""
+        return cls(first_day, last_day + timedelta(days=1))
+
+    @classmethod
+    def current_month(cls, today=None):
+        today = today or date.today()
+        return cls.month(today.year, today.month)
+
+    @classmethod
+    def from_params(cls, params, today=None):
+        """
+        Build a period from request query parameters.
+
+        Accepts from/to (inclusive ISO dates), year+week, year+quarter,
+        year+month or year alone. Missing year/month default to the current
+        month. Raises ValueError for invalid values.
+        """
+        today = today or date.today()
+        if params.get('from') or params.get('to'):
+            first_day = date.fromisoformat(params['from']) if params.get('from') else date.min
+            last_day = date.fromisoformat(params['to']) if params.get('to') else date.max - timedelta(days=1)
+            return cls.between(first_day, last_day)
+
+        year = params.get('year') or today.year
+        if params.get('week'):
+            return cls.week(year, params['week'])
+        if params.get('quarter'):
+            return cls.quarter(year, params['quarter'])
+        if params.get('year') and not params.get('month'):
+            return cls.year(year)
+        return cls.month(year, params.get('month') or today.month)
+
+    @property
+    def last_day(self):
+        return self.end - timedelta(days=1)
+
+    @property
+    def days(self):
+        return (self.end - self.start).days
+
+    def filter(self, field='date'):
+        """Lookup kwargs restricting field to this period."""
+        return {f'{field}__gte': self.start, f'{field}__lt': self.end}
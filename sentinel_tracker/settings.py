@@ -5,6 +5,8 @@ Django settings for sentinel_tracker project.
 from pathlib import Path
 from datetime import timedelta
 import os
+import sys
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -12,6 +14,9 @@ SECRET_KEY = 'django-insecure-dev-key-change-in-production'
 
 DEBUG = False
 
+# True under `manage.py test`: tasks run inline and nothing needs Redis.
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['*']
 
 INSTALLED_APPS = [
@@ -33,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'sentinel_tracker.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,6 +78,9 @@ DATABASES = {
         'HOST': 'ep-odd-bird-a4kpkpuv-pooler.us-east-1.aws.neon.tech',
         'PORT': '5432',
         'CONN_MAX_AGE': 600,
+        # The host is a transaction-mode pooler, which cannot keep a
+        # server-side cursor open across transactions.
+        'DISABLE_SERVER_SIDE_CURSORS': True,
         'OPTIONS': {
             'sslmode': 'require',
         }
@@ -175,6 +184,108 @@ SPECTACULAR_SETTINGS = {
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Request metrics: Server-Timing header, one JSON log line per request and
+# the Prometheus /metrics endpoint (requires METRICS_TOKEN unless DEBUG).
+REQUEST_METRICS_LOG = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Cache: the Redis at REDIS_URL, the same one Celery uses by default. The
+# report cache, its single-flight locks and the alert versions must be
+# shared by every web process and worker, so per-process memory is only
+# used for DEBUG and tests when REDIS_URL is not set.
+REDIS_URL = os.environ.get('REDIS_URL', None if DEBUG or TESTING else 'redis://localhost:6379/0')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a cached report lives; writes invalidate it right away.
+REPORT_CACHE_TIMEOUT = 300
+# Single-flight report computation: lease of the per-report lock and how
+# long concurrent requests wait for the lock holder's result. With
+# stale-while-revalidate they get the previous version immediately instead.
+REPORT_CACHE_LOCK_LEASE = 10
+REPORT_CACHE_LOCK_WAIT = 2
+REPORT_CACHE_STALE_WHILE_REVALIDATE = False
+
+# Seconds between keepalive comments on idle alert streams
+# (/api/reports/alerts/stream/); keep below the proxy's read timeout.
+ALERT_STREAM_KEEPALIVE = 20
+
+# Alert retention, applied nightly by purge_alerts (None disables a rule):
+# read alerts are deleted after ALERT_RETENTION_READ_DAYS days, each user
+# keeps at most ALERT_RETENTION_MAX_PER_USER alerts, and ALERT_COMPACTION
+# folds repeated daily budget alerts into the newest one.
+ALERT_RETENTION_READ_DAYS = 90
+ALERT_RETENTION_MAX_PER_USER = 1000
+ALERT_COMPACTION = False
+
+# Size of the per-process thread pool running independent queries
+# concurrently (dashboard sections); each thread holds a DB connection.
+CONCURRENT_QUERY_WORKERS = 8
+
+# Celery: the Redis at REDIS_URL by default. CELERY_BROKER_URL=memory://
+# runs without Redis and CELERY_TASK_ALWAYS_EAGER=True runs every task inline
+# (tests, benchmarks); the test runner uses both.
+CELERY_BROKER_URL = os.environ.get(
+    'CELERY_BROKER_URL', 'memory://' if TESTING else REDIS_URL or 'redis://localhost:6379/0'
+)
+CELERY_RESULT_BACKEND = os.environ.get(
+    'CELERY_RESULT_BACKEND',
+    'cache+memory://' if CELERY_BROKER_URL.startswith('memory://') else CELERY_BROKER_URL
+)
+CELERY_TASK_ALWAYS_EAGER = TESTING or os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_EAGER_PROPAGATES = True
+# Keep results of inline tasks so the job status endpoint can report them.
+CELERY_TASK_STORE_EAGER_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TIMEZONE = TIME_ZONE
+
+# Seconds the owner of a queued import or export job is remembered, i.e.
+# how long its status and download stay available.
+TRANSACTION_JOB_TIMEOUT = 24 * 60 * 60
+
+# Number of shards the scheduled budget check is fanned out to.
+BUDGET_CHECK_SHARDS = int(os.environ.get('BUDGET_CHECK_SHARDS', 4))
+
+CELERY_BEAT_SCHEDULE = {
+    'check-budgets': {
+        'task': 'reports.tasks.check_budgets',
+        'schedule': crontab(hour=1, minute=0),
+        'kwargs': {'incremental': True},
+    },
+    'purge-alerts': {
+        'task': 'reports.tasks.purge_alerts',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'reconcile-balances': {
+        'task': 'transactions.tasks.reconcile_balances',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'rebuild-daily-spend': {
+        'task': 'budgets.tasks.rebuild_daily_spend',
+        'schedule': crontab(hour=4, minute=0, day_of_week='sunday'),
+    },
+    'rebuild-monthly-rollups': {
+        'task': 'reports.tasks.rebuild_monthly_rollups',
+        'schedule': crontab(hour=4, minute=30, day_of_week='sunday'),
+    },
+    'rebuild-alert-counters': {
+        'task': 'reports.tasks.rebuild_alert_counters',
+        'schedule': crontab(hour=5, minute=0, day_of_week='sunday'),
+    },
+}
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -0,0 +1,37 @@
+"""Test helpers shared by the apps' test modules."""
+import unittest
+from django.db import connection, transaction
+from django.test import TestCase
+
+
+def skip_unless_postgresql(test):
+    """Skip tests whose assertions depend on the PostgreSQL planner."""
+    return unittest.skipUnless(
+        connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL'
+    )(test)
+
+
+@skip_unless_postgresql
+class QueryPlanTestCase(TestCase):
+    """
+    Assert which index the planner picks for a queryset.
+
+    Subclasses seed enough rows in setUpTestData that a composite index is
+    clearly cheaper than the single-column foreign-key index, then call
+    analyze() on the models. Sequential scans are disabled, so the plan
+    shows the best index available for the query.
+    """
+
+    @staticmethod
+    def analyze(*models):
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def assertUsesIndex(self, queryset, index_name):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            transaction.set_rollback(True)
+        self.assertIn(index_name, plan, f'{index_name} not used:\n{plan}')
@@ -2,12 +2,13 @@
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
-from .views import home, health_check
+from .views import home, health_check, metrics_view
 
 urlpatterns = [
     # Home and Health Check
     path('', home, name='home'),
     path('health/', health_check, name='health-check'),
+    path('metrics', metrics_view, name='metrics'),
     
     # Admin
     path('admin/', admin.site.urls),
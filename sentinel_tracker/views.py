@@ -2,10 +2,14 @@
 Home view for API welcome message
 """
 
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from sentinel_tracker import metrics
 
 
 @api_view(['GET'])
@@ -55,3 +59,19 @@ def health_check(request):
         'message': 'API is running',
         'environment': 'production',
     }, status=status.HTTP_200_OK)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint with per-endpoint request metrics.
+
+    Requests must send `Authorization: Bearer <settings.METRICS_TOKEN>`.
+    Without a token the endpoint is only open when DEBUG is on.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse('Forbidden: METRICS_TOKEN is not set\n', status=403, content_type='text/plain')
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
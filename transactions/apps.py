@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class TransactionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transactions'
+
+    def ready(self):
+        """Initialize app signals."""
+        import transactions.signals
@@ -0,0 +1,159 @@
+"""
+Streaming export of a user's full transaction history.
+
+Incomes and expenses are read through one UNION ALL query, fetched in
+keyset-paginated chunks and written out in small batches, so memory use
+stays constant no matter how many rows a user has. Chunks are separate
+statements rather than a server-side cursor, which a transaction-mode
+connection pooler cannot keep open between them.
+"""
+import csv
+import io
+import json
+import zlib
+from django.db.models import CharField, DecimalField, F, Q, Value
+from rest_framework.renderers import BaseRenderer
+from transactions.models import Income, Expense
+
+EXPORT_CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+# Output column -> (Income expression, Expense expression)
+EXPORT_COLUMNS = {
+    'kind': (Value('income', output_field=CharField()), Value('expense', output_field=CharField())),
+    'id': (F('id'), F('id')),
+    'date': (F('date'), F('date')),
+    'amount': (F('amount'), F('amount')),
+    'currency': (Value(None, output_field=CharField()), F('currency')),
+    'original_amount': (
+        Value(None, output_field=DecimalField(max_digits=12, decimal_places=2)),
+        F('original_amount')
+    ),
+    'exchange_rate': (
+        Value(None, output_field=DecimalField(max_digits=10, decimal_places=4)),
+        F('exchange_rate')
+    ),
+    'category': (F('category__name'), F('category__name')),
+    'description': (F('description'), F('description')),
+    'created_at': (F('created_at'), F('created_at')),
+}
+COLUMN_INDEX = {column: index for index, column in enumerate(EXPORT_COLUMNS)}
+
+
+class CSVRenderer(BaseRenderer):
+    """Renderer registered for ?format=csv; the export body itself is streamed."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only errors and queued-job responses reach a renderer; send them as JSON.
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return json.dumps(data).encode()
+
+
+class NDJSONRenderer(CSVRenderer):
+    """Renderer registered for ?format=ndjson; the export body itself is streamed."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+def export_queryset(user, period=None, after=None):
+    """
+    One queryset yielding every income and expense of the user, oldest first.
+
+    Rows are ordered by (date, kind, id), which is unique across both
+    tables; after=(date, kind, id) starts the export after that row.
+    """
+    querysets = []
+    for index, (kind, model) in enumerate((('income', Income), ('expense', Expense))):
+        queryset = model.objects.filter(user=user)
+        if period is not None:
+            queryset = queryset.filter(**period.filter())
+        if after is not None:
+            queryset = queryset.filter(_rows_after(kind, *after))
+        # Prefix the annotations so they never clash with model field names.
+        queryset = queryset.annotate(**{
+            f'export_{column}': expressions[index]
+            for column, expressions in EXPORT_COLUMNS.items()
+        }).values_list(*[f'export_{column}' for column in EXPORT_COLUMNS]).order_by()
+        querysets.append(queryset)
+    return querysets[0].union(querysets[1], all=True).order_by('export_date', 'export_kind', 'export_id')
+
+
+def _rows_after(kind, day, last_kind, last_id):
+    """Filter for the rows of one kind that follow (day, last_kind, last_id)."""
+    if kind > last_kind:
+        return Q(date__gte=day)
+    if kind < last_kind:
+        return Q(date__gt=day)
+    return Q(date__gt=day) | Q(date=day, id__gt=last_id)
+
+
+def iter_rows(user, period=None):
+    """Yield export rows as tuples in EXPORT_COLUMNS order, EXPORT_CHUNK_SIZE per query."""
+    after = None
+    while True:
+        chunk = list(export_queryset(user, period, after)[:EXPORT_CHUNK_SIZE])
+        yield from chunk
+        if len(chunk) < EXPORT_CHUNK_SIZE:
+            return
+        last = chunk[-1]
+        after = (last[COLUMN_INDEX['date']], last[COLUMN_INDEX['kind']], last[COLUMN_INDEX['id']])
+
+
+def _serialize(value):
+    if value is None or isinstance(value, int):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_chunks(rows):
+    """Encode rows as CSV, yielding a few hundred rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(['' if value is None else _serialize(value) for value in row])
+        count += 1
+        if count % ROWS_PER_WRITE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(rows):
+    """Encode rows as newline-delimited JSON objects."""
+    columns = list(EXPORT_COLUMNS)
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({
+            column: _serialize(value) for column, value in zip(columns, row)
+        }))
+        if len(lines) >= ROWS_PER_WRITE:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def gzip_chunks(chunks):
+    """Compress a byte stream on the fly."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+ENCODERS = {
+    'csv': csv_chunks,
+    'ndjson': ndjson_chunks,
+}
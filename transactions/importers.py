@@ -0,0 +1,360 @@
+"""
+Streaming import of bank statements into Income and Expense records.
+
+Files are processed as a generator pipeline so memory stays flat no matter
+how large the statement is:
+
+    parse (CSV / OFX / NDJSON) -> normalize (type, category, currency)
+    -> chunk -> bulk_create
+
+Every parsed row carries the byte offset at which parsing can resume, so
+an interrupted import can be restarted from the last committed chunk.
+Imported rows are historical data and skip the balance check; the
+materialized balance is still updated through ledger_changed.
+"""
+import csv
+import json
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import islice
+from django.db import models, transaction
+from budgets.models import Category
+from transactions.models import Income, Expense
+from transactions.signals import ledger_changed, changes_for_created
+from transactions import rates
+
+SUPPORTED_FORMATS = ('csv', 'ofx', 'ndjson')
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+OFX_READ_SIZE = 64 * 1024
+
+OFX_TRANSACTION_RE = re.compile(rb'<STMTTRN>(.*?)</STMTTRN>', re.DOTALL | re.IGNORECASE)
+OFX_TAG_RE = re.compile(rb'<([A-Z0-9.]+)>([^<\r\n]*)', re.IGNORECASE)
+OFX_CURDEF_RE = re.compile(rb'<CURDEF>\s*([A-Z]{3})', re.IGNORECASE)
+CURRENCY_RE = re.compile(r'[A-Z]{3}')
+
+
+class StatementImportError(ValueError):
+    """Raised for statement rows or files that cannot be imported."""
+
+
+class ImportResult:
+    """Running statistics for an import."""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.incomes = 0
+        self.expenses = 0
+        self.skipped = 0
+        self.errors = []
+
+    @property
+    def imported(self):
+        return self.incomes + self.expenses
+
+    def add_error(self, offset, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'offset': offset, 'error': message})
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'incomes': self.incomes,
+            'expenses': self.expenses,
+            'skipped': self.skipped,
+            'offset': self.offset,
+            'errors': self.errors,
+        }
+
+
+def detect_format(filename):
+    """Guess the statement format from a file name."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('json', 'jsonl'):
+        extension = 'ndjson'
+    if extension not in SUPPORTED_FORMATS:
+        raise StatementImportError(
+            f'Unsupported file type "{extension}". Use one of: {", ".join(SUPPORTED_FORMATS)}.'
+        )
+    return extension
+
+
+# --- Parsing -----------------------------------------------------------------
+# Parsers take a binary file object and yield (record, offset) pairs, where
+# offset is the byte position just after the record.
+
+def iter_lines(fileobj, offset):
+    """Yield (line, end_offset) for each line from offset onwards."""
+    fileobj.seek(offset)
+    while True:
+        line = fileobj.readline()
+        if not line:
+            return
+        offset += len(line)
+        yield line, offset
+
+
+class _DecodedLines:
+    """
+    Iterate over decoded lines, remembering the end offset of the last one.
+
+    csv.reader pulls exactly the lines a record needs, so after it yields
+    a row, offset is the position just after that row, even when quoted
+    fields span several lines.
+    """
+
+    def __init__(self, fileobj, offset):
+        self.lines = iter_lines(fileobj, offset)
+        self.offset = offset
+
+    def __iter__(self):
+        for line, self.offset in self.lines:
+            yield line.decode('utf-8-sig')
+
+
+def parse_csv(fileobj, offset=0):
+    """Parse a CSV statement with a header row."""
+    fileobj.seek(0)
+    header_line = fileobj.readline()
+    header = [name.strip().lower() for name in next(csv.reader([header_line.decode('utf-8-sig')]))]
+    lines = _DecodedLines(fileobj, max(offset, len(header_line)))
+    for row in csv.reader(lines):
+        if not any(field.strip() for field in row):
+            continue
+        yield dict(zip(header, row)), lines.offset
+
+
+def parse_ndjson(fileobj, offset=0):
+    """Parse newline-delimited JSON objects."""
+    for line, end in iter_lines(fileobj, offset):
+        text = line.decode('utf-8').strip()
+        if not text:
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            record = {'_error': f'Invalid JSON: {exc}'}
+        yield record, end
+
+
+def parse_ofx(fileobj, offset=0):
+    """Parse <STMTTRN> blocks from an OFX 1.x (SGML) or 2.x (XML) statement."""
+    fileobj.seek(0)
+    head = fileobj.read(OFX_READ_SIZE)
+    match = OFX_CURDEF_RE.search(head)
+    currency = match.group(1).decode().upper() if match else None
+
+    fileobj.seek(offset)
+    base = offset
+    buffer = b''
+    while True:
+        data = fileobj.read(OFX_READ_SIZE)
+        buffer += data
+        consumed = 0
+        for match in OFX_TRANSACTION_RE.finditer(buffer):
+            fields = {
+                tag.decode().upper(): value.decode('utf-8', 'replace').strip()
+                for tag, value in OFX_TAG_RE.findall(match.group(1))
+            }
+            consumed = match.end()
+            yield _ofx_record(fields, currency), base + consumed
+        buffer = buffer[consumed:]
+        base += consumed
+        if not data:
+            return
+
+
+def _ofx_record(fields, currency):
+    """Map OFX transaction tags onto the common record layout."""
+    record = {
+        'date': fields.get('DTPOSTED', '')[:8],
+        'amount': fields.get('TRNAMT'),
+        'description': fields.get('MEMO') or fields.get('NAME'),
+        'currency': fields.get('CURSYM') or currency,
+    }
+    if fields.get('CURRATE'):
+        record['exchange_rate'] = fields['CURRATE']
+    return record
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx,
+    'ndjson': parse_ndjson,
+}
+
+
+# --- Normalizing -------------------------------------------------------------
+
+class CategoryResolver:
+    """Map category names to the user's (or default) categories."""
+
+    def __init__(self, user):
+        self.categories = {}
+        queryset = Category.objects.filter(
+            models.Q(user=user) | models.Q(user__isnull=True)
+        ).order_by('user_id')
+        # Default categories are loaded first so user categories win.
+        for category in queryset.only('id', 'name', 'type'):
+            self.categories[(category.type, category.name.lower())] = category.id
+
+    def resolve(self, kind, name):
+        if not name:
+            return None
+        return self.categories.get((kind, str(name).strip().lower()))
+
+
+def _parse_decimal(value, field):
+    """Parse a decimal that fits the Expense field of the same name."""
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(str(value).replace(',', '').strip())
+    except InvalidOperation:
+        raise StatementImportError(f'Invalid {field}: {value!r}')
+    if not number.is_finite():
+        raise StatementImportError(f'Invalid {field}: {value!r}')
+    _check_range(number, field)
+    return number
+
+
+def _check_range(number, field):
+    model_field = Expense._meta.get_field(field)
+    if abs(number) >= Decimal(10) ** (model_field.max_digits - model_field.decimal_places):
+        raise StatementImportError(f'{field} out of range: {number}')
+
+
+def _parse_date(value):
+    value = str(value or '').strip()
+    for fmt in ('%Y-%m-%d', '%Y%m%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(value[:10], fmt).date()
+        except ValueError:
+            continue
+    raise StatementImportError(f'Invalid date: {value!r}')
+
+
+def build_transaction(record, user, base_currency, categories):
+    """
+    Turn one parsed record into an unsaved Income or Expense.
+
+    Records without an explicit type are classified by the sign of the
+    amount (negative = expense). Foreign-currency amounts are converted to
+    the user's base currency using the record's exchange_rate, or the
+    cached rate table when the record has none.
+    """
+    if not isinstance(record, dict):
+        raise StatementImportError('Expected an object per record')
+    if '_error' in record:
+        raise StatementImportError(record['_error'])
+
+    amount = _parse_decimal(record.get('amount'), 'amount')
+    if amount is None or amount == 0:
+        raise StatementImportError('Missing or zero amount')
+    kind = str(record.get('type') or '').strip().lower()
+    if kind not in ('income', 'expense'):
+        kind = 'expense' if amount < 0 else 'income'
+    amount = abs(amount)
+
+    day = _parse_date(record.get('date'))
+    currency = str(record.get('currency') or base_currency).strip().upper()
+    if not CURRENCY_RE.fullmatch(currency):
+        raise StatementImportError(f'Invalid currency: {currency!r}')
+    exchange_rate = _parse_decimal(record.get('exchange_rate'), 'exchange_rate')
+    rate_source = 'explicit' if exchange_rate is not None else 'table'
+    if currency == base_currency:
+        exchange_rate, rate_source = Decimal('1'), 'table'
+    elif exchange_rate is None:
+        try:
+            exchange_rate = rates.get_rate(currency, base_currency, day)
+        except rates.ExchangeRateUnavailable as exc:
+            raise StatementImportError(str(exc))
+    original_amount = amount
+    amount = (original_amount * exchange_rate).quantize(rates.AMOUNT_PLACES, rounding=ROUND_HALF_UP)
+    _check_range(amount, 'amount')
+
+    fields = {
+        'user': user,
+        'category_id': categories.resolve(kind, record.get('category')),
+        'amount': amount,
+        'date': day,
+        'description': record.get('description') or None,
+    }
+    if kind == 'income':
+        return Income(**fields)
+    return Expense(
+        currency=currency,
+        original_amount=original_amount,
+        exchange_rate=exchange_rate,
+        rate_source=rate_source,
+        **fields
+    )
+
+
+def normalize(rows, user, result):
+    """Yield (instance, offset) pairs, recording rows that fail to normalize."""
+    profile = getattr(user, 'profile', None)
+    base_currency = (profile.base_currency if profile else 'USD').upper()
+    categories = CategoryResolver(user)
+    for record, offset in rows:
+        try:
+            yield build_transaction(record, user, base_currency, categories), offset
+        except StatementImportError as exc:
+            result.add_error(offset, str(exc))
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- Writing -----------------------------------------------------------------
+
+def write_chunk(chunk):
+    """Insert one chunk of transactions in a single transaction."""
+    incomes = [obj for obj, _ in chunk if isinstance(obj, Income)]
+    expenses = [obj for obj, _ in chunk if isinstance(obj, Expense)]
+    with transaction.atomic():
+        for model, instances in ((Income, incomes), (Expense, expenses)):
+            if instances:
+                instances = model.objects.bulk_create(instances)
+                ledger_changed.send(sender=model, changes=changes_for_created(instances))
+    return len(incomes), len(expenses)
+
+
+def import_statement(user, fileobj, fmt, chunk_size=DEFAULT_CHUNK_SIZE, offset=0, on_chunk=None):
+    """
+    Stream a statement file into the user's transactions.
+
+    Args:
+        user: Django User object
+        fileobj: Binary file object supporting seek/readline
+        fmt: One of SUPPORTED_FORMATS
+        chunk_size: Rows per bulk_create
+        offset: Byte offset to resume from (0 for a fresh import)
+        on_chunk: Optional callback receiving the ImportResult after each chunk
+
+    Returns:
+        ImportResult; result.offset is the resume position after the last
+        committed chunk.
+    """
+    if fmt not in PARSERS:
+        raise StatementImportError(f'Unsupported format "{fmt}".')
+
+    result = ImportResult(offset)
+    rows = PARSERS[fmt](fileobj, offset)
+    for chunk in chunked(normalize(rows, user, result), chunk_size):
+        incomes, expenses = write_chunk(chunk)
+        result.incomes += incomes
+        result.expenses += expenses
+        result.offset = chunk[-1][1]
+        if on_chunk:
+            on_chunk(result)
+    return result
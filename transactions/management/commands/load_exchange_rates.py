@@ -0,0 +1,73 @@
+"""
+Django management command to load exchange rates from a file feed.
+
+Reads a CSV file with the columns date, from_currency, to_currency, rate
+and upserts the rows into the ExchangeRate table in batches. Existing
+rates for the same pair and date are overwritten. Cached rates in every
+process are invalidated afterwards.
+
+Usage:
+    python manage.py load_exchange_rates rates.csv
+    python manage.py load_exchange_rates rates.csv --chunk-size=5000
+"""
+
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from transactions.importers import chunked
+from transactions.models import ExchangeRate
+from transactions import rates
+
+
+class Command(BaseCommand):
+    help = 'Load exchange rates from a CSV file (date, from_currency, to_currency, rate)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the rates CSV file')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of rates written per batch'
+        )
+
+    def handle(self, *args, **options):
+        loaded = 0
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as handle:
+                rows = self.parse(csv.DictReader(handle))
+                for chunk in chunked(rows, options['chunk_size']):
+                    with transaction.atomic():
+                        ExchangeRate.objects.bulk_create(
+                            chunk,
+                            update_conflicts=True,
+                            unique_fields=['from_currency', 'to_currency', 'date'],
+                            update_fields=['rate', 'updated_at'],
+                        )
+                    loaded += len(chunk)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if loaded:
+                rates.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Loaded {loaded} exchange rates.'))
+
+    @staticmethod
+    def parse(reader):
+        """Yield unsaved ExchangeRate objects, failing on the first bad row."""
+        for line, row in enumerate(reader, start=2):
+            try:
+                rate = Decimal(row['rate'])
+                if rate <= 0:
+                    raise InvalidOperation
+                yield ExchangeRate(
+                    date=datetime.strptime(row['date'].strip(), '%Y-%m-%d').date(),
+                    from_currency=row['from_currency'].strip().upper(),
+                    to_currency=row['to_currency'].strip().upper(),
+                    rate=rate,
+                )
+            except (KeyError, AttributeError, ValueError, InvalidOperation):
+                raise CommandError(f'Invalid exchange rate on line {line}: {row}')
@@ -0,0 +1,117 @@
+"""
+Django management command to rebuild materialized user balances.
+
+Recomputes every user's income and expense totals from the raw transaction
+tables, reports any drift against the stored UserBalance rows and fixes it.
+
+Usage:
+    python manage.py reconcile_balances
+    python manage.py reconcile_balances --user_id=1
+    python manage.py reconcile_balances --dry-run
+"""
+
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
+from transactions.models import Income, Expense, UserBalance
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user balances from transaction history and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_id',
+            type=int,
+            help='Reconcile only a specific user (by ID)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without writing corrections'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of users to reconcile per query batch'
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get('user_id')
+        dry_run = options.get('dry_run', False)
+        chunk_size = options['chunk_size']
+
+        users = User.objects.order_by('id')
+        if user_id:
+            users = users.filter(id=user_id)
+        user_ids = list(users.values_list('id', flat=True))
+
+        checked = 0
+        drifted = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            checked += len(chunk)
+            drifted += self.reconcile_chunk(chunk, dry_run)
+
+        summary = f'Checked {checked} balances, {drifted} drifted'
+        if drifted and dry_run:
+            summary += ' (dry run, nothing written)'
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {summary}.'))
+
+    def reconcile_chunk(self, user_ids, dry_run):
+        """Compare stored and recomputed totals for a batch of users."""
+        with transaction.atomic():
+            # Lock the stored rows before aggregating so writes that land
+            # mid-run are not reported as drift.
+            stored = {
+                balance.user_id: balance
+                for balance in UserBalance.objects.select_for_update().filter(user_id__in=user_ids)
+            }
+            incomes = self._totals(Income, user_ids)
+            expenses = self._totals(Expense, user_ids)
+            to_create = []
+            to_update = []
+            drifted = 0
+
+            for user_id in user_ids:
+                total_income = incomes.get(user_id, Decimal('0'))
+                total_expense = expenses.get(user_id, Decimal('0'))
+                balance = stored.get(user_id)
+
+                if balance is None:
+                    to_create.append(UserBalance(
+                        user_id=user_id,
+                        total_income=total_income,
+                        total_expense=total_expense
+                    ))
+                    continue
+
+                if balance.total_income == total_income and balance.total_expense == total_expense:
+                    continue
+
+                drifted += 1
+                self.stdout.write(self.style.WARNING(
+                    f'  - User {user_id}: stored income ${balance.total_income:.2f} / '
+                    f'expense ${balance.total_expense:.2f}, actual income ${total_income:.2f} / '
+                    f'expense ${total_expense:.2f}'
+                ))
+                balance.total_income = total_income
+                balance.total_expense = total_expense
+                to_update.append(balance)
+
+            if not dry_run:
+                UserBalance.objects.bulk_create(to_create, ignore_conflicts=True)
+                UserBalance.objects.bulk_update(to_update, ['total_income', 'total_expense'])
+
+        return drifted
+
+    @staticmethod
+    def _totals(model, user_ids):
+        """Sum amounts per user in one grouped query."""
+        rows = model.objects.filter(user_id__in=user_ids).order_by().values('user_id').annotate(
+            total=Sum('amount')
+        )
+        return {row['user_id']: row['total'] for row in rows}
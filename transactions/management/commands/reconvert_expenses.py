@@ -0,0 +1,109 @@
+"""
+Django management command to re-convert expenses after rates were corrected.
+
+Recalculates amount and exchange_rate of foreign-currency expenses from
+their original_amount and the current rate table. Expenses whose rate was
+given explicitly (by the client or the statement) are left alone.
+Expenses are processed
+in primary-key chunks, each in its own transaction, and balances are
+updated through ledger_changed.
+
+Usage:
+    python manage.py reconvert_expenses --currency=EUR
+    python manage.py reconvert_expenses --from=2024-01-01 --to=2024-03-31
+    python manage.py reconvert_expenses --user_id=1 --dry-run
+"""
+
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from transactions.models import Expense
+from transactions.signals import LedgerChange, ledger_changed
+from transactions import rates
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Recalculate foreign-currency expenses from the current exchange rates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=_date, help='First expense date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', type=_date, help='Last expense date (YYYY-MM-DD)')
+        parser.add_argument('--currency', help='Only expenses in this currency')
+        parser.add_argument('--user_id', type=int, help='Only expenses of a specific user (by ID)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of expenses updated per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report changes without writing them'
+        )
+
+    def handle(self, *args, **options):
+        expenses = Expense.objects.filter(original_amount__isnull=False, rate_source='table').exclude(
+            currency=F('user__profile__base_currency')
+        )
+        if options.get('start'):
+            expenses = expenses.filter(date__gte=options['start'])
+        if options.get('end'):
+            expenses = expenses.filter(date__lte=options['end'])
+        if options.get('currency'):
+            expenses = expenses.filter(currency=options['currency'].upper())
+        if options.get('user_id'):
+            expenses = expenses.filter(user_id=options['user_id'])
+
+        checked = changed = missing = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                chunk = list(
+                    expenses.filter(id__gt=last_id).select_for_update(of=('self',)).order_by('id').only(
+                        'id', 'user_id', 'category_id', 'date', 'amount',
+                        'currency', 'original_amount', 'exchange_rate'
+                    ).annotate(base_currency=F('user__profile__base_currency'))[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+                checked += len(chunk)
+
+                updated, changes = [], []
+                for expense in chunk:
+                    try:
+                        amount, rate = rates.convert(
+                            expense.original_amount, expense.currency, expense.base_currency, expense.date
+                        )
+                    except rates.ExchangeRateUnavailable:
+                        missing += 1
+                        continue
+                    if amount == expense.amount and rate == expense.exchange_rate:
+                        continue
+                    changes += [
+                        LedgerChange(expense.user_id, expense.category_id, expense.date, -expense.amount, -1),
+                        LedgerChange(expense.user_id, expense.category_id, expense.date, amount, 1),
+                    ]
+                    expense.amount, expense.exchange_rate = amount, rate
+                    updated.append(expense)
+
+                changed += len(updated)
+                if updated and not options['dry_run']:
+                    Expense.objects.bulk_update(updated, ['amount', 'exchange_rate'])
+                    ledger_changed.send(sender=Expense, changes=changes)
+
+        summary = f'Checked {checked} expenses, {changed} re-converted'
+        if missing:
+            summary += f', {missing} without a rate'
+        if changed and options['dry_run']:
+            summary += ' (dry run, nothing written)'
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {summary}.'))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-16 20:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Balance',
+                'verbose_name_plural': 'User Balances',
+            },
+        ),
+    ]
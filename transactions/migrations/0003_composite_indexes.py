@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-16 20:34
+
+from django.db import migrations, models
+from sentinel_tracker.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built with CREATE INDEX CONCURRENTLY on PostgreSQL, which
+    # cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('transactions', '0002_user_balance'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', 'date'], name='expense_user_cat_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='income',
+            index=models.Index(fields=['user', 'date'], name='income_user_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='income',
+            index=models.Index(fields=['user', 'category', 'date'], name='income_user_cat_date_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-16 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('from_currency', models.CharField(max_length=3)),
+                ('to_currency', models.CharField(max_length=3)),
+                ('rate', models.DecimalField(decimal_places=10, help_text='Units of to_currency per unit of from_currency', max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Exchange Rate',
+                'verbose_name_plural': 'Exchange Rates',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.UniqueConstraint(fields=('from_currency', 'to_currency', 'date'), name='unique_exchange_rate'),
+        ),
+    ]
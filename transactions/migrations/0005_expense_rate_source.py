@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_exchange_rate'),
+    ]
+
+    # Where the rates of existing expenses came from is not recorded, so
+    # they are treated as explicit and reconvert_expenses leaves them alone.
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='rate_source',
+            field=models.CharField(choices=[('table', 'Rate table'), ('explicit', 'Explicit')], default='explicit', help_text='Whether exchange_rate came from the rate table or was given explicitly', max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='rate_source',
+            field=models.CharField(choices=[('table', 'Rate table'), ('explicit', 'Explicit')], default='table', help_text='Whether exchange_rate came from the rate table or was given explicitly', max_length=10),
+        ),
+    ]
@@ -1,6 +1,9 @@
 """Transactions app models."""
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
+from django.utils import timezone
 from budgets.models import Category
 
 
@@ -24,6 +27,10 @@ class Income(models.Model):
         ordering = ['-date', '-created_at']
         verbose_name = 'Income'
         verbose_name_plural = 'Incomes'
+        indexes = [
+            models.Index(fields=['user', 'date'], name='income_user_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='income_user_cat_date_idx'),
+        ]
 
     def __str__(self):
         return f"Income: ${self.amount} on {self.date}"
@@ -31,6 +38,11 @@ class Income(models.Model):
 
 class Expense(models.Model):
     """Expense transaction record."""
+    RATE_SOURCES = [
+        ('table', 'Rate table'),
+        ('explicit', 'Explicit'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expenses')
     category = models.ForeignKey(
         Category,
@@ -60,6 +72,12 @@ class Expense(models.Model):
         default=1.0,
         help_text='Exchange rate used for conversion to base currency'
     )
+    rate_source = models.CharField(
+        max_length=10,
+        choices=RATE_SOURCES,
+        default='table',
+        help_text='Whether exchange_rate came from the rate table or was given explicitly'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -67,6 +85,127 @@ class Expense(models.Model):
         ordering = ['-date', '-created_at']
         verbose_name = 'Expense'
         verbose_name_plural = 'Expenses'
+        indexes = [
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='expense_user_cat_date_idx'),
+        ]
 
     def __str__(self):
         return f"Expense: ${self.amount} on {self.date}"
+
+
+class ExchangeRate(models.Model):
+    """Conversion rate from one currency to another, effective from a date."""
+    date = models.DateField()
+    from_currency = models.CharField(max_length=3)
+    to_currency = models.CharField(max_length=3)
+    rate = models.DecimalField(
+        max_digits=20,
+        decimal_places=10,
+        help_text='Units of to_currency per unit of from_currency'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Exchange Rate'
+        verbose_name_plural = 'Exchange Rates'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['from_currency', 'to_currency', 'date'],
+                name='unique_exchange_rate'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.from_currency}->{self.to_currency} {self.rate} on {self.date}"
+
+
+class UserBalance(models.Model):
+    """
+    Materialized running totals of a user's incomes and expenses.
+
+    Kept in sync by the handlers in transactions.signals so that balance
+    checks are a single primary-key read instead of two full-history
+    aggregates.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='balance')
+    total_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'User Balance'
+        verbose_name_plural = 'User Balances'
+
+    def __str__(self):
+        return f"Balance for user {self.user_id}: ${self.balance}"
+
+    @property
+    def balance(self):
+        """Current balance (total income minus total expenses)."""
+        return self.total_income - self.total_expense
+
+    @staticmethod
+    def compute_totals(user_id):
+        """Aggregate the user's full history from scratch."""
+        total_income = Income.objects.filter(user_id=user_id).aggregate(
+            total=Sum('amount')
+        )['total'] or Decimal('0')
+        total_expense = Expense.objects.filter(user_id=user_id).aggregate(
+            total=Sum('amount')
+        )['total'] or Decimal('0')
+        return {'total_income': total_income, 'total_expense': total_expense}
+
+    @classmethod
+    def for_user(cls, user_id, lock=False):
+        """
+        Return the balance row for a user, building it from history on first use.
+
+        With lock=True the row is selected FOR UPDATE so that concurrent
+        writers for the same user queue behind each other. The caller must
+        be inside transaction.atomic().
+        """
+        balance, _ = cls.objects.get_or_create(
+            user_id=user_id,
+            defaults=cls.compute_totals(user_id)
+        )
+        if lock:
+            balance = cls.objects.select_for_update().get(pk=balance.pk)
+        return balance
+
+    @classmethod
+    def lock(cls, user_ids):
+        """
+        Lock the users' balance rows until the end of the transaction.
+
+        Missing rows are built from history first, so every user is locked.
+        Writers of per-user derived data (daily spend, monthly rollups) take
+        this lock, so concurrent writers for the same users queue behind
+        each other. The caller must be inside transaction.atomic().
+
+        Returns:
+            Dict of user_id -> UserBalance
+        """
+        user_ids = set(user_ids)
+        existing = set(cls.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        for user_id in sorted(user_ids - existing):
+            cls.for_user(user_id)
+        return {
+            balance.user_id: balance
+            for balance in cls.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')
+        }
+
+    @classmethod
+    def apply_delta(cls, user_id, income=0, expense=0):
+        """Shift the stored totals by the given amounts."""
+        updated = cls.objects.filter(user_id=user_id).update(
+            total_income=F('total_income') + income,
+            total_expense=F('total_expense') + expense,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            # First write for this user: the history aggregate already
+            # includes the row that triggered this call.
+            cls.for_user(user_id)
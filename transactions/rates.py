@@ -0,0 +1,104 @@
+"""
+Exchange-rate lookups for multi-currency expenses.
+
+Lookups go through two cache layers before touching the database:
+
+1. An in-process LRU (functools.lru_cache), so converting thousands of rows
+   in a bulk import is a dictionary lookup per row.
+2. The shared Django cache, so workers do not each query the same rates.
+
+Both layers are keyed by a rates version stored in the shared cache.
+Loading or correcting rates bumps the version, which every process picks
+up within VERSION_CHECK_INTERVAL seconds.
+"""
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from django.core.cache import cache
+from transactions.models import ExchangeRate
+
+VERSION_KEY = 'exchange_rates:version'
+VERSION_CHECK_INTERVAL = 30
+SHARED_CACHE_TIMEOUT = 24 * 60 * 60
+LOCAL_CACHE_SIZE = 8192
+
+# Precision of Expense.exchange_rate and Expense.amount
+RATE_PLACES = Decimal('0.0001')
+AMOUNT_PLACES = Decimal('0.01')
+
+_MISSING = 'missing'
+_version_state = {'version': None, 'checked_at': 0.0}
+
+
+class ExchangeRateUnavailable(LookupError):
+    """Raised when no rate is known for a currency pair on or before a date."""
+
+
+def _current_version():
+    """Shared rates version, re-read at most every VERSION_CHECK_INTERVAL seconds."""
+    now = time.monotonic()
+    if _version_state['version'] is None or now - _version_state['checked_at'] > VERSION_CHECK_INTERVAL:
+        _version_state['version'] = cache.get_or_set(VERSION_KEY, 1, timeout=None)
+        _version_state['checked_at'] = now
+    return _version_state['version']
+
+
+def _rate_from_db(from_currency, to_currency, day):
+    """Latest stored rate on or before day, using the inverse pair as a fallback."""
+    rate = ExchangeRate.objects.filter(
+        from_currency=from_currency, to_currency=to_currency, date__lte=day
+    ).order_by('-date').values_list('rate', flat=True).first()
+    if rate is not None:
+        return rate
+
+    inverse = ExchangeRate.objects.filter(
+        from_currency=to_currency, to_currency=from_currency, date__lte=day
+    ).order_by('-date').values_list('rate', flat=True).first()
+    if inverse:
+        return Decimal('1') / inverse
+    return None
+
+
+@lru_cache(maxsize=LOCAL_CACHE_SIZE)
+def _cached_rate(version, from_currency, to_currency, day):
+    key = f'exchange_rates:{version}:{from_currency}:{to_currency}:{day.isoformat()}'
+    rate = cache.get(key)
+    if rate is None:
+        rate = _rate_from_db(from_currency, to_currency, day)
+        cache.set(key, _MISSING if rate is None else str(rate), SHARED_CACHE_TIMEOUT)
+    elif rate != _MISSING:
+        rate = Decimal(rate)
+    return None if rate == _MISSING else rate
+
+
+def get_rate(from_currency, to_currency, day):
+    """
+    Return the rate converting from_currency into to_currency on day.
+
+    Raises ExchangeRateUnavailable if no rate is stored on or before day.
+    """
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
+    if from_currency == to_currency:
+        return Decimal('1')
+    rate = _cached_rate(_current_version(), from_currency, to_currency, day)
+    if rate is None:
+        raise ExchangeRateUnavailable(
+            f'No exchange rate for {from_currency} -> {to_currency} on or before {day.isoformat()}'
+        )
+    return rate.quantize(RATE_PLACES, rounding=ROUND_HALF_UP)
+
+
+def convert(amount, from_currency, to_currency, day):
+    """Return (converted amount, rate used) for an amount in from_currency."""
+    rate = get_rate(from_currency, to_currency, day)
+    return (Decimal(amount) * rate).quantize(AMOUNT_PLACES, rounding=ROUND_HALF_UP), rate
+
+
+def invalidate():
+    """Drop cached rates in every process after rates were loaded or corrected."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
+    _version_state['version'] = None
+    _cached_rate.cache_clear()
@@ -1,11 +1,41 @@
 """Transactions app serializers."""
 from rest_framework import serializers
-from transactions.models import Income, Expense
-from django.db.models import Sum
-from decimal import Decimal
+from transactions.models import Income, Expense, UserBalance
+from transactions.signals import ledger_changed, changes_for_created
+from transactions import rates
+from django.db import transaction
+from decimal import Decimal, ROUND_HALF_UP
+from sentinel_tracker.middleware import SerializationTimingMixin
 
 
-class IncomeSerializer(serializers.ModelSerializer):
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    List serializer that validates a batch in one pass and inserts it with
+    a single bulk_create.
+
+    Children may define validate_batch(items) for checks that apply to the
+    batch as a whole and prepare_create(validated_data) to fill defaults
+    before the instance is built.
+    """
+
+    def validate(self, attrs):
+        validate_batch = getattr(self.child, 'validate_batch', None)
+        if validate_batch is not None:
+            validate_batch(attrs)
+        return attrs
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        prepare_create = getattr(self.child, 'prepare_create', lambda data: data)
+        instances = model.objects.bulk_create([
+            model(**prepare_create(item)) for item in validated_data
+        ])
+        # bulk_create skips the model signals, so announce the rows here.
+        ledger_changed.send(sender=model, changes=changes_for_created(instances))
+        return instances
+
+
+class IncomeSerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for Income transactions."""
     category_name = serializers.CharField(source='category.name', read_only=True)
     amount = serializers.DecimalField(
@@ -29,18 +59,20 @@ class IncomeSerializer(serializers.ModelSerializer):
             'date', 'description', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        list_serializer_class = BulkCreateListSerializer
         extra_kwargs = {
             'category': {'help_text': 'Income category ID (e.g., Salary, Bonus, Investment)'}
         }
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for Expense transactions."""
     category_name = serializers.CharField(source='category.name', read_only=True)
     amount = serializers.DecimalField(
         max_digits=12,
         decimal_places=2,
-        help_text="Converted amount in base currency"
+        required=False,
+        help_text="Converted amount in base currency (calculated from original_amount if omitted)"
     )
     original_amount = serializers.DecimalField(
         max_digits=12,
@@ -52,14 +84,12 @@ class ExpenseSerializer(serializers.ModelSerializer):
     currency = serializers.CharField(
         max_length=3,
         required=False,
-        default='USD',
-        help_text="Currency code (e.g., USD, EUR, GBP, KES)"
+        help_text="Currency code (e.g., USD, EUR, GBP, KES); defaults to your base currency"
     )
     exchange_rate = serializers.DecimalField(
         max_digits=10,
         decimal_places=4,
         required=False,
-        default=1.0,
         help_text="Exchange rate used for conversion (auto-calculated if not provided)"
     )
     date = serializers.DateField(
@@ -76,9 +106,10 @@ class ExpenseSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'category', 'category_name', 'amount',
             'date', 'description', 'currency', 'original_amount',
-            'exchange_rate', 'created_at', 'updated_at'
+            'exchange_rate', 'rate_source', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'rate_source', 'created_at', 'updated_at']
+        list_serializer_class = BulkCreateListSerializer
         extra_kwargs = {
             'category': {'help_text': 'Expense category ID (e.g., Food, Transport, Utilities)'}
         }
@@ -90,25 +121,109 @@ class ExpenseSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
-        """Validate that expense doesn't exceed user's balance."""
+        """Convert foreign-currency amounts and validate the user's balance."""
+        data = self.convert_currency(data)
+        # Bulk creates check the balance once against the batch total.
+        if not isinstance(self.parent, serializers.ListSerializer):
+            self.check_balance(data.get('amount', Decimal('0')))
+        return data
+
+    def get_base_currency(self):
+        """The requesting user's base currency, cached for the whole batch."""
+        if 'base_currency' not in self.context:
+            request = self.context.get('request')
+            profile = getattr(request.user, 'profile', None) if request else None
+            self.context['base_currency'] = (profile.base_currency if profile else 'USD').upper()
+        return self.context['base_currency']
+
+    def convert_currency(self, data):
+        """
+        Fill in amount and exchange_rate for expenses in a foreign currency.
+
+        When original_amount is in a currency other than the user's base
+        currency, the rate is the client's exchange_rate, the one implied
+        by an amount sent along with original_amount, or the stored rate
+        for the expense date, and amount is calculated from it unless sent.
+        Updates convert again only when currency or original_amount
+        changes; an explicit rate on the expense is kept in that case.
+        """
+        instance = self.instance
+        if instance is not None and not {'currency', 'original_amount'} & set(data):
+            return data
+
+        base_currency = self.get_base_currency()
+        currency = (data.get('currency') or getattr(instance, 'currency', None) or base_currency).upper()
+        data['currency'] = currency
+        original_amount = data.get('original_amount', getattr(instance, 'original_amount', None))
+        day = data.get('date', getattr(instance, 'date', None))
+        if (instance is not None and 'exchange_rate' not in data and 'amount' not in data
+                and instance.rate_source == 'explicit' and instance.currency == currency):
+            data['exchange_rate'] = instance.exchange_rate
+
+        if currency == base_currency:
+            if 'amount' not in data and data.get('original_amount') is not None:
+                data['amount'] = data['original_amount']
+            if 'exchange_rate' not in data:
+                data['exchange_rate'] = Decimal('1')
+            data['rate_source'] = 'table'
+        elif original_amount is not None:
+            if 'exchange_rate' in data:
+                if 'amount' not in data:
+                    data['amount'] = (original_amount * data['exchange_rate']).quantize(
+                        rates.AMOUNT_PLACES, rounding=ROUND_HALF_UP
+                    )
+                data['rate_source'] = 'explicit'
+            elif 'amount' in data:
+                data['exchange_rate'] = self.implied_rate(data['amount'], original_amount)
+                data['rate_source'] = 'explicit'
+            else:
+                try:
+                    data['amount'], data['exchange_rate'] = rates.convert(
+                        original_amount, currency, base_currency, day
+                    )
+                except rates.ExchangeRateUnavailable as exc:
+                    raise serializers.ValidationError({'exchange_rate': [str(exc)]})
+                data['rate_source'] = 'table'
+
+        if instance is None and 'amount' not in data:
+            raise serializers.ValidationError({'amount': ['Provide either amount or original_amount.']})
+        if 'amount' in data:
+            self.validate_amount(data['amount'])
+        return data
+
+    def implied_rate(self, amount, original_amount):
+        """The exchange rate turning original_amount into amount."""
+        if original_amount <= 0:
+            raise serializers.ValidationError({'original_amount': ['Must be greater than 0.']})
+        rate = (amount / original_amount).quantize(rates.RATE_PLACES, rounding=ROUND_HALF_UP)
+        try:
+            return self.fields['exchange_rate'].run_validation(rate)
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({'exchange_rate': exc.detail})
+
+    def validate_batch(self, items):
+        """Validate that a batch of new expenses doesn't exceed the balance."""
+        self.check_balance(sum((item['amount'] for item in items), Decimal('0')))
+
+    def check_balance(self, expense_amount):
+        """Raise a ValidationError if expense_amount exceeds the user's balance."""
         # Get the user from the view context
         user = self.context['request'].user if 'request' in self.context else None
         
         if not user:
             raise serializers.ValidationError("User context is required.")
         
-        # Calculate current balance
-        total_income = Income.objects.filter(user=user).aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0')
-        
-        total_expenses = Expense.objects.filter(user=user).aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0')
-        
-        current_balance = total_income - total_expenses
-        expense_amount = data.get('amount', Decimal('0'))
-        
+        # Read the materialized balance. Inside a transaction the row is
+        # locked so concurrent expenses cannot both pass the check.
+        balance = UserBalance.for_user(
+            user.id,
+            lock=transaction.get_connection().in_atomic_block
+        )
+        current_balance = balance.balance
+        if self.instance is not None:
+            # The expense being edited is already part of the balance.
+            current_balance += self.instance.amount
+
         # Check if new expense would exceed balance
         if expense_amount > current_balance:
             raise serializers.ValidationError(
@@ -116,11 +231,13 @@ class ExpenseSerializer(serializers.ModelSerializer):
                 f"but you're trying to spend ${expense_amount:.2f}. "
                 f"Maximum you can spend is ${current_balance:.2f}."
             )
-        
-        return data
 
-    def create(self, validated_data):
-        """Create expense and set original_amount to amount if not provided."""
+    def prepare_create(self, validated_data):
+        """Default original_amount to amount if not provided."""
         if 'original_amount' not in validated_data or validated_data['original_amount'] is None:
             validated_data['original_amount'] = validated_data['amount']
-        return super().create(validated_data)
\ No newline at end of file
+        return validated_data
+
+    def create(self, validated_data):
+        """Create expense and set original_amount to amount if not provided."""
+        return super().create(self.prepare_create(validated_data))
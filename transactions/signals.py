@@ -0,0 +1,83 @@
+"""Transactions app signals for keeping derived ledger data in sync."""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
+from transactions.models import Income, Expense, UserBalance
+
+
+# One signed movement of money in a user's ledger. Updates are expressed as
+# a reversal of the previous values followed by the new values, so handlers
+# only ever have to add deltas.
+LedgerChange = namedtuple('LedgerChange', ['user_id', 'category_id', 'date', 'amount', 'count'])
+
+# Sent with sender=Income or Expense and changes=[LedgerChange, ...] after
+# every write. Bulk code paths that bypass the model signals (bulk_create,
+# bulk_update) must send it themselves.
+ledger_changed = Signal()
+
+
+def changes_for_created(instances):
+    """Build the ledger changes for freshly inserted transactions."""
+    return [
+        LedgerChange(obj.user_id, obj.category_id, obj.date, obj.amount, 1)
+        for obj in instances
+    ]
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+def remember_previous_values(sender, instance, **kwargs):
+    """Snapshot the stored row so post_save can reverse it."""
+    instance._ledger_previous = None
+    if instance.pk:
+        instance._ledger_previous = sender.objects.filter(pk=instance.pk).values(
+            'user_id', 'category_id', 'date', 'amount'
+        ).first()
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+def transaction_saved(sender, instance, created, **kwargs):
+    """Announce a created or updated transaction."""
+    changes = []
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous:
+        changes.append(LedgerChange(
+            previous['user_id'], previous['category_id'], previous['date'],
+            -previous['amount'], -1
+        ))
+    changes.append(LedgerChange(
+        instance.user_id, instance.category_id, instance.date,
+        Decimal(str(instance.amount)), 1
+    ))
+    ledger_changed.send(sender=sender, changes=changes)
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def transaction_deleted(sender, instance, origin=None, **kwargs):
+    """Announce a deleted transaction."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is User:
+        # Deleting a user removes their derived ledger rows as well.
+        return
+    ledger_changed.send(sender=sender, changes=[LedgerChange(
+        instance.user_id, instance.category_id, instance.date,
+        -Decimal(str(instance.amount)), -1
+    )])
+
+
+@receiver(ledger_changed)
+def update_user_balance(sender, changes, **kwargs):
+    """Apply ledger changes to the materialized per-user balance."""
+    field = 'income' if sender is Income else 'expense'
+    deltas = defaultdict(Decimal)
+    for change in changes:
+        deltas[change.user_id] += change.amount
+
+    for user_id, delta in deltas.items():
+        if delta:
+            UserBalance.apply_delta(user_id, **{field: delta})
@@ -0,0 +1,99 @@
+"""
+Celery tasks for statement imports, exports and balance rollups.
+
+Files are exchanged through Django's default storage: an import reads a
+statement uploaded there, an export writes its file there and returns the
+stored name. The import and export endpoints queue these tasks with
+queue_job, which remembers who queued each job so its status and result
+are only shown to that user (see transactions.views.job_status).
+"""
+import io
+import tempfile
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from transactions.exporters import ENCODERS, gzip_chunks, iter_rows
+from transactions.importers import DEFAULT_CHUNK_SIZE, detect_format, import_statement
+from sentinel_tracker.periods import Period
+
+
+def _job_key(task_id):
+    return f'transactions:job:{task_id}'
+
+
+def queue_job(task, kind, user_id, *args, **kwargs):
+    """
+    Queue task(user_id, *args, **kwargs) on behalf of a user.
+
+    Returns:
+        Task id, accepted by job_owner() and the job status endpoint
+    """
+    result = task.delay(user_id, *args, **kwargs)
+    cache.set(_job_key(result.id), {'user_id': user_id, 'kind': kind}, settings.TRANSACTION_JOB_TIMEOUT)
+    return result.id
+
+
+def job_owner(task_id):
+    """Return {'user_id', 'kind'} for a job queued by queue_job, or None."""
+    return cache.get(_job_key(task_id))
+
+
+@shared_task
+def import_statement_file(user_id, name, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, offset=0):
+    """
+    Import a statement stored under name in the default storage.
+
+    The file is deleted once every row is committed; after a failure it is
+    kept so the import can be retried from the last committed offset.
+
+    Returns:
+        ImportResult.as_dict()
+    """
+    user = User.objects.get(id=user_id)
+    fmt = fmt or detect_format(name)
+    with default_storage.open(name, 'rb') as fileobj:
+        result = import_statement(user, fileobj, fmt, chunk_size=chunk_size, offset=offset)
+    default_storage.delete(name)
+    return result.as_dict()
+
+
+@shared_task
+def export_transactions(user_id, fmt='csv', params=None, compress=False):
+    """
+    Write a user's transactions to the default storage.
+
+    Args:
+        fmt: csv or ndjson
+        params: Optional period parameters as accepted by the export
+            endpoint (from/to, year/month/week/quarter)
+        compress: gzip the file
+
+    Returns:
+        Name of the stored file
+    """
+    user = User.objects.get(id=user_id)
+    period = Period.from_params(params) if params else None
+    chunks = ENCODERS[fmt](iter_rows(user, period))
+    name = f'exports/{user_id}/transactions-{timezone.now():%Y%m%d%H%M%S}.{fmt}'
+    if compress:
+        chunks = gzip_chunks(chunks)
+        name += '.gz'
+
+    with tempfile.TemporaryFile() as spool:
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.seek(0)
+        return default_storage.save(name, File(spool))
+
+
+@shared_task
+def reconcile_balances(user_id=None):
+    """Rebuild UserBalance rows from the raw transactions (see the reconcile_balances command)."""
+    out = io.StringIO()
+    call_command('reconcile_balances', user_id=user_id, stdout=out)
+    return out.getvalue().strip()
@@ -0,0 +1,513 @@
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from budgets.models import Category
+from sentinel_tracker.periods import Period
+from sentinel_tracker.testing import QueryPlanTestCase
+from transactions.importers import import_statement, parse_csv, parse_ndjson, parse_ofx
+from transactions import rates
+from transactions.models import ExchangeRate, Income, Expense, UserBalance
+
+
+class TransactionIndexTests(QueryPlanTestCase):
+    """Per-user period lookups use the (user, date) and (user, category, date) indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='planner')
+        cls.categories = [
+            Category.objects.create(user=cls.user, name=f'Category {index}', type=kind)
+            for kind in ('income', 'expense')
+            for index in range(4)
+        ]
+        first_day = date(2020, 1, 1)
+        for model, kind in ((Income, 'income'), (Expense, 'expense')):
+            categories = [category for category in cls.categories if category.type == kind]
+            model.objects.bulk_create([
+                model(
+                    user=cls.user,
+                    category=categories[index % len(categories)],
+                    amount=Decimal('10.00'),
+                    date=first_day + timedelta(days=index % 1500)
+                )
+                for index in range(6000)
+            ])
+        cls.analyze(Income, Expense)
+
+    def test_period_lookups_use_user_date_index(self):
+        month = Period.month(2022, 6)
+        self.assertUsesIndex(Income.objects.filter(user=self.user, **month.filter()), 'income_user_date_idx')
+        self.assertUsesIndex(Expense.objects.filter(user=self.user, **month.filter()), 'expense_user_date_idx')
+
+    def test_category_period_lookups_use_user_category_date_index(self):
+        month = Period.month(2022, 6)
+        for model, name in ((Income, 'income_user_cat_date_idx'), (Expense, 'expense_user_cat_date_idx')):
+            category = next(category for category in self.categories if category.type == model.__name__.lower())
+            queryset = model.objects.filter(user=self.user, category=category, **month.filter())
+            self.assertUsesIndex(queryset, name)
+
+
+class BulkCreateTests(APITestCase):
+    """POST .../bulk/ creates a whole batch or nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='bulk')
+        Income.objects.create(user=cls.user, amount=Decimal('1000.00'), date=date(2024, 6, 1))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_creates_every_item(self):
+        response = self.client.post('/api/transactions/expenses/bulk/', [
+            {'amount': '10.00', 'date': '2024-06-02'},
+            {'amount': '20.00', 'date': '2024-06-03', 'description': 'Lunch'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(UserBalance.for_user(self.user.id).balance, Decimal('970.00'))
+
+    def test_reports_errors_per_index_and_creates_nothing(self):
+        response = self.client.post('/api/transactions/income/bulk/', [
+            {'amount': '10.00', 'date': '2024-06-02'},
+            {'amount': '10.00', 'date': 'not a date'},
+            {'amount': '10.00', 'date': '2024-06-04'},
+            {'date': '2024-06-05'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 3])
+        self.assertIn('date', response.data['errors'][0]['errors'])
+        self.assertIn('amount', response.data['errors'][1]['errors'])
+        self.assertEqual(Income.objects.filter(user=self.user).count(), 1)
+
+    def test_batch_total_is_checked_against_the_balance(self):
+        response = self.client.post('/api/transactions/expenses/bulk/', [
+            {'amount': '600.00', 'date': '2024-06-02'},
+            {'amount': '600.00', 'date': '2024-06-03'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.filter(user=self.user).exists())
+
+    def test_rejects_more_than_500_items(self):
+        items = [{'amount': '1.00', 'date': '2024-06-02'}] * 501
+        response = self.client.post('/api/transactions/income/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 500', response.data['error'])
+        self.assertEqual(Income.objects.filter(user=self.user).count(), 1)
+
+    def test_rejects_a_non_list_body(self):
+        response = self.client.post(
+            '/api/transactions/income/bulk/', {'amount': '1.00', 'date': '2024-06-02'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class StatementImportTests(TestCase):
+    """Statement parsing in each format, per-row errors and resuming."""
+
+    CSV = (
+        b'date,amount,description,category\n'
+        b'2024-06-01,1500.00,Salary,Salary\n'
+        b'2024-06-02,-42.50,"Groceries,\nweekly",Food\n'
+        b'\n'
+        b'2024-06-03,-12.00,Bus,Transport\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='importer')
+        cls.food = Category.objects.create(user=cls.user, name='Food', type='expense')
+
+    def test_csv_rows_and_offsets(self):
+        rows = list(parse_csv(io.BytesIO(self.CSV)))
+
+        self.assertEqual([record['description'] for record, _ in rows], ['Salary', 'Groceries,\nweekly', 'Bus'])
+        # Each offset is where the next row starts.
+        self.assertEqual(self.CSV[rows[0][1]:].split(b',', 1)[0], b'2024-06-02')
+        self.assertEqual(rows[-1][1], len(self.CSV))
+
+    def test_ndjson_reports_invalid_lines(self):
+        data = b'{"date": "2024-06-01", "amount": "5"}\n\nnot json\n[1, 2]\n'
+        rows = list(parse_ndjson(io.BytesIO(data)))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][0], {'date': '2024-06-01', 'amount': '5'})
+        self.assertIn('_error', rows[1][0])
+
+        result = import_statement(self.user, io.BytesIO(data), 'ndjson')
+        self.assertEqual((result.incomes, result.skipped), (1, 2))
+        self.assertEqual(result.errors[1]['error'], 'Expected an object per record')
+
+    def test_ofx_transactions(self):
+        data = (
+            b'OFXHEADER:100\n<OFX><CURDEF>EUR\n'
+            b'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240602120000<TRNAMT>-20.00<NAME>Cafe\n'
+            b'<CURRATE>1.1000</STMTTRN>\n'
+            b'<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240603<TRNAMT>100.00<MEMO>Refund</STMTTRN>\n'
+            b'</OFX>\n'
+        )
+        records = [record for record, _ in parse_ofx(io.BytesIO(data))]
+
+        self.assertEqual(records[0], {
+            'date': '20240602', 'amount': '-20.00', 'description': 'Cafe',
+            'currency': 'EUR', 'exchange_rate': '1.1000',
+        })
+        self.assertEqual(records[1]['description'], 'Refund')
+
+        # The refund has no rate of its own and the rate table is empty.
+        result = import_statement(self.user, io.BytesIO(data), 'ofx')
+        self.assertEqual((result.expenses, result.skipped), (1, 1))
+        self.assertIn('EUR', result.errors[0]['error'])
+        expense = Expense.objects.get(user=self.user)
+        self.assertEqual((expense.original_amount, expense.amount), (Decimal('20.00'), Decimal('22.00')))
+
+    def test_import_classifies_rows_and_resolves_categories(self):
+        result = import_statement(self.user, io.BytesIO(self.CSV), 'csv')
+
+        self.assertEqual((result.incomes, result.expenses, result.skipped), (1, 2, 0))
+        self.assertEqual(result.offset, len(self.CSV))
+        groceries = Expense.objects.get(user=self.user, amount=Decimal('42.50'))
+        self.assertEqual(groceries.category, self.food)
+        self.assertEqual(UserBalance.for_user(self.user.id).balance, Decimal('1445.50'))
+
+    def test_invalid_rows_are_skipped_with_their_offset(self):
+        data = (
+            b'date,amount\n'
+            b'2024-06-01,10\n'
+            b'2024-06-02,NaN\n'
+            b'yesterday,5\n'
+            b'2024-06-04,99999999999\n'
+        )
+        result = import_statement(self.user, io.BytesIO(data), 'csv')
+
+        self.assertEqual((result.imported, result.skipped), (1, 3))
+        self.assertEqual([error['error'] for error in result.errors], [
+            "Invalid amount: 'NaN'", "Invalid date: 'yesterday'", 'amount out of range: 99999999999',
+        ])
+        self.assertEqual(result.errors[0]['offset'], data.index(b'yesterday'))
+
+    def test_resume_from_committed_offset(self):
+        offsets = []
+        first = import_statement(
+            self.user, io.BytesIO(self.CSV), 'csv', chunk_size=1,
+            on_chunk=lambda result: offsets.append(result.offset)
+        )
+        Income.objects.all().delete()
+        Expense.objects.all().delete()
+
+        # Resuming after the first chunk imports only the remaining rows.
+        resumed = import_statement(self.user, io.BytesIO(self.CSV), 'csv', offset=offsets[0])
+
+        self.assertEqual(first.imported, 3)
+        self.assertEqual((resumed.incomes, resumed.expenses), (0, 2))
+        self.assertEqual(resumed.offset, len(self.CSV))
+
+
+class AggregateTests(APITestCase):
+    """GET /api/transactions/aggregate/ groups both kinds in one query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='aggregator')
+        cls.food = Category.objects.create(user=cls.user, name='Food', type='expense')
+        cls.rent = Category.objects.create(user=cls.user, name='Rent', type='expense')
+        Income.objects.create(user=cls.user, amount=Decimal('3000.00'), date=date(2024, 5, 1))
+        Income.objects.create(user=cls.user, amount=Decimal('3000.00'), date=date(2024, 6, 1))
+        for amount, category, day in (
+            ('10.00', cls.food, date(2024, 5, 3)),
+            ('30.00', cls.food, date(2024, 5, 20)),
+            ('25.50', cls.food, date(2024, 6, 2)),
+            ('900.00', cls.rent, date(2024, 6, 1)),
+        ):
+            Expense.objects.create(user=cls.user, category=category, amount=Decimal(amount), date=day)
+        other = User.objects.create(username='other')
+        Expense.objects.create(user=other, category=cls.food, amount=Decimal('1.00'), date=date(2024, 5, 3))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_groups_by_category_and_month(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/transactions/aggregate/', {
+                'group_by': 'category,month', 'metric': 'sum,count,max', 'kind': 'expense',
+            })
+
+        self.assertEqual(response.status_code, 200)
+        rows = [
+            (row['category_name'], row['month'], row['sum'], row['count'], row['max'])
+            for row in response.data['results']
+        ]
+        self.assertEqual(sorted(rows), [
+            ('Food', date(2024, 5, 1), 40.0, 2, 30.0),
+            ('Food', date(2024, 6, 1), 25.5, 1, 25.5),
+            ('Rent', date(2024, 6, 1), 900.0, 1, 900.0),
+        ])
+
+    def test_both_kinds_in_a_period(self):
+        response = self.client.get('/api/transactions/aggregate/', {'year': 2024, 'month': 6})
+
+        self.assertEqual(
+            [(row['kind'], row['sum'], row['count']) for row in response.data['results']],
+            [('expense', 925.5, 2), ('income', 3000.0, 1)]
+        )
+        self.assertEqual(response.data['from'], date(2024, 6, 1))
+        self.assertEqual(response.data['to'], date(2024, 6, 30))
+
+    def test_rejects_unknown_dimensions_and_metrics(self):
+        for params in ({'group_by': 'hour'}, {'metric': 'median'}, {'kind': 'transfer'}):
+            response = self.client.get('/api/transactions/aggregate/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class ExportTests(APITestCase):
+    """GET /api/transactions/export/ streams every transaction in (date, kind, id) order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='exporter')
+        cls.food = Category.objects.create(user=cls.user, name='Food', type='expense')
+        for day in (3, 1, 2, 1):
+            Income.objects.create(user=cls.user, amount=Decimal('100.00'), date=date(2024, 6, day))
+            Expense.objects.create(
+                user=cls.user, category=cls.food, amount=Decimal('7.25'), date=date(2024, 6, day),
+                description='Lunch, "to go"'
+            )
+        Income.objects.create(user=User.objects.create(username='other'), amount=Decimal('1.00'), date=date(2024, 6, 1))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def expected_order(self):
+        rows = [
+            (row.date.isoformat(), kind, row.id)
+            for kind, model in (('income', Income), ('expense', Expense))
+            for row in model.objects.filter(user=self.user)
+        ]
+        return sorted(rows, key=lambda row: (row[0], row[1], row[2]))
+
+    def test_csv_export_in_chunks(self):
+        # Three rows per query, so the keyset continues across date and kind boundaries.
+        with mock.patch('transactions.exporters.EXPORT_CHUNK_SIZE', 3):
+            response = self.client.get('/api/transactions/export/')
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="transactions.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row['date'], row['kind'], int(row['id'])) for row in rows], self.expected_order())
+        expense = next(row for row in rows if row['kind'] == 'expense')
+        self.assertEqual((expense['category'], expense['description']), ('Food', 'Lunch, "to go"'))
+        income = next(row for row in rows if row['kind'] == 'income')
+        self.assertEqual((income['category'], income['currency']), ('', ''))
+
+    def test_gzip_ndjson_export_of_a_period(self):
+        response = self.client.get('/api/transactions/export/', {
+            'format': 'ndjson', 'compress': 'gzip', 'from': '2024-06-02', 'to': '2024-06-02',
+        })
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('filename="transactions.ndjson.gz"', response['Content-Disposition'])
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([record['kind'] for record in records], ['expense', 'income'])
+        self.assertEqual(records[0]['amount'], '7.25')
+        self.assertEqual(records[0]['date'], '2024-06-02')
+
+    def test_invalid_period_is_a_json_error(self):
+        response = self.client.get('/api/transactions/export/', {'from': 'June'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), {'error': 'Invalid date range'})
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get('/api/transactions/export/', {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CurrencyConversionTests(APITestCase):
+    """Foreign-currency expenses keep explicit rates and convert only when asked."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='traveller')
+        Income.objects.create(user=cls.user, amount=Decimal('1000.00'), date=date(2024, 1, 1))
+
+    def setUp(self):
+        rates.invalidate()
+        self.client.force_authenticate(self.user)
+
+    def add_rate(self, day, rate):
+        ExchangeRate.objects.create(date=day, from_currency='EUR', to_currency='USD', rate=Decimal(rate))
+        rates.invalidate()
+
+    def create(self, **fields):
+        response = self.client.post('/api/transactions/expenses/', {
+            'currency': 'EUR', 'date': '2024-03-01', **fields
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def patch(self, expense, **fields):
+        response = self.client.patch(f'/api/transactions/expenses/{expense["id"]}/', fields, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_rate_table_conversion(self):
+        self.add_rate(date(2024, 1, 1), '1.2')
+        expense = self.create(original_amount='10.00')
+        self.assertEqual(
+            (expense['amount'], expense['exchange_rate'], expense['rate_source']), ('12.00', '1.2000', 'table')
+        )
+
+    def test_missing_rate_is_a_validation_error(self):
+        response = self.client.post('/api/transactions/expenses/', {
+            'currency': 'EUR', 'original_amount': '10.00', 'date': '2024-03-01'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exchange_rate', response.data)
+
+    def test_both_amounts_imply_the_rate(self):
+        expense = self.create(original_amount='45.00', amount='50.00')
+        self.assertEqual(
+            (expense['amount'], expense['exchange_rate'], expense['rate_source']), ('50.00', '1.1111', 'explicit')
+        )
+
+    def test_date_only_edit_does_not_convert_again(self):
+        explicit = self.create(original_amount='10.00', exchange_rate='1.1000')
+        self.assertEqual(self.patch(explicit, date='2024-07-01')['amount'], '11.00')
+
+        self.add_rate(date(2024, 1, 1), '1.2')
+        converted = self.create(original_amount='10.00')
+        self.add_rate(date(2024, 6, 1), '1.5')
+        converted = self.patch(converted, date='2024-07-01')
+        self.assertEqual((converted['amount'], converted['exchange_rate']), ('12.00', '1.2000'))
+
+    def test_new_original_amount_keeps_an_explicit_rate(self):
+        self.add_rate(date(2024, 1, 1), '1.2')
+        expense = self.patch(self.create(original_amount='10.00', exchange_rate='1.1000'), original_amount='20.00')
+        self.assertEqual((expense['amount'], expense['exchange_rate']), ('22.00', '1.1000'))
+
+        expense = self.patch(self.create(original_amount='10.00'), original_amount='20.00')
+        self.assertEqual((expense['amount'], expense['exchange_rate']), ('24.00', '1.2000'))
+
+    def test_reconvert_skips_explicit_rates(self):
+        self.add_rate(date(2024, 1, 1), '1.2')
+        converted = self.create(original_amount='10.00')
+        explicit = self.create(original_amount='10.00', exchange_rate='1.1000')
+        ExchangeRate.objects.update(rate=Decimal('1.3'))
+        rates.invalidate()
+
+        call_command('reconvert_expenses', stdout=io.StringIO())
+
+        self.assertEqual(Expense.objects.get(id=converted['id']).amount, Decimal('13.00'))
+        self.assertEqual(Expense.objects.get(id=explicit['id']).amount, Decimal('11.00'))
+        self.assertEqual(UserBalance.for_user(self.user.id).balance, Decimal('976.00'))
+
+    def test_import_rounds_half_up_and_records_the_rate_source(self):
+        self.add_rate(date(2024, 1, 1), '1.2')
+        data = (
+            b'{"date": "2024-03-01", "amount": "-10.03", "currency": "EUR", "exchange_rate": "1.5"}\n'
+            b'{"date": "2024-03-01", "amount": "-10.00", "currency": "EUR"}\n'
+        )
+        import_statement(self.user, io.BytesIO(data), 'ndjson')
+
+        self.assertEqual(
+            sorted(Expense.objects.values_list('amount', 'rate_source')),
+            [(Decimal('12.00'), 'table'), (Decimal('15.05'), 'explicit')]
+        )
+
+
+class UserBalanceLockTests(TestCase):
+    """UserBalance.lock builds missing rows so every user is locked."""
+
+    def test_missing_rows_are_built_from_history(self):
+        user = User.objects.create(username='unbalanced')
+        Income.objects.create(user=user, amount=Decimal('50.00'), date=date(2024, 6, 1))
+        Expense.objects.create(user=user, amount=Decimal('20.00'), date=date(2024, 6, 2))
+        UserBalance.objects.filter(user=user).delete()
+
+        with transaction.atomic():
+            balances = UserBalance.lock([user.id, user.id])
+
+        self.assertEqual(list(balances), [user.id])
+        self.assertEqual(balances[user.id].balance, Decimal('30.00'))
+
+
+class BackgroundJobTests(APITestCase):
+    """Imports, and exports on request, run as Celery jobs the user can poll."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='queued')
+        Income.objects.create(user=cls.user, amount=Decimal('100.00'), date=date(2024, 6, 1))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_authenticate(self.user)
+
+    def job(self, response):
+        self.assertEqual(response.status_code, 202, response.data)
+        status = self.client.get(response.data['status_url'])
+        self.assertEqual(status.status_code, 200)
+        return status.data
+
+    def test_import_is_queued_and_reported(self):
+        upload = SimpleUploadedFile('june.csv', b'date,amount\n2024-06-02,-10.00\n2024-06-03,oops\n')
+        job = self.job(self.client.post('/api/transactions/import/', {'file': upload}))
+
+        self.assertEqual((job['kind'], job['status']), ('import', 'SUCCESS'))
+        self.assertEqual((job['result']['expenses'], job['result']['skipped']), (1, 1))
+        self.assertTrue(Expense.objects.filter(user=self.user, amount=Decimal('10.00')).exists())
+        # The uploaded statement is removed once imported.
+        self.assertEqual(default_storage.listdir(f'imports/{self.user.id}'), ([], []))
+
+    def test_import_rejects_unknown_formats_up_front(self):
+        upload = SimpleUploadedFile('june.xls', b'...')
+        response = self.client.post('/api/transactions/import/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+        upload = SimpleUploadedFile('june.csv', b'...')
+        response = self.client.post('/api/transactions/import/', {'file': upload, 'format': 'qif'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_background_export_is_downloaded_from_the_job(self):
+        job = self.job(self.client.get('/api/transactions/export/', {
+            'format': 'ndjson', 'background': 'true', 'year': 2024, 'month': 6,
+        }))
+        self.assertEqual((job['kind'], job['status']), ('export', 'SUCCESS'))
+
+        download = self.client.get(job['download_url'])
+        records = [json.loads(line) for line in b''.join(download.streaming_content).decode().splitlines()]
+        self.assertEqual([(record['kind'], record['amount']) for record in records], [('income', '100.00')])
+
+    def test_jobs_of_other_users_are_hidden(self):
+        upload = SimpleUploadedFile('june.csv', b'date,amount\n2024-06-02,5\n')
+        task_id = self.client.post('/api/transactions/import/', {'file': upload}).data['task_id']
+
+        self.client.force_authenticate(User.objects.create(username='nosy'))
+        self.assertEqual(self.client.get(f'/api/transactions/jobs/{task_id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/transactions/jobs/{task_id}/download/').status_code, 404)
@@ -8,5 +8,10 @@ router.register(r'income', views.IncomeViewSet, basename='income')
 router.register(r'expenses', views.ExpenseViewSet, basename='expense')
 
 urlpatterns = [
+    path('import/', views.import_transactions, name='transaction-import'),
+    path('aggregate/', views.aggregate, name='transaction-aggregate'),
+    path('export/', views.export, name='transaction-export'),
+    path('jobs/<str:task_id>/', views.job_status, name='transaction-job'),
+    path('jobs/<str:task_id>/download/', views.job_download, name='transaction-job-download'),
     path('', include(router.urls)),
 ]
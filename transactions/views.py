@@ -1,14 +1,129 @@
 """Transactions app views."""
+import os
+import uuid
+from datetime import date
+from celery.result import AsyncResult
+from django.core.files.storage import default_storage
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
 from rest_framework import viewsets, filters, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, parser_classes, permission_classes, renderer_classes
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from transactions.models import Income, Expense
 from transactions.serializers import IncomeSerializer, ExpenseSerializer
+from transactions.importers import SUPPORTED_FORMATS, StatementImportError, detect_format
+from transactions.aggregation import DIMENSIONS, METRICS, KINDS, aggregate_transactions, parse_list
+from transactions.exporters import CSVRenderer, NDJSONRenderer, ENCODERS, gzip_chunks, iter_rows
+from transactions.tasks import export_transactions, import_statement_file, job_owner, queue_job
+from reports.realtime import schedule_budget_evaluation
+from sentinel_tracker.pagination import KeysetPagination
+from sentinel_tracker.periods import Period
 
 
-class IncomeViewSet(viewsets.ModelViewSet):
+def requested_month(request):
+    """Period for the ?year=&month= query parameters (default: current month)."""
+    today = date.today()
+    try:
+        return Period.month(
+            request.query_params.get('year', today.year),
+            request.query_params.get('month', today.month)
+        )
+    except ValueError:
+        raise ValidationError({'error': 'Invalid year or month'})
+
+
+PERIOD_PARAMS = ('from', 'to', 'year', 'month', 'week', 'quarter')
+
+
+def requested_period(request):
+    """Period for from/to or calendar query parameters, or None for all time."""
+    params = request.query_params
+    if not any(params.get(key) for key in PERIOD_PARAMS):
+        return None
+    try:
+        return Period.from_params(params)
+    except ValueError:
+        raise ValidationError({'error': 'Invalid date range'})
+
+
+class AtomicWriteMixin:
+    """
+    Run create/update/destroy inside a single database transaction.
+
+    Validation, the row write and the UserBalance update then commit or
+    roll back together, and the balance row lock taken during validation
+    is held until the write is done.
+    """
+
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @transaction.atomic
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+
+class BulkCreateMixin:
+    """
+    Add POST {prefix}/bulk/ for creating many transactions in one request.
+
+    The whole batch is validated in one pass and written with a single
+    bulk_create inside one transaction: either every item is created or
+    none is, with validation errors reported per item index.
+    """
+    bulk_max_items = 500
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create several transactions at once.
+
+        Request body: JSON array of transaction objects (max 500)
+
+        Returns: List of created transactions, or per-item errors
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {'error': 'Expected a list of transactions.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > self.bulk_max_items:
+            return Response(
+                {'error': f'A bulk request may contain at most {self.bulk_max_items} items.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            serializer = self.get_serializer(data=request.data, many=True)
+            if not serializer.is_valid():
+                errors = serializer.errors
+                if isinstance(errors, list):
+                    errors = {'errors': [
+                        {'index': index, 'errors': item_errors}
+                        for index, item_errors in enumerate(errors)
+                        if item_errors
+                    ]}
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            self.perform_bulk_create(serializer)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_bulk_create(self, serializer):
+        """Set the user on every transaction of a bulk request."""
+        serializer.save(user=self.request.user)
+
+
+class IncomeViewSet(AtomicWriteMixin, BulkCreateMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing income transactions.
     
@@ -22,13 +137,17 @@ class IncomeViewSet(viewsets.ModelViewSet):
     
     Actions:
     - by_month: GET /api/incomes/by_month/?year=2024&month=12 - Get monthly summary
+    - bulk: POST /api/incomes/bulk/ - Create many incomes in one request
     
     Filters: category, date
     Search: description
     Ordering: date, amount, created_at
+    Pagination: ?page=N, or ?cursor= for constant-cost keyset pages
     """
     serializer_class = IncomeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-date', '-created_at', '-id']
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'date']
     search_fields = ['description']
@@ -37,7 +156,7 @@ class IncomeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return only the current user's incomes."""
-        return Income.objects.filter(user=self.request.user)
+        return Income.objects.filter(user=self.request.user).select_related('category')
 
     def perform_create(self, serializer):
         """Set the user when creating an income."""
@@ -56,12 +175,11 @@ class IncomeViewSet(viewsets.ModelViewSet):
         - year, month, total, count, list of incomes
         """
         from django.db.models import Sum
-        from datetime import datetime
 
-        year = request.query_params.get('year', datetime.now().year)
-        month = request.query_params.get('month', datetime.now().month)
+        period = requested_month(request)
+        year, month = period.start.year, period.start.month
 
-        incomes = self.get_queryset().filter(date__year=year, date__month=month)
+        incomes = self.get_queryset().filter(**period.filter())
         total = incomes.aggregate(total=Sum('amount'))['total'] or 0
 
         return Response({
@@ -69,11 +187,11 @@ class IncomeViewSet(viewsets.ModelViewSet):
             'month': month,
             'total': total,
             'count': incomes.count(),
-            'incomes': IncomeSerializer(incomes, many=True).data
+            'incomes': self.get_serializer(incomes, many=True).data
         })
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(AtomicWriteMixin, BulkCreateMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing expense transactions.
     
@@ -87,15 +205,23 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     
     Actions:
     - by_month: GET /api/expenses/by_month/?year=2024&month=12 - Get monthly summary
+    - bulk: POST /api/expenses/bulk/ - Create many expenses with one balance check
     
     Filters: category, date, currency
     Search: description
     Ordering: date, amount, created_at
+    Pagination: ?page=N, or ?cursor= for constant-cost keyset pages
     
     Multi-currency: Automatically converts to base currency using exchange rate
+
+    Budget alerts: after an expense is created or updated, the budgets
+    covering its category and date are re-evaluated in the background
+    (see reports.realtime)
     """
     serializer_class = ExpenseSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-date', '-created_at', '-id']
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'date', 'currency']
     search_fields = ['description']
@@ -104,11 +230,22 @@ class ExpenseViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return only the current user's expenses."""
-        return Expense.objects.filter(user=self.request.user)
+        return Expense.objects.filter(user=self.request.user).select_related('category')
 
     def perform_create(self, serializer):
         """Set the user when creating an expense."""
-        serializer.save(user=self.request.user)
+        expense = serializer.save(user=self.request.user)
+        schedule_budget_evaluation([expense])
+
+    def perform_update(self, serializer):
+        """Re-evaluate the budgets covering the updated expense."""
+        expense = serializer.save()
+        schedule_budget_evaluation([expense])
+
+    def perform_bulk_create(self, serializer):
+        """Set the user and re-evaluate the budgets covering the new expenses."""
+        expenses = serializer.save(user=self.request.user)
+        schedule_budget_evaluation(expenses)
 
     @action(detail=False, methods=['get'])
     def by_month(self, request):
@@ -123,12 +260,11 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         - year, month, total, count, list of expenses
         """
         from django.db.models import Sum
-        from datetime import datetime
 
-        year = request.query_params.get('year', datetime.now().year)
-        month = request.query_params.get('month', datetime.now().month)
+        period = requested_month(request)
+        year, month = period.start.year, period.start.month
 
-        expenses = self.get_queryset().filter(date__year=year, date__month=month)
+        expenses = self.get_queryset().filter(**period.filter())
         total = expenses.aggregate(total=Sum('amount'))['total'] or 0
 
         return Response({
@@ -136,22 +272,21 @@ class ExpenseViewSet(viewsets.ModelViewSet):
             'month': month,
             'total': total,
             'count': expenses.count(),
-            'expenses': ExpenseSerializer(expenses, many=True).data
+            'expenses': self.get_serializer(expenses, many=True).data
         })
 
     @action(detail=False, methods=['get'])
     def by_category(self, request):
         """Get expense breakdown by category."""
-        from django.db.models import Sum
-        from datetime import datetime
+        from django.db.models import Count, Sum
 
-        year = request.query_params.get('year', datetime.now().year)
-        month = request.query_params.get('month', datetime.now().month)
+        period = requested_month(request)
+        year, month = period.start.year, period.start.month
 
-        expenses = self.get_queryset().filter(date__year=year, date__month=month)
+        expenses = self.get_queryset().filter(**period.filter())
         breakdown = expenses.values('category__name').annotate(
             total=Sum('amount'),
-            count=Sum('id')
+            count=Count('id')
         ).order_by('-total')
 
         return Response({
@@ -159,3 +294,160 @@ class ExpenseViewSet(viewsets.ModelViewSet):
             'month': month,
             'breakdown': list(breakdown)
         })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser])
+def import_transactions(request):
+    """
+    Queue the import of incomes and expenses from an uploaded bank statement.
+
+    Form data:
+    - file: CSV, OFX or NDJSON statement
+    - format: csv, ofx or ndjson (default: detected from the file name)
+
+    Returns: 202 with the task id; the job status reports the counts of
+    imported and skipped rows, with per-row errors, once the import has run
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fmt = request.data.get('format') or detect_format(upload.name)
+    except StatementImportError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if fmt not in SUPPORTED_FORMATS:
+        return Response(
+            {'error': f'Unsupported format "{fmt}". Use one of: {", ".join(SUPPORTED_FORMATS)}.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    name = default_storage.save(f'imports/{request.user.id}/{uuid.uuid4().hex}.{fmt}', upload)
+    task_id = queue_job(import_statement_file, 'import', request.user.id, name, fmt)
+    return job_accepted(request, task_id)
+
+
+def job_accepted(request, task_id):
+    """202 response pointing at the status of a queued job."""
+    return Response({
+        'task_id': task_id,
+        'status_url': request.build_absolute_uri(reverse('transaction-job', args=[task_id])),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def _user_job(request, task_id):
+    """The user's job as (kind, AsyncResult); 404 for unknown or foreign jobs."""
+    job = job_owner(task_id)
+    if job is None or job['user_id'] != request.user.id:
+        raise NotFound('Job not found.')
+    return job['kind'], AsyncResult(task_id)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, task_id):
+    """
+    Report the state of a queued import or export.
+
+    Returns: task_id, kind (import or export) and status (PENDING, STARTED,
+    SUCCESS or FAILURE); finished imports add result with the import
+    counts, finished exports a download_url, and failed jobs the error
+    """
+    kind, result = _user_job(request, task_id)
+    payload = {'task_id': task_id, 'kind': kind, 'status': result.state}
+    if result.successful():
+        if kind == 'export':
+            payload['download_url'] = request.build_absolute_uri(
+                reverse('transaction-job-download', args=[task_id])
+            )
+        else:
+            payload['result'] = result.result
+    elif result.failed():
+        payload['error'] = str(result.result)
+    return Response(payload)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_download(request, task_id):
+    """Download the file written by a finished export job."""
+    kind, result = _user_job(request, task_id)
+    if kind != 'export' or not result.successful():
+        raise NotFound('No finished export for this job.')
+    name = result.result
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename=os.path.basename(name))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def aggregate(request):
+    """
+    Aggregate incomes and expenses along any combination of dimensions.
+
+    Query Parameters:
+    - group_by: Comma-separated dimensions: category, day, week, month, quarter, year
+    - metric: Comma-separated metrics: sum, count, avg, min, max (default: sum,count)
+    - kind: income or expense (default: both)
+    - from, to: Inclusive date range (YYYY-MM-DD); or year/month/week/quarter
+
+    Returns: One row per kind and group with the requested metrics
+    """
+    params = request.query_params
+    try:
+        group_by = parse_list(params.get('group_by'), list(DIMENSIONS), 'group_by')
+        metrics = parse_list(params.get('metric', 'sum,count'), list(METRICS), 'metric')
+        kinds = parse_list(params.get('kind'), list(KINDS), 'kind')
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not metrics:
+        return Response({'error': 'At least one metric is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    period = requested_period(request)
+
+    return Response({
+        'group_by': group_by,
+        'metrics': metrics,
+        'from': period.start if period else None,
+        'to': period.last_day if period else None,
+        'results': aggregate_transactions(request.user, group_by, metrics, period, kinds),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([CSVRenderer, NDJSONRenderer])
+def export(request):
+    """
+    Stream the user's full transaction history as a file download.
+
+    Query Parameters:
+    - format: csv or ndjson (default: csv)
+    - from, to: Inclusive date range (YYYY-MM-DD); or year/month/week/quarter
+    - compress: gzip to compress the download on the fly
+    - background: true to write the file in a background job instead
+
+    Returns: Incomes and expenses ordered by date, streamed in constant
+    memory; with background=true, 202 with the task id of the export job
+    """
+    fmt = request.accepted_renderer.format
+    period = requested_period(request)
+    compress = request.query_params.get('compress') == 'gzip'
+    if request.query_params.get('background', '').lower() in ('1', 'true', 'yes'):
+        params = {key: request.query_params[key] for key in PERIOD_PARAMS if request.query_params.get(key)}
+        task_id = queue_job(export_transactions, 'export', request.user.id, fmt, params or None, compress)
+        return job_accepted(request, task_id)
+
+    chunks = ENCODERS[fmt](iter_rows(request.user, period))
+    filename = f'transactions.{fmt}'
+    content_type = request.accepted_renderer.media_type
+
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -2,9 +2,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from users.models import UserProfile
+from sentinel_tracker.middleware import SerializationTimingMixin
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for UserProfile - Read and Update."""
     bio = serializers.CharField(
         required=False,
@@ -27,7 +28,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SerializationTimingMixin, serializers.ModelSerializer):
     """Serializer for User registration and authentication."""
     profile = UserProfileSerializer(read_only=True)
 